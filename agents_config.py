@@ -1,15 +1,21 @@
 """
 Configuration des agents CrewAI pour la gestion des notes Obsidian
 """
-from crewai import Agent, Task, Crew, Process
-from langchain_community.llms import Ollama
-from typing import List
+import os
+from typing import TYPE_CHECKING, List, Optional
+
+from ollama_api import DEFAULT_KEEP_ALIVE, OLLAMA_BASE_URL, OllamaError, print_warm_up, warm_up
+
+# crewai et langchain sont importés à la demande: plusieurs secondes de chargement
+if TYPE_CHECKING:
+    from crewai import Agent, Task
 
 
 class ObsidianAgentsConfig:
     """Configuration des agents pour Obsidian."""
 
-    def __init__(self, vault_path: str, main_model: str = "llama3.1:8b", tool_model: str = "llama3.1:8b"):
+    def __init__(self, vault_path: str, main_model: str = "llama3.1:8b", tool_model: str = "llama3.1:8b",
+                 keep_alive=DEFAULT_KEEP_ALIVE, llm_cache: Optional[bool] = None, tracer=None):
         """
         Initialise la configuration des agents.
 
@@ -17,49 +23,107 @@ class ObsidianAgentsConfig:
             vault_path: Chemin vers le vault Obsidian
             main_model: Modèle Ollama principal pour la réflexion et la planification
             tool_model: Modèle Ollama spécialisé pour les tool calls (plus fiable)
+            keep_alive: Durée de maintien des modèles en mémoire après chaque requête
+            llm_cache: Active le cache persistant des réponses LLM
+                (None = variable d'environnement LLM_CACHE)
+            tracer: Tracer optionnel (spans des appels LLM et des étapes d'agents)
         """
         self.vault_path = vault_path
         self.main_model = main_model
         self.tool_model = tool_model
+        self.keep_alive = keep_alive
+        self.tracer = tracer
+
+        # Cache des réponses (opt-in): rejoue les étapes identiques d'un workflow
+        if llm_cache is None:
+            llm_cache = os.getenv("LLM_CACHE", "").lower() in ("1", "true", "oui", "yes")
+        self.llm_cache = None
+        if llm_cache:
+            from llm_cache import PersistentLLMCache
+            self.llm_cache = PersistentLLMCache(
+                vault_path,
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+            )
+
+        from langchain_community.llms import Ollama
+        from profiling import active
+
+        # Callbacks des appels LLM: traces et étape 'llm' du profilage
+        def callbacks(label: str):
+            handlers = [tracer.llm_handler(label)] if tracer else []
+            if active() is not None:
+                handlers.append(active().llm_handler())
+            return handlers or None
 
         # LLM principal pour la réflexion et la coordination
         self.main_llm = Ollama(
             model=main_model,
-            base_url="http://localhost:11434",
+            base_url=OLLAMA_BASE_URL,
             temperature=0.7,
+            keep_alive=keep_alive,
+            cache=self.llm_cache,
+            callbacks=callbacks(f"llm {main_model}"),
         )
 
         # LLM spécialisé pour les tool calls (température basse pour plus de précision)
         self.tool_llm = Ollama(
             model=tool_model,
-            base_url="http://localhost:11434",
+            base_url=OLLAMA_BASE_URL,
             temperature=0.1,  # Très bas pour des tool calls précis
             num_predict=1024,
+            keep_alive=keep_alive,
+            cache=self.llm_cache,
+            callbacks=callbacks(f"llm {tool_model}"),
         )
 
-    def create_researcher_agent(self, tools: List) -> Agent:
+    def warm_up(self) -> bool:
+        """
+        Vérifie et charge ensemble le modèle principal et le modèle de tool calls,
+        pour que l'équipe ne s'arrête pas en cours de tâche le temps d'un chargement.
+
+        Returns:
+            True si tous les modèles sont prêts
+        """
+        try:
+            report = warm_up([self.main_model, self.tool_model], keep_alive=self.keep_alive)
+            return print_warm_up(report)
+        except OllamaError as e:
+            print(f"⚠️  Ollama injoignable: {e}")
+            return False
+
+    def _tracing(self, role: str) -> dict:
+        """Arguments d'Agent pour tracer ses étapes (vide sans tracer)."""
+        return {"step_callback": self.tracer.step_callback(role)} if self.tracer else {}
+
+    def create_researcher_agent(self, tools: List) -> "Agent":
         """
         Crée l'agent chercheur qui explore les notes.
         Utilise le modèle spécialisé pour les tool calls.
         """
+        from crewai import Agent
+
         return Agent(
             role="Chercheur de notes Obsidian",
             goal="Explorer et analyser les notes Obsidian pour trouver les informations pertinentes",
             backstory="""Tu es un expert en recherche d'information dans des bases de connaissances.
             Tu maîtrises parfaitement la navigation dans les notes Obsidian et tu sais comment
             trouver rapidement les informations pertinentes. Tu utilises efficacement les outils
-            de recherche et de lecture pour comprendre le contenu du vault.""",
+            de recherche et de lecture pour comprendre le contenu du vault, et les outils de
+            liens, tags et propriétés pour les questions de structure.""",
             tools=tools,
             llm=self.tool_llm,  # Utilise le modèle optimisé pour les tool calls
             verbose=True,
             allow_delegation=False,
+            **self._tracing("Chercheur de notes Obsidian"),
         )
 
-    def create_analyst_agent(self) -> Agent:
+    def create_analyst_agent(self) -> "Agent":
         """
         Crée l'agent analyste qui réfléchit sur les informations.
         Utilise le modèle principal pour la réflexion.
         """
+        from crewai import Agent
+
         return Agent(
             role="Analyste de contenu",
             goal="Analyser les informations trouvées et déterminer les modifications nécessaires",
@@ -71,13 +135,16 @@ class ObsidianAgentsConfig:
             llm=self.main_llm,
             verbose=True,
             allow_delegation=True,
+            **self._tracing("Analyste de contenu"),
         )
 
-    def create_editor_agent(self, tools: List) -> Agent:
+    def create_editor_agent(self, tools: List) -> "Agent":
         """
         Crée l'agent éditeur qui modifie les notes.
         Utilise le modèle spécialisé pour les tool calls.
         """
+        from crewai import Agent
+
         return Agent(
             role="Éditeur de notes Obsidian",
             goal="Modifier et créer des notes Obsidian selon les recommandations de l'analyste",
@@ -89,13 +156,16 @@ class ObsidianAgentsConfig:
             llm=self.tool_llm,  # Utilise le modèle optimisé pour les tool calls
             verbose=True,
             allow_delegation=False,
+            **self._tracing("Éditeur de notes Obsidian"),
         )
 
-    def create_coordinator_agent(self) -> Agent:
+    def create_coordinator_agent(self) -> "Agent":
         """
         Crée l'agent coordinateur qui orchestre le travail.
         Utilise le modèle principal.
         """
+        from crewai import Agent
+
         return Agent(
             role="Coordinateur",
             goal="Coordonner les agents pour accomplir les tâches demandées par l'utilisateur",
@@ -106,11 +176,14 @@ class ObsidianAgentsConfig:
             llm=self.main_llm,
             verbose=True,
             allow_delegation=True,
+            **self._tracing("Coordinateur"),
         )
 
 
-def create_research_task(agent: Agent, query: str) -> Task:
+def create_research_task(agent: "Agent", query: str) -> "Task":
     """Crée une tâche de recherche."""
+    from crewai import Task
+
     return Task(
         description=f"""Recherche des informations dans le vault Obsidian concernant: {query}
 
@@ -125,8 +198,10 @@ def create_research_task(agent: Agent, query: str) -> Task:
     )
 
 
-def create_analysis_task(agent: Agent, research_context: str, user_request: str) -> Task:
+def create_analysis_task(agent: "Agent", research_context: str, user_request: str) -> "Task":
     """Crée une tâche d'analyse."""
+    from crewai import Task
+
     return Task(
         description=f"""Analyse les informations suivantes et détermine les modifications nécessaires:
 
@@ -145,8 +220,10 @@ def create_analysis_task(agent: Agent, research_context: str, user_request: str)
     )
 
 
-def create_editing_task(agent: Agent, action_plan: str) -> Task:
+def create_editing_task(agent: "Agent", action_plan: str) -> "Task":
     """Crée une tâche d'édition."""
+    from crewai import Task
+
     return Task(
         description=f"""Exécute le plan d'action suivant pour modifier les notes Obsidian:
 
@@ -0,0 +1,234 @@
+"""
+Écritures de notes sûres: fichier temporaire renommé, détection des conflits
+et validation groupée par lot
+
+Une note n'est jamais tronquée par un arrêt brutal (l'ancien ou le nouveau
+contenu, jamais un mélange), et une note modifiée dans Obsidian depuis sa
+lecture n'est pas écrasée.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# État d'une note au moment de sa lecture
+Stamp = namedtuple("Stamp", "mtime_ns size sha256")
+
+# batch: fsync des fichiers à la validation du lot (défaut), each: fsync à chaque
+# écriture, none: laissé au système
+SYNC_MODE = os.getenv("WRITE_SYNC", "batch")
+
+
+class WriteConflict(Exception):
+    """La note a changé depuis sa lecture: elle n'est pas écrite."""
+
+
+def content_hash(text: str) -> str:
+    """Empreinte du contenu exact d'une note (fins de ligne comprises)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_note(path: Path) -> Tuple[str, Stamp]:
+    """
+    Lit une note sans convertir ses fins de ligne.
+
+    Returns:
+        (contenu, état à passer à AtomicWriter.write)
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        content = f.read()
+        stat = os.fstat(f.fileno())
+    return content, Stamp(stat.st_mtime_ns, stat.st_size, content_hash(content))
+
+
+def has_changed(path: Path, expected: Union[Stamp, str]) -> bool:
+    """
+    Vrai si la note ne correspond plus à ce qui a été lu.
+
+    Même date et même taille: inchangée sans relecture. Sinon l'empreinte
+    tranche (une date modifiée par une synchronisation n'est pas un conflit).
+    Une empreinte seule (str) est toujours vérifiée par relecture.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return True
+    if isinstance(expected, Stamp):
+        if (stat.st_mtime_ns, stat.st_size) == (expected.mtime_ns, expected.size):
+            return False
+        expected = expected.sha256
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return content_hash(f.read()) != expected
+    except (OSError, UnicodeDecodeError):
+        return True
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Rend durable un renommage (sans effet là où un dossier ne s'ouvre pas)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicWriter:
+    """
+    Écrit des notes par fichier temporaire + renommage.
+
+    Par défaut chaque écriture est validée aussitôt. Dans un bloc group(),
+    les fichiers temporaires s'accumulent et sont validés ensemble: fsync de
+    chaque fichier du lot, renommages (après une dernière vérification des
+    conflits), puis un seul fsync par dossier concerné.
+    """
+
+    def __init__(self, sync: str = SYNC_MODE, batch_size: int = 1, max_delay: float = 0.0):
+        """
+        Args:
+            sync: 'batch', 'each' ou 'none'
+            batch_size: Écritures accumulées avant validation (1 = immédiate)
+            max_delay: Âge maximal (s) de la plus ancienne écriture en attente
+                avant validation, vérifié à chaque écriture (0 = sans limite)
+        """
+        self.sync = sync
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._first_pending = 0.0
+        self.conflicts: List[Path] = []
+        self.errors: List[Tuple[Path, OSError]] = []   # validations échouées (note inchangée)
+        self._pending: List[tuple] = []   # (chemin, temporaire, état attendu)
+        self._lock = threading.RLock()
+
+    def write(self, path: Path, content: str, expected: Optional[Union[Stamp, str]] = None) -> None:
+        """
+        Écrit une note (ou la met en attente de validation dans un lot).
+
+        Args:
+            path: Chemin complet de la note
+            content: Nouveau contenu (fins de ligne conservées telles quelles)
+            expected: État lu (Stamp) ou empreinte; None pour ne pas vérifier
+
+        Raises:
+            WriteConflict: si la note a changé depuis sa lecture
+            OSError: si l'écriture échoue (hors lot; dans un lot, voir `errors`)
+        """
+        path = Path(path)
+        if expected is not None and has_changed(path, expected):
+            raise WriteConflict(f"{path.name} a été modifiée depuis sa lecture")
+
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+            f.flush()
+            if self.sync == "each":
+                os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+
+        with self._lock:
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._pending.append((path, tmp_path, expected))
+            overdue = self.max_delay and time.monotonic() - self._first_pending >= self.max_delay
+            if len(self._pending) >= self.batch_size or overdue:
+                errors_before = len(self.errors)
+                self.commit()
+                if self.batch_size <= 1 and len(self.errors) > errors_before:
+                    # Écriture immédiate: l'erreur revient à l'appelant
+                    raise self.errors.pop()[1]
+
+    def commit(self) -> List[Path]:
+        """
+        Valide les écritures en attente.
+
+        Une note dont le renommage échoue (disque plein, droits) reste inchangée:
+        elle est ajoutée à `errors` sans interrompre le reste du lot.
+
+        Returns:
+            Notes ignorées car modifiées entre l'écriture et la validation
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return []
+            conflicts = self._commit(pending)
+            self.conflicts.extend(conflicts)
+            return conflicts
+
+    def _fail(self, path: Path, tmp_path: Path, error: OSError) -> None:
+        """Abandonne une écriture du lot (fichier temporaire supprimé, note inchangée)."""
+        tmp_path.unlink(missing_ok=True)
+        self.errors.append((path, error))
+
+    def _commit(self, pending: List[tuple]) -> List[Path]:
+        if self.sync == "batch":
+            # Les fichiers du lot seulement (os.sync viderait les caches de tout le système)
+            synced = []
+            for entry in pending:
+                try:
+                    with open(entry[1], "rb+") as f:
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    self._fail(entry[0], entry[1], e)
+                    continue
+                synced.append(entry)
+            pending = synced
+
+        conflicts = []
+        directories = set()
+        for path, tmp_path, expected in pending:
+            if expected is not None and has_changed(path, expected):
+                tmp_path.unlink(missing_ok=True)
+                conflicts.append(path)
+                continue
+            try:
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self._fail(path, tmp_path, e)
+                continue
+            directories.add(path.parent)
+
+        if self.sync != "none":
+            for directory in directories:
+                _fsync_dir(directory)
+        return conflicts
+
+    def discard(self) -> None:
+        """Abandonne les écritures en attente (fichiers temporaires supprimés)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for _, tmp_path, _ in pending:
+            tmp_path.unlink(missing_ok=True)
+
+    @contextmanager
+    def group(self, size: int = 64, max_delay: float = 0.0):
+        """
+        Regroupe les écritures du bloc par lots de `size` (validés ensemble).
+
+        Les écritures restantes sont validées à la sortie du bloc, y compris
+        sur exception (ce qui est écrit n'est pas perdu).
+
+        Args:
+            size: Écritures par lot
+            max_delay: Validation anticipée quand la plus ancienne écriture en
+                attente a cet âge (passages lents: les notes corrigées
+                n'attendent pas tout un lot pour apparaître)
+        """
+        previous = self.batch_size, self.max_delay
+        self.batch_size, self.max_delay = size, max_delay
+        try:
+            yield self
+        finally:
+            self.batch_size, self.max_delay = previous
+            self.commit()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Exécution d'une liste de demandes aux agents (maintenance hebdomadaire, etc.)
+
+Usage:
+    python batch_crew.py demandes.txt                    # une demande par ligne
+    python batch_crew.py demandes.jsonl --workers 3 --output resultats.jsonl
+
+Format JSONL (une demande par ligne, seul "request" est obligatoire):
+    {"id": "resume-projets", "request": "Résume les notes de Projets/", "mode": "simple",
+     "notes": ["Projets/Résumé.md"]}
+
+Les demandes qui citent la même note (chemin .md, [[lien]] ou champ "notes")
+sont exécutées l'une après l'autre; les autres tournent en parallèle.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from dotenv import load_dotenv
+
+_NOTE_RE = re.compile(r"\[\[([^\]|#]+)|([\w./-]+\.md)\b")
+
+MODES = ("simple", "complexe")
+
+
+def load_requests(path: str) -> List[dict]:
+    """
+    Lit les demandes d'un fichier texte (une par ligne, # = commentaire) ou JSONL.
+
+    Returns:
+        Liste de {"id", "request", "mode", "notes"}
+    """
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: JSON invalide ({e})") from None
+                if not isinstance(entry, dict):
+                    raise ValueError(f"{path}:{number}: objet JSON attendu")
+            else:
+                entry = {"request": line}
+            if not isinstance(entry.get("request"), str) or not entry["request"].strip():
+                raise ValueError(f"{path}:{number}: champ 'request' manquant ou invalide (texte attendu)")
+            notes = entry.get("notes", [])
+            if not isinstance(notes, list) or not all(isinstance(note, str) for note in notes):
+                raise ValueError(f"{path}:{number}: champ 'notes' invalide (liste de chemins attendue)")
+            mode = entry.get("mode", "simple")
+            if mode not in MODES:
+                raise ValueError(f"{path}:{number}: mode inconnu '{mode}' ({', '.join(MODES)})")
+            requests.append({
+                "id": str(entry.get("id", number)),
+                "request": entry["request"].strip(),
+                "mode": mode,
+                "notes": notes,
+            })
+    return requests
+
+
+def conflict_keys(entry: dict) -> set:
+    """Notes qu'une demande peut lire ou modifier (pour sérialiser les conflits)."""
+    keys = set()
+    for link, path in _NOTE_RE.findall(entry["request"]):
+        name = (link or path).strip()
+        keys.add(Path(name).stem.lower())
+    keys.update(Path(note).stem.lower() for note in entry["notes"])
+    return keys
+
+
+def group_conflicts(requests: List[dict]) -> List[List[dict]]:
+    """
+    Regroupe les demandes qui partagent une note (union-find).
+
+    Chaque groupe est exécuté dans l'ordre du fichier par un seul worker.
+    """
+    parent = list(range(len(requests)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}
+    for i, entry in enumerate(requests):
+        for key in conflict_keys(entry):
+            if key in owner:
+                parent[find(i)] = find(owner[key])
+            else:
+                owner[key] = i
+
+    groups = {}
+    for i, entry in enumerate(requests):
+        groups.setdefault(find(i), []).append(entry)
+    # Les groupes les plus longs d'abord: ils bornent la durée totale
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def run_group(system, group: List[dict], origin: float,
+              on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+    """
+    Exécute un groupe de demandes sur le thread courant.
+
+    Args:
+        on_result: Appelé avec chaque résultat dès que sa demande se termine
+    """
+    results = []
+    for entry in group:
+        start = time.perf_counter()
+        print(f"\n▶️  [{entry['id']}] {entry['request'][:70]}")
+        try:
+            if entry["mode"] == "simple":
+                output = system.execute_simple_task(entry["request"])
+            else:
+                output = system.execute_complex_task(entry["request"])
+            result = {"success": True, "result": str(output)}
+        except Exception as e:
+            result = {"success": False, "error": f"{type(e).__name__}: {e}"}
+        end = time.perf_counter()
+        results.append({
+            "id": entry["id"],
+            "request": entry["request"],
+            "mode": entry["mode"],
+            **result,
+            "started": round(start - origin, 3),
+            "seconds": round(end - start, 3),
+        })
+        print(f"{'✅' if result['success'] else '❌'} [{entry['id']}] {end - start:.1f}s")
+        if on_result is not None:
+            on_result(results[-1])
+    return results
+
+
+def main():
+    """Point d'entrée principal."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Exécution d'une liste de demandes aux agents")
+    parser.add_argument("requests", help="Fichier de demandes (.txt ou .jsonl)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", "2")),
+                        help="Demandes exécutées en parallèle (à accorder avec OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--output", default="", help="Résultats JSONL (défaut: <fichier>.results.jsonl)")
+    args = parser.parse_args()
+
+    vault = os.getenv("OBSIDIAN_VAULT_PATH", "")
+    if not vault or not Path(vault).is_dir():
+        print(f"❌ Vault introuvable (OBSIDIAN_VAULT_PATH): {vault}")
+        sys.exit(2)
+
+    try:
+        requests = load_requests(args.requests)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    groups = group_conflicts(requests)
+    workers = max(1, min(args.workers, len(groups)))
+    output = args.output or str(Path(args.requests).with_suffix(".results.jsonl"))
+    print(f"📋 {len(requests)} demande(s) en {len(groups)} groupe(s) indépendant(s), "
+          f"{workers} en parallèle")
+
+    from main import ObsidianMultiAgent
+    from tracing import Tracer
+
+    tracer = Tracer.from_env()
+    # Un seul système: clients LLM et index partagés, agents gardés par thread
+    system = ObsidianMultiAgent(
+        vault_path=vault,
+        main_model=os.getenv("MAIN_MODEL", "llama3.1:8b"),
+        tool_model=os.getenv("TOOL_MODEL", "llama3.1:8b"),
+        router_model=os.getenv("ROUTER_MODEL", ""),
+        research_branches=int(os.getenv("RESEARCH_BRANCHES", "1")),
+        tracer=tracer,
+        reuse_agents=True,
+    )
+    system.config.warm_up()
+
+    origin = time.perf_counter()
+    results = []
+    lock = threading.Lock()
+    try:
+        with open(output, "w", encoding="utf-8") as f:
+            # Une ligne par demande dès sa fin: un long groupe ne retient pas les
+            # résultats déjà obtenus, et un arrêt en cours de lot les conserve
+            def write_result(result: dict) -> None:
+                with lock:
+                    results.append(result)
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    f.flush()
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run_group, system, group, origin, write_result)
+                           for group in groups]
+                for future in as_completed(futures):
+                    future.result()
+    finally:
+        if tracer is not None:
+            tracer.close()
+
+    wall = time.perf_counter() - origin
+    total = sum(r["seconds"] for r in results)
+    failed = sum(1 for r in results if not r["success"])
+    print("\n" + "=" * 70)
+    print(f"✅ {len(results) - failed} réussie(s) | ❌ {failed} échec(s) | "
+          f"⏱️  {wall:.1f}s (somme des demandes: {total:.1f}s, ×{total / wall if wall else 1:.1f})")
+    print(f"💾 Résultats: {output}")
+    print("=" * 70)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Comparaison des modèles (et variantes de prompt) sur un corpus de référence:
+qualité des corrections, respect du Markdown et latence
+
+Usage:
+    python bench_models.py --models llama3.1:8b,qwen2.5:7b,mistral:7b
+    python bench_models.py --prompts defaut,concis --min-precision 0.9 --min-recall 0.7
+    python bench_models.py --prompt-file strict=mon_prompt.txt --json resultats.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parent
+
+# Variantes du message système ({language}); le texte est envoyé dans le message
+# utilisateur. "defaut" est celui de SpellingCorrector
+PROMPTS = {
+    "concis": """Corrige les fautes d'orthographe, de grammaire et de ponctuation du texte {language} Markdown envoyé.
+Ne change ni la mise en forme, ni les liens [[...]], ni les tags #, ni le code, ni les URLs.
+Réponds uniquement avec le texte corrigé.""",
+}
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Éléments de structure Markdown comparés entre la référence et la sortie
+_STRUCTURE_RES = {
+    "liens": re.compile(r"!?\[\[[^\]]+\]\]"),
+    "tags": re.compile(r"(?<![\w#])#[\w/-]+"),
+    "titres": re.compile(r"^#{1,6} ", re.MULTILINE),
+    "listes": re.compile(r"^\s*(?:[-*+]|\d+\.)(?: \[[ x]\])? ", re.MULTILINE),
+    "code": re.compile(r"^```", re.MULTILINE),
+    "urls": re.compile(r"https?://\S+"),
+    "tableaux": re.compile(r"^\|", re.MULTILINE),
+}
+
+
+def edits(source: str, target: str) -> Set[Tuple[int, int, Tuple[str, ...]]]:
+    """Modifications au niveau des mots: (début, fin, remplacement) dans source."""
+    a, b = _TOKEN_RE.findall(source), _TOKEN_RE.findall(target)
+    return {
+        (i1, i2, tuple(b[j1:j2]))
+        for op, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        if op != "equal"
+    }
+
+
+def structure_violations(note: dict, output: str) -> List[str]:
+    """Éléments protégés disparus et structure Markdown différente de la référence."""
+    problems = [f"modifié: {item[:40]!r}" for item in note.get("protected", []) if item not in output]
+    for name, pattern in _STRUCTURE_RES.items():
+        expected = sorted(pattern.findall(note["expected"]))
+        if sorted(pattern.findall(output)) != expected:
+            problems.append(f"{name} différents")
+    return problems
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile par interpolation linéaire."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def run_variant(corrector, notes: List[dict], verbose: bool = False) -> dict:
+    """
+    Corrige chaque note du corpus et calcule les métriques d'une variante.
+
+    Les notes passent par correct_segments, comme en production: frontmatter et
+    code non envoyés, un appel par segment avec son num_ctx, routage par langue.
+    """
+    from correct_spelling import CorrectionError
+
+    true_positives = proposed = expected_total = 0
+    violated_notes = errors = 0
+    latencies = []
+    failures = []
+
+    for note in notes:
+        start = time.perf_counter()
+        try:
+            output = corrector.correct_segments(note["text"])
+        except CorrectionError as e:
+            # Une note sans réponse compte comme aucune correction proposée
+            errors += 1
+            failures.append({"note": note["id"], "problems": [f"erreur: {e}"]})
+            output = note["text"]
+        latencies.append(time.perf_counter() - start)
+
+        gold = edits(note["text"], note["expected"])
+        made = edits(note["text"], output)
+        true_positives += len(gold & made)
+        proposed += len(made)
+        expected_total += len(gold)
+
+        problems = structure_violations(note, output)
+        if problems:
+            violated_notes += 1
+            failures.append({"note": note["id"], "problems": problems})
+            if verbose:
+                print(f"    ⚠️  {note['id']}: {', '.join(problems)}")
+
+    timings = corrector.timings
+    return {
+        "precision": true_positives / proposed if proposed else 1.0,
+        "recall": true_positives / expected_total if expected_total else 1.0,
+        "violation_rate": violated_notes / len(notes) if notes else 0.0,
+        "errors": errors,
+        "tokens_per_second": (timings["eval_tokens"] / timings["eval_seconds"]
+                              if timings["eval_seconds"] else 0.0),
+        "p50_seconds": percentile(latencies, 0.50),
+        "p95_seconds": percentile(latencies, 0.95),
+        "violations": failures,
+    }
+
+
+def meets_bar(result: dict, args) -> bool:
+    """Vrai si la variante atteint le niveau de qualité demandé."""
+    return (not result["errors"]
+            and result["precision"] >= args.min_precision
+            and result["recall"] >= args.min_recall
+            and result["violation_rate"] <= args.max_violations)
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Comparaison des modèles de correction")
+    parser.add_argument("--models", default="",
+                        help="Modèles séparés par des virgules (défaut: MAIN_MODEL et TOOL_MODEL)")
+    parser.add_argument("--prompts", default="defaut",
+                        help=f"Variantes de prompt (defaut, {', '.join(PROMPTS)})")
+    parser.add_argument("--prompt-file", action="append", default=[], metavar="NOM=FICHIER",
+                        help="Variante du message système depuis un fichier ({language})")
+    parser.add_argument("--corpus", default=str(ROOT / "bench_corpus.json"), help="Corpus de référence")
+    parser.add_argument("--min-precision", type=float, default=0.9)
+    parser.add_argument("--min-recall", type=float, default=0.7)
+    parser.add_argument("--max-violations", type=float, default=0.0,
+                        help="Part maximale de notes dont la structure Markdown est altérée")
+    parser.add_argument("--json", default="", help="Écrire les résultats détaillés dans ce fichier")
+    parser.add_argument("--verbose", action="store_true", help="Détail des violations par note")
+    args = parser.parse_args()
+
+    from correct_spelling import PROMPT_TEMPLATE, SpellingCorrector
+    from ollama_api import OllamaError, list_models, _model_key
+
+    prompts = {"defaut": PROMPT_TEMPLATE, **PROMPTS}
+    for spec in args.prompt_file:
+        name, _, path = spec.partition("=")
+        prompts[name] = Path(path).read_text(encoding="utf-8")
+    variants = [name.strip() for name in args.prompts.split(",") if name.strip()]
+    variants += [spec.partition("=")[0] for spec in args.prompt_file if spec.partition("=")[0] not in variants]
+    unknown = [name for name in variants if name not in prompts]
+    if unknown:
+        print(f"❌ Variante(s) de prompt inconnue(s): {', '.join(unknown)}")
+        sys.exit(2)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()] or list(dict.fromkeys(
+        [os.getenv("MAIN_MODEL", "llama3.1:8b"), os.getenv("TOOL_MODEL", "llama3.1:8b")]))
+    try:
+        installed = {_model_key(name) for name in list_models()}
+    except OllamaError as e:
+        print(f"❌ Ollama injoignable: {e}")
+        sys.exit(2)
+    for model in [m for m in models if _model_key(m) not in installed]:
+        print(f"⚠️  {model} non installé (ollama pull {model}), ignoré")
+    models = [m for m in models if _model_key(m) in installed]
+    if not models:
+        sys.exit(2)
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        notes = json.load(f)["notes"]
+    print(f"📚 Corpus: {len(notes)} note(s), "
+          f"{sum(len(edits(n['text'], n['expected'])) for n in notes)} correction(s) attendue(s)")
+
+    results = []
+    with tempfile.TemporaryDirectory() as vault:
+        for model in models:
+            for variant in variants:
+                corrector = SpellingCorrector(vault, model=model)
+                corrector.prompt_template = prompts[variant]
+                corrector.warm_up()
+                print(f"\n🧪 {model} / {variant}")
+                result = {"model": model, "prompt": variant,
+                          **run_variant(corrector, notes, verbose=args.verbose)}
+                results.append(result)
+                print(f"  précision {result['precision']:.0%} · rappel {result['recall']:.0%} · "
+                      f"structure altérée {result['violation_rate']:.0%} · "
+                      f"{result['tokens_per_second']:.1f} tok/s · "
+                      f"p50 {result['p50_seconds']:.1f}s · p95 {result['p95_seconds']:.1f}s")
+
+    print("\n" + "=" * 78)
+    print(f"{'Modèle / prompt':<32} {'Préc.':>6} {'Rappel':>7} {'Struct.':>8} "
+          f"{'tok/s':>7} {'p50':>6} {'p95':>6}")
+    print("=" * 78)
+    for r in results:
+        mark = "✅" if meets_bar(r, args) else "  "
+        print(f"{mark}{r['model'] + ' / ' + r['prompt']:<30} {r['precision']:6.0%} {r['recall']:7.0%} "
+              f"{r['violation_rate']:8.0%} {r['tokens_per_second']:7.1f} "
+              f"{r['p50_seconds']:5.1f}s {r['p95_seconds']:5.1f}s")
+    print("=" * 78)
+
+    qualified = [r for r in results if meets_bar(r, args)]
+    if qualified:
+        best = min(qualified, key=lambda r: r["p50_seconds"])
+        print(f"🏆 Plus rapide au niveau demandé: {best['model']} / {best['prompt']} "
+              f"(p50 {best['p50_seconds']:.1f}s)")
+    else:
+        print(f"❌ Aucune variante n'atteint précision ≥ {args.min_precision:.0%}, "
+              f"rappel ≥ {args.min_recall:.0%}, structure altérée ≤ {args.max_violations:.0%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Résultats détaillés: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Mesure du temps de démarrage: temps d'import des modules et durée des
+commandes rapides de main_simple.py (list, search, read)
+
+Usage:
+    python bench_startup.py                  # vault temporaire généré
+    python bench_startup.py --vault ~/Notes  # vault réel
+    python bench_startup.py --budget-ms 100  # code retour 1 si dépassé
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# Modules qui ne doivent jamais être chargés au simple import de nos scripts
+HEAVY_MODULES = ["crewai", "langchain", "langchain_community", "langchain_core", "numpy"]
+
+MODULES = [
+    "obsidian_tools", "main_simple", "correct_spelling",
+    "agents_config", "main", "watch_vault",
+]
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def _run(cmd, env=None) -> float:
+    """Durée d'une commande (processus complet, démarrage de Python compris)."""
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure_import(module: str, runs: int) -> dict:
+    """Temps d'import médian d'un module, et modules lourds chargés au passage."""
+    times, heavy = [], []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "erreur"
+            return {"module": module, "error": error}
+        probe = json.loads(result.stdout)
+        times.append(probe["seconds"])
+        heavy = probe["heavy"]
+    return {"module": module, "ms": statistics.median(times) * 1000, "heavy": heavy}
+
+
+def create_vault(path: Path, notes: int) -> None:
+    """Vault synthétique: quelques dossiers, liens et tags."""
+    for i in range(notes):
+        folder = path / f"Dossier{i % 10}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"Note {i}.md").write_text(
+            f"---\ntags: [projet/{i % 7}]\n---\n# Note {i}\n\n"
+            f"Lien vers [[Note {(i + 1) % notes}]]. Budget trimestriel {i}.\n" * 5,
+            encoding="utf-8",
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage")
+    parser.add_argument("--vault", default="", help="Vault à utiliser (défaut: vault temporaire)")
+    parser.add_argument("--notes", type=int, default=500, help="Taille du vault généré (défaut: 500)")
+    parser.add_argument("--runs", type=int, default=5, help="Répétitions par mesure (défaut: 5)")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="Durée maximale d'une commande rapide, démarrage de Python déduit (défaut: 100)")
+    args = parser.parse_args()
+
+    failed = False
+
+    print("📦 Temps d'import (médiane):")
+    for module in MODULES:
+        result = measure_import(module, args.runs)
+        if "error" in result:
+            print(f"  {module:<20} ⚠️  {result['error']}")
+            continue
+        warning = f"  ⚠️  charge {', '.join(result['heavy'])}" if result["heavy"] else ""
+        failed = failed or bool(result["heavy"])
+        print(f"  {module:<20} {result['ms']:7.1f} ms{warning}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vault = Path(args.vault).expanduser() if args.vault else Path(tmp)
+        if not args.vault:
+            create_vault(vault, args.notes)
+        env = {**os.environ, "OBSIDIAN_VAULT_PATH": str(vault)}
+        first_note = next(p for p in sorted(vault.rglob("*.md"))
+                          if not any(part.startswith(".") for part in p.relative_to(vault).parts))
+
+        baseline = statistics.median(_run([sys.executable, "-c", "pass"]) for _ in range(args.runs))
+        print(f"\n🐍 Démarrage de Python seul: {baseline * 1000:.1f} ms")
+
+        commands = {
+            "list": ["list"],
+            "search": ["search", "budget"],
+            "read": ["read", first_note.relative_to(vault).as_posix()],
+        }
+        print(f"⏱️  Commandes main_simple.py ({vault}):")
+        for name, cmd_args in commands.items():
+            elapsed = statistics.median(
+                _run([sys.executable, "main_simple.py", *cmd_args], env=env) for _ in range(args.runs)
+            )
+            own_ms = (elapsed - baseline) * 1000
+            over = own_ms > args.budget_ms
+            failed = failed or over
+            print(f"  {name:<8} {elapsed * 1000:7.1f} ms (hors démarrage: {own_ms:.1f} ms)"
+                  f"{'  ❌ au-delà du budget' if over else ''}")
+
+    print(f"\n{'❌ Budget dépassé' if failed else '✅ Dans le budget'} ({args.budget_ms:g} ms)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,99 +3,501 @@
 Script de correction orthographique pour les notes Obsidian
 Corrige automatiquement toutes les notes d'un dossier spécifié
 """
+import argparse
+import fnmatch
+import json
 import os
 import sys
+import time
+from contextlib import redirect_stdout
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
+import profiling
+from profiling import stage
 from obsidian_tools import ObsidianTools
-from langchain_community.llms import Ollama
+from token_estimate import calibrate, estimator_for, save_estimators
+from language_id import LANGUAGE_NAMES, detect as detect_language
+from atomic_write import AtomicWriter, WriteConflict, read_note
+from patch_bundle import BundleWriter, apply_bundle
+from markdown_segments import TEXT, newline_style, normalize, overlaps, split_segments, with_newlines
+from throughput import ThroughputHistory, format_duration, host_key
+from ollama_api import DEFAULT_KEEP_ALIVE, OllamaError, chat, list_models, print_warm_up, warm_up
+from resilience import CircuitBreaker, call_with_retries
 from datetime import datetime
 import shutil
 
 
+def iter_notes(vault_path: Path, folder: str = "", pattern: str = "*.md",
+               include: list = None, exclude: list = None):
+    """
+    Parcourt paresseusement les notes d'un dossier.
+
+    Les dossiers techniques (.backups, .obsidian, .correcteur...) sont ignorés.
+
+    Args:
+        vault_path: Racine du vault
+        folder: Dossier à parcourir (vide = racine)
+        pattern: Pattern des fichiers (ex: '*.md')
+        include: Patterns de chemins relatifs à garder (tous si vide)
+        exclude: Patterns de chemins relatifs à écarter
+
+    Yields:
+        Chemins relatifs des notes (str)
+    """
+    search_path = vault_path / folder if folder else vault_path
+    for path in search_path.glob(f"**/{pattern}"):
+        relative = path.relative_to(vault_path)
+        if any(part.startswith(".") for part in relative.parts[:-1]) or not path.is_file():
+            continue
+        relative_path = relative.as_posix()
+        if include and not any(fnmatch.fnmatch(relative_path, p) for p in include):
+            continue
+        if exclude and any(fnmatch.fnmatch(relative_path, p) for p in exclude):
+            continue
+        yield relative_path
+
+
+def create_backup(vault_path: Path, note_path: Path) -> Path:
+    """
+    Crée une sauvegarde de la note avant modification.
+
+    Args:
+        vault_path: Racine du vault
+        note_path: Chemin complet de la note
+
+    Returns:
+        Chemin du fichier de backup
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_dir = vault_path / ".backups"
+    backup_dir.mkdir(exist_ok=True)
+
+    relative_path = note_path.relative_to(vault_path)
+    backup_path = backup_dir / f"{relative_path.stem}_{timestamp}.md"
+    backup_path.parent.mkdir(parents=True, exist_ok=True)
+
+    shutil.copy2(note_path, backup_path)
+    return backup_path
+
+
+def discard_backup(result: Optional[dict]) -> None:
+    """Supprime le backup d'une note finalement non écrite (conflit ou échec au lot)."""
+    if result and result.get("backup"):
+        Path(result["backup"]).unlink(missing_ok=True)
+        result["backup"] = None
+
+
+# Message système de correction ({language}); le texte part seul dans le message
+# utilisateur, pour qu'Ollama réutilise le préfixe commun d'un appel à l'autre.
+# Remplaçable par instance (bench_models.py)
+PROMPT_TEMPLATE = """Tu es un correcteur orthographique expert en {language}.
+
+RÈGLES IMPORTANTES:
+1. Corrige UNIQUEMENT les fautes d'orthographe, de grammaire et de ponctuation
+2. Ne modifie PAS la structure Markdown (titres ##, listes -, liens [[]], tags #)
+3. Ne modifie PAS le sens ou le style du texte
+4. Ne modifie PAS les noms propres, les URLs ou le code
+5. Conserve EXACTEMENT la même mise en forme Markdown
+6. Retourne UNIQUEMENT le texte corrigé, sans explication
+
+Le message suivant contient le texte à corriger."""
+
+# Messages système propres à une langue (les autres langues utilisent PROMPT_TEMPLATE)
+PROMPTS = {
+    "en": """You are an expert English proofreader.
+
+IMPORTANT RULES:
+1. Fix ONLY spelling, grammar and punctuation mistakes
+2. Do NOT change the Markdown structure (headings ##, lists -, links [[]], tags #)
+3. Do NOT change the meaning or the style of the text
+4. Do NOT change proper nouns, URLs or code
+5. Keep EXACTLY the same Markdown formatting
+6. Return ONLY the corrected text, without any explanation
+
+The next message contains the text to correct.""",
+}
+
+# Tailles de contexte autorisées: peu de paliers, car Ollama recharge le modèle
+# quand num_ctx change
+NUM_CTX_BUCKETS = sorted(int(size) for size in os.getenv("CORRECT_NUM_CTX", "2048,4096,8192").split(","))
+
+# Écritures regroupées par lot (validées ensemble) pendant un passage sur un dossier
+WRITE_BATCH = 64
+WRITE_BATCH_DELAY = 10.0
+
+# Attente maximale d'Ollama pendant une coupure, au cours d'un passage sur un dossier
+# (ailleurs, les appels échouent aussitôt tant que le disjoncteur est ouvert)
+OUTAGE_WAIT = 600.0
+
+
+def parse_language_models(value: str) -> dict:
+    """Lit 'en=llama3.1:8b,de=mistral:7b' en {langue: modèle}."""
+    models = {}
+    for item in value.split(","):
+        language, _, model = item.partition("=")
+        if language.strip() and model.strip():
+            models[language.strip()] = model.strip()
+    return models
+
+
+class CorrectionError(Exception):
+    """Le modèle n'a pas pu corriger un texte (le texte n'est pas modifié)."""
+
+
 class SpellingCorrector:
     """Correcteur orthographique pour notes Obsidian."""
 
-    def __init__(self, vault_path: str, model: str = "llama3.1:8b"):
+    def __init__(self, vault_path: str, model: str = "llama3.1:8b",
+                 keep_alive=DEFAULT_KEEP_ALIVE):
         """
         Initialise le correcteur.
 
         Args:
             vault_path: Chemin vers le vault Obsidian
             model: Modèle Ollama à utiliser
+            keep_alive: Durée de maintien du modèle en mémoire après chaque requête
         """
         self.tools = ObsidianTools(vault_path)
         self.vault_path = Path(vault_path)
-
-        # LLM optimisé pour la correction orthographique
-        self.llm = Ollama(
-            model=model,
-            base_url="http://localhost:11434",
-            temperature=0.1,  # Température basse pour corrections précises
-        )
-
-    def create_backup(self, note_path: Path) -> Path:
+        self.model = model
+        self.keep_alive = keep_alive
+        self.prompt_template = PROMPT_TEMPLATE
+        self.prompts = dict(PROMPTS)
+
+        # Langues corrigées (la première sert aux segments trop courts pour être
+        # identifiés); les segments dans une autre langue ne sont pas envoyés
+        self.languages = [code.strip() for code in os.getenv("CORRECT_LANGUAGES", "fr").split(",")
+                          if code.strip()] or ["fr"]
+        self.language_models = parse_language_models(os.getenv("LANGUAGE_MODELS", ""))
+        self.language_stats = {}  # langue -> segments, caractères, ignorés
+
+        # Options communes; num_ctx et num_predict sont choisis par requête
+        self.options = {"temperature": 0.1}  # Température basse pour corrections précises
+        self.ctx_buckets = NUM_CTX_BUCKETS
+
+        # Écritures atomiques, refusées si la note a changé pendant la correction
+        self.writer = AtomicWriter()
+
+        # Temps cumulés rapportés par Ollama (chargement du modèle vs génération),
+        # et volume envoyé au modèle avec le temps d'appel correspondant (débit)
+        self.timings = {"calls": 0, "load_seconds": 0.0, "inference_seconds": 0.0,
+                        "chars": 0, "llm_seconds": 0.0, "eval_tokens": 0, "eval_seconds": 0.0}
+        self.history = ThroughputHistory(vault_path)
+        self._throughput_saved = (0, 0.0)   # (chars, llm_seconds) déjà enregistrés
+
+        # Délai par requête (base + part proportionnelle au texte), nouvelles
+        # tentatives et disjoncteur partagé par toutes les notes du passage
+        self.base_timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+        self.retries = int(os.getenv("LLM_RETRIES", "2"))
+        self.breaker = CircuitBreaker(probe=list_models)
+        self._rate = self.history.rate(model)
+
+    def warm_up(self, recalibrate: bool = False) -> bool:
         """
-        Crée une sauvegarde de la note avant modification.
+        Vérifie que le modèle est installé et le charge avant la première note.
+
+        Au premier usage d'un modèle, son compte de tokens est calibré.
 
         Args:
-            note_path: Chemin de la note
+            recalibrate: Recalibrer le compte de tokens même s'il est en cache
 
         Returns:
-            Chemin du fichier de backup
+            True si le modèle est prêt
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_dir = self.vault_path / ".backups"
-        backup_dir.mkdir(exist_ok=True)
+        try:
+            models = list(dict.fromkeys([self.model] + [
+                model for language, model in self.language_models.items() if language in self.languages
+            ]))
+            # Chargé directement avec le plus petit contexte, celui des notes courtes
+            ready = print_warm_up(warm_up(models, keep_alive=self.keep_alive,
+                                          options={"num_ctx": self.ctx_buckets[0]}))
+        except OllamaError as e:
+            print(f"⚠️  Ollama injoignable: {e}")
+            return False
+        if ready:
+            for model in models:
+                if recalibrate or not estimator_for(model).calibrated:
+                    self.calibrate_tokens(model)
+        return ready
+
+    def calibrate_tokens(self, model: str = "") -> bool:
+        """
+        Calibre le compte de tokens d'un modèle (une fois, gardé en cache).
 
-        relative_path = note_path.relative_to(self.vault_path)
-        backup_path = backup_dir / f"{relative_path.stem}_{timestamp}.md"
-        backup_path.parent.mkdir(parents=True, exist_ok=True)
+        Returns:
+            True si la calibration a réussi
+        """
+        model = model or self.model
+        try:
+            estimator = calibrate(model, options={"num_ctx": self.ctx_buckets[0]},
+                                  keep_alive=self.keep_alive)
+        except OllamaError as e:
+            print(f"⚠️  Calibration des tokens impossible ({model}): {e}")
+            return False
+        error = f", écart moyen {estimator.error:.0%}" if estimator.error is not None else ""
+        print(f"📐 Tokens calibrés pour {model} ({estimator.samples} textes{error})")
+        return True
 
-        shutil.copy2(note_path, backup_path)
-        return backup_path
+    def create_backup(self, note_path: Path) -> Path:
+        """Crée une sauvegarde de la note avant modification (voir create_backup)."""
+        return create_backup(self.vault_path, note_path)
 
-    def correct_text(self, text: str, language: str = "français") -> str:
+    def correct_text(self, text: str, language: str = "fr") -> str:
         """
         Corrige l'orthographe d'un texte.
 
         Args:
             text: Texte à corriger
-            language: Langue du texte
+            language: Code de la langue du texte (prompt et modèle associés)
 
         Returns:
             Texte corrigé
-        """
-        prompt = f"""Tu es un correcteur orthographique expert en {language}.
 
-RÈGLES IMPORTANTES:
-1. Corrige UNIQUEMENT les fautes d'orthographe, de grammaire et de ponctuation
-2. Ne modifie PAS la structure Markdown (titres ##, listes -, liens [[]], tags #)
-3. Ne modifie PAS le sens ou le style du texte
-4. Ne modifie PAS les noms propres, les URLs ou le code
-5. Conserve EXACTEMENT la même mise en forme Markdown
-6. Retourne UNIQUEMENT le texte corrigé, sans explication
-
-TEXTE À CORRIGER:
-{text}
+        Raises:
+            CorrectionError: si le modèle n'a pas répondu malgré les nouvelles tentatives
+        """
+        messages = self.build_messages(text, language)
+        model = self.language_models.get(language, self.model)
+        options = {**self.options, **self.context_options(messages, text, model)}
+        timeout = self.timeout_for(text)
 
-TEXTE CORRIGÉ:"""
+        def generate():
+            with stage("llm"):
+                return chat(model, messages, options=options, keep_alive=self.keep_alive,
+                            timeout=timeout)
 
+        start = time.perf_counter()
         try:
-            corrected = self.llm.invoke(prompt)
-            # Nettoyer la réponse au cas où le modèle ajoute des explications
-            return corrected.strip()
+            response = call_with_retries(generate, retries=self.retries, breaker=self.breaker)
         except Exception as e:
             print(f"⚠️  Erreur lors de la correction: {e}")
-            return text  # Retourner le texte original en cas d'erreur
+            raise CorrectionError(str(e)) from e
+
+        self.timings["chars"] += len(text)
+        self.timings["llm_seconds"] += time.perf_counter() - start
+        self._record_timings(response)
+        # Réponse coupée par num_predict: l'écrire tronquerait la note
+        if response.get("done_reason") == "length":
+            raise CorrectionError(f"réponse tronquée à {options['num_predict']} tokens")
+        corrected = response.get("message", {}).get("content", "")
+        # Tokens générés: compte exact du texte produit, qui affine l'estimateur
+        estimator_for(model).observe(corrected, response.get("eval_count", 0))
+        # Nettoyer la réponse au cas où le modèle ajoute des explications
+        return corrected.strip()
+
+    def context_options(self, messages: list, text: str, model: str = "") -> dict:
+        """
+        num_ctx et num_predict d'une requête, d'après la taille de l'entrée.
+
+        La sortie attendue est le texte corrigé (même longueur, plus une marge);
+        num_ctx est le plus petit palier qui contient entrée et sortie. Les tokens
+        sont comptés par l'estimateur calibré du modèle (sans appel réseau).
+        """
+        tokens = estimator_for(model or self.model)
+        prompt_tokens = tokens.count_messages(messages)
+        num_predict = int(tokens.count(text) * 1.3) + 64
+        needed = prompt_tokens + num_predict
+        num_ctx = next((size for size in self.ctx_buckets if size >= needed), self.ctx_buckets[-1])
+        return {"num_ctx": num_ctx, "num_predict": max(min(num_predict, num_ctx - prompt_tokens), 64)}
+
+    def timeout_for(self, text: str) -> float:
+        """
+        Délai maximal d'une requête, proportionnel à la taille du texte.
+
+        Utilise le débit mesuré sur ce modèle (avec une marge x4), ou 20 car/s
+        sans historique.
+        """
+        seconds_per_char = 1 / self._rate if self._rate else 0.05
+        return self.base_timeout + 4 * len(text) * seconds_per_char
+
+    def build_messages(self, text: str, language: str = "fr") -> list:
+        """Messages de correction d'un segment: consignes fixes, puis le texte seul."""
+        template = self.prompts.get(language, self.prompt_template)
+        return [
+            {"role": "system", "content": template.format(language=LANGUAGE_NAMES.get(language, language))},
+            {"role": "user", "content": text},
+        ]
+
+    def segment_language(self, text: str, record: bool = True) -> str:
+        """
+        Langue d'un segment, comptée dans language_stats.
+
+        Returns:
+            Code de langue; le segment est à corriger si elle est dans self.languages
+        """
+        language = detect_language(text, default=self.languages[0], preferred=self.languages)
+        if record:
+            entry = self.language_stats.setdefault(language, {"segments": 0, "chars": 0, "skipped": 0})
+            entry["segments"] += 1
+            entry["chars"] += len(text)
+            if language not in self.languages:
+                entry["skipped"] += 1
+        return language
+
+    def print_languages(self) -> None:
+        """Affiche la répartition des segments par langue."""
+        if not self.language_stats:
+            return
+        parts = []
+        for language, entry in sorted(self.language_stats.items(), key=lambda item: -item[1]["segments"]):
+            label = f"{language} {entry['segments']} segment(s)"
+            if entry["skipped"]:
+                label += " (non corrigés)"
+            parts.append(label)
+        print(f"🌍 Langues: {', '.join(parts)}")
+
+    def _record_timings(self, info: dict) -> None:
+        """Cumule le temps de chargement et le temps d'inférence d'un appel."""
+        load = info.get("load_duration", 0) / 1e9
+        total = info.get("total_duration", 0) / 1e9
+        self.timings["calls"] += 1
+        self.timings["load_seconds"] += load
+        self.timings["inference_seconds"] += max(total - load, 0.0)
+        self.timings["eval_tokens"] += info.get("eval_count", 0)
+        self.timings["eval_seconds"] += info.get("eval_duration", 0) / 1e9
+
+    def save_throughput(self) -> None:
+        """
+        Enregistre le débit mesuré depuis le dernier enregistrement et les comptes de tokens.
+
+        Peut être appelé plusieurs fois (mode surveillance): chaque appel ne compte
+        que les corrections faites depuis le précédent.
+        """
+        chars, seconds = self.timings["chars"], self.timings["llm_seconds"]
+        saved_chars, saved_seconds = self._throughput_saved
+        self.history.record(self.model, chars - saved_chars, seconds - saved_seconds)
+        self._throughput_saved = (chars, seconds)
+        save_estimators()
 
-    def correct_note(self, note_path: str, create_backup: bool = True) -> dict:
+    def estimate(self, notes: list, max_chars: int = 2000) -> dict:
+        """
+        Estime le coût d'un passage avant de le lancer.
+
+        Args:
+            notes: Chemins relatifs des notes
+            max_chars: Taille cible des segments (comme correct_segments)
+
+        Returns:
+            Dict: caractères, tokens estimés, appels au modèle, segments
+            ignorés et durée projetée (None sans historique de débit)
+        """
+        result = {"notes": len(notes), "chars": 0, "text_chars": 0, "tokens": 0,
+                  "calls": 0, "skipped_segments": 0, "skipped_chars": 0,
+                  "other_language_segments": 0, "seconds": None}
+
+        for note in notes:
+            try:
+                with stage("read"), open(self.vault_path / note, "r", encoding="utf-8") as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            result["chars"] += len(content)
+            for segment in split_segments(content, max_chars=max_chars):
+                chunk = content[segment.start:segment.end]
+                if segment.kind == TEXT and chunk.strip():
+                    core = chunk.strip()
+                    language = self.segment_language(core, record=False)
+                    if language not in self.languages:
+                        result["other_language_segments"] += 1
+                        result["skipped_chars"] += len(chunk)
+                        continue
+                    result["calls"] += 1
+                    result["text_chars"] += len(core)
+                    # Entrée (prompt + texte) et sortie (texte corrigé, de même longueur)
+                    tokens = estimator_for(self.language_models.get(language, self.model))
+                    result["tokens"] += tokens.count_messages(self.build_messages(core, language))
+                    result["tokens"] += tokens.count(core)
+                elif chunk.strip():
+                    result["skipped_segments"] += 1
+                    result["skipped_chars"] += len(chunk)
+
+        rate = self.history.rate(self.model)
+        if rate:
+            result["seconds"] = result["text_chars"] / rate
+        return result
+
+    def print_estimate(self, estimate: dict) -> None:
+        """Affiche l'estimation d'un passage."""
+        def n(value: int) -> str:
+            return f"{value:,}".replace(",", " ")
+
+        print(f"📏 {n(estimate['chars'])} caractères, dont {n(estimate['text_chars'])} envoyés au modèle "
+              f"en {n(estimate['calls'])} appel(s) (~{n(estimate['tokens'])} tokens)")
+        print(f"⏭️  Ignorés: {estimate['skipped_segments']} segment(s) de code ou frontmatter, "
+              f"{estimate['other_language_segments']} dans une langue non corrigée "
+              f"({n(estimate['skipped_chars'])} caractères)")
+        if estimate["seconds"] is None:
+            print(f"⏱️  Durée estimée: inconnue (premier passage de {host_key(self.model)})")
+        else:
+            rate = self.history.rate(self.model)
+            print(f"⏱️  Durée estimée: ~{format_duration(estimate['seconds'])} "
+                  f"({rate:.0f} car/s mesurés sur {host_key(self.model)})")
+
+    def correct_segments(self, text: str, changed: list = None,
+                         max_chars: int = 2000) -> str:
+        """
+        Corrige un texte segment par segment.
+
+        Le frontmatter et les blocs de code ne sont jamais envoyés au modèle,
+        et les espaces autour de chaque segment sont conservés. Chaque segment
+        de texte est corrigé avec le prompt et le modèle de sa langue, ou
+        laissé tel quel si sa langue n'est pas corrigée. Un segment
+        dont la correction ne diffère que par les espaces ou les fins de ligne
+        est recopié à l'identique.
+
+        Args:
+            text: Texte complet de la note
+            changed: Plages (début, fin) modifiées; si fourni, seuls les
+                paragraphes qui les chevauchent sont corrigés
+            max_chars: Taille cible des segments envoyés au modèle
+
+        Returns:
+            Texte corrigé
+        """
+        if changed is not None:
+            max_chars = 0  # Granularité du paragraphe pour ne renvoyer que l'édité
+
+        newline = newline_style(text)
+        parts = []
+        for segment in split_segments(text, max_chars=max_chars):
+            chunk = text[segment.start:segment.end]
+            if segment.kind != TEXT or (changed is not None and not overlaps(segment, changed)):
+                parts.append(chunk)
+                continue
+
+            core = chunk.strip()
+            leading = chunk[:len(chunk) - len(chunk.lstrip())]
+            trailing = chunk[len(chunk.rstrip()):]
+            language = self.segment_language(core)
+            if language not in self.languages:
+                parts.append(chunk)
+                continue
+            # Une réponse vide ne doit jamais effacer le paragraphe
+            corrected = self.correct_text(core, language) or core
+            if normalize(corrected) == normalize(core):
+                parts.append(chunk)
+            else:
+                parts.append(leading + with_newlines(corrected, newline) + trailing)
+
+        return "".join(parts)
+
+    def iter_notes(self, folder: str = "", pattern: str = "*.md",
+                   include: list = None, exclude: list = None):
+        """Parcourt paresseusement les notes d'un dossier (voir iter_notes)."""
+        return iter_notes(self.vault_path, folder, pattern, include, exclude)
+
+    def correct_note(self, note_path: str, create_backup: bool = True,
+                     dry_run: bool = False, bundle: BundleWriter = None) -> dict:
         """
         Corrige l'orthographe d'une note.
 
         Args:
             note_path: Chemin relatif de la note
             create_backup: Si True, crée une sauvegarde avant modification
+            dry_run: Si True, calcule la correction sans rien écrire
+            bundle: Si fourni, les corrections sont ajoutées à ce lot de
+                patchs au lieu d'être écrites (appliquées plus tard avec --apply)
 
         Returns:
             Dict avec le résultat de la correction
@@ -111,8 +513,9 @@ TEXTE CORRIGÉ:"""
 
         # Lire le contenu
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
+            # Fins de ligne d'origine conservées (CRLF compris), état noté pour l'écriture
+            with stage("read"):
+                original_content, stamp = read_note(full_path)
         except Exception as e:
             return {
                 "success": False,
@@ -120,50 +523,76 @@ TEXTE CORRIGÉ:"""
                 "error": f"Erreur de lecture: {e}"
             }
 
-        # Créer un backup si demandé
-        backup_path = None
-        if create_backup:
-            backup_path = self.create_backup(full_path)
-
         # Corriger le texte
         print(f"  🔍 Correction de {note_path}...")
-        corrected_content = self.correct_text(original_content)
+        try:
+            corrected_content = self.correct_segments(original_content)
+        except CorrectionError as e:
+            # Échec du modèle: la note n'est pas « sans faute », elle est en erreur
+            return {
+                "success": False,
+                "note": note_path,
+                "error": f"Erreur de correction: {e}"
+            }
 
-        # Vérifier s'il y a des changements
-        if corrected_content == original_content:
+        # Vérifier s'il y a des changements (espaces et fins de ligne ignorés)
+        if normalize(corrected_content) == normalize(original_content):
             print(f"  ✓ Aucune correction nécessaire")
             return {
                 "success": True,
                 "note": note_path,
                 "changes": False,
-                "backup": str(backup_path) if backup_path else None
+                "chars": len(original_content),
+                "backup": None
             }
 
-        # Écrire le contenu corrigé
-        try:
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(corrected_content)
+        if dry_run:
+            print(f"  ✓ Corrections trouvées (simulation, rien n'est écrit)")
+            return {"success": True, "note": note_path, "changes": True, "dry_run": True,
+                    "chars": len(original_content), "backup": None}
 
-            print(f"  ✓ Corrigé et sauvegardé")
-            return {
-                "success": True,
-                "note": note_path,
-                "changes": True,
-                "backup": str(backup_path) if backup_path else None
-            }
-        except Exception as e:
-            # Restaurer le backup en cas d'erreur
-            if backup_path and backup_path.exists():
-                shutil.copy2(backup_path, full_path)
+        if bundle is not None:
+            edits = bundle.add(note_path, original_content, corrected_content)
+            print(f"  ✓ Corrections planifiées ({edits} remplacement(s))")
+            return {"success": True, "note": note_path, "changes": True, "planned": True,
+                    "edits": edits, "chars": len(original_content), "backup": None}
+
+        # Backup uniquement pour les notes réellement modifiées
+        backup_path = None
+        if create_backup:
+            with stage("backup"):
+                backup_path = self.create_backup(full_path)
 
+        # Écrire le contenu corrigé (fichier temporaire renommé si la note n'a pas bougé)
+        try:
+            with stage("write"):
+                self.writer.write(full_path, corrected_content, expected=stamp)
+        except WriteConflict:
+            # Modifiée dans Obsidian pendant la correction: elle sera reprise au prochain passage
+            if backup_path and backup_path.exists():
+                backup_path.unlink()
+            print(f"  ↻ Modifiée pendant la correction, ignorée")
+            return {"success": True, "note": note_path, "changes": False, "conflict": True,
+                    "chars": len(original_content), "backup": None}
+        except Exception as e:
             return {
                 "success": False,
                 "note": note_path,
                 "error": f"Erreur d'écriture: {e}"
             }
 
+        print(f"  ✓ Corrigé et sauvegardé")
+        return {
+            "success": True,
+            "note": note_path,
+            "changes": True,
+            "chars": len(original_content),
+            "backup": str(backup_path) if backup_path else None
+        }
+
     def correct_folder(self, folder: str = "", pattern: str = "*.md",
-                       create_backups: bool = True, confirm: bool = True) -> dict:
+                       create_backups: bool = True, confirm: bool = True,
+                       bundle: BundleWriter = None) -> dict:
         """
         Corrige toutes les notes d'un dossier.
 
@@ -172,6 +601,8 @@ TEXTE CORRIGÉ:"""
             pattern: Pattern de fichiers (ex: '*.md')
             create_backups: Si True, crée des backups
             confirm: Si True, demande confirmation avant de commencer
+            bundle: Si fourni, écrit les corrections dans ce lot de patchs
+                au lieu de modifier les notes
 
         Returns:
             Dict avec les statistiques de correction
@@ -185,7 +616,8 @@ TEXTE CORRIGÉ:"""
             }
 
         # Lister les notes
-        notes = list(search_path.glob(f"**/{pattern}"))
+        with stage("walk"):
+            notes = list(self.iter_notes(folder, pattern))
 
         if not notes:
             return {
@@ -198,6 +630,8 @@ TEXTE CORRIGÉ:"""
         print(f"📂 Dossier: {folder or 'Racine du vault'}")
         print(f"📝 Notes trouvées: {len(notes)}")
         print(f"💾 Backups: {'Oui' if create_backups else 'Non'}")
+        estimate = self.estimate(notes)
+        self.print_estimate(estimate)
         print("=" * 70)
 
         # Demander confirmation
@@ -212,29 +646,62 @@ TEXTE CORRIGÉ:"""
             "total": len(notes),
             "corrected": 0,
             "unchanged": 0,
+            "conflicts": 0,
             "errors": 0,
             "details": []
         }
 
         print(f"\n🚀 Début de la correction...\n")
-
-        for i, note_path in enumerate(notes, 1):
-            relative_path = str(note_path.relative_to(self.vault_path))
-            print(f"[{i}/{len(notes)}] {relative_path}")
-
-            result = self.correct_note(relative_path, create_backup=create_backups)
-            results["details"].append(result)
-
-            if result["success"]:
-                if result.get("changes"):
-                    results["corrected"] += 1
+        started = time.perf_counter()
+        chars_done = 0
+        conflicts_before = len(self.writer.conflicts)
+        errors_before = len(self.writer.errors)
+
+        # Écritures validées par lots (un seul sync pour plusieurs notes)
+        with self.writer.group(size=WRITE_BATCH, max_delay=WRITE_BATCH_DELAY), \
+                self.breaker.waiting(OUTAGE_WAIT):
+            for i, relative_path in enumerate(notes, 1):
+                print(f"[{i}/{len(notes)}] {relative_path}")
+
+                result = self.correct_note(relative_path, create_backup=create_backups, bundle=bundle)
+                results["details"].append(result)
+
+                if result.get("conflict"):
+                    results["conflicts"] += 1
+                elif result["success"]:
+                    if result.get("changes"):
+                        results["corrected"] += 1
+                    else:
+                        results["unchanged"] += 1
                 else:
-                    results["unchanged"] += 1
-            else:
-                results["errors"] += 1
-                print(f"  ❌ {result.get('error', 'Erreur inconnue')}")
-
-            print()  # Ligne vide entre les notes
+                    results["errors"] += 1
+                    print(f"  ❌ {result.get('error', 'Erreur inconnue')}")
+
+                # Progression: débit de ce passage et temps restant
+                chars_done += result.get("chars", 0)
+                elapsed = time.perf_counter() - started
+                rate = chars_done / elapsed if elapsed else 0.0
+                progress = min(chars_done / estimate["chars"], 1.0) if estimate["chars"] else i / len(notes)
+                eta = (estimate["chars"] - chars_done) / rate if rate and estimate["chars"] else 0.0
+                print(f"  ⏳ {progress:.0%} · {rate:.0f} car/s · reste ~{format_duration(max(eta, 0.0))}")
+
+                print()  # Ligne vide entre les notes
+
+        # Notes modifiées entre leur écriture et la validation du lot (ou dont le
+        # renommage a échoué): inchangées, leur backup n'a plus d'objet
+        backups = {detail["note"]: detail for detail in results["details"] if detail.get("backup")}
+        for conflict in self.writer.conflicts[conflicts_before:]:
+            note = conflict.relative_to(self.vault_path).as_posix()
+            print(f"↻ {note}: modifiée pendant la correction, ignorée")
+            discard_backup(backups.get(note))
+            results["corrected"] -= 1
+            results["conflicts"] += 1
+        for path, error in self.writer.errors[errors_before:]:
+            note = path.relative_to(self.vault_path).as_posix()
+            print(f"❌ {note}: Erreur d'écriture: {error}")
+            discard_backup(backups.get(note))
+            results["corrected"] -= 1
+            results["errors"] += 1
 
         # Afficher le résumé final
         print("=" * 70)
@@ -243,9 +710,21 @@ TEXTE CORRIGÉ:"""
         print(f"Total: {results['total']} notes")
         print(f"✅ Corrigées: {results['corrected']}")
         print(f"➖ Inchangées: {results['unchanged']}")
+        if results["conflicts"]:
+            print(f"↻ Modifiées pendant la correction (ignorées): {results['conflicts']}")
         print(f"❌ Erreurs: {results['errors']}")
 
-        if create_backups and results['corrected'] > 0:
+        if self.timings["calls"]:
+            print(f"⏱️  Chargement du modèle: {self.timings['load_seconds']:.1f}s | "
+                  f"Inférence: {self.timings['inference_seconds']:.1f}s "
+                  f"({self.timings['calls']} appel(s))")
+        self.print_languages()
+
+        self.save_throughput()
+
+        if bundle is not None:
+            print(f"\n📦 Lot de patchs: {bundle.path} (python correct_spelling.py --apply {bundle.path})")
+        elif create_backups and results['corrected'] > 0:
             backup_dir = self.vault_path / ".backups"
             print(f"\n💾 Backups sauvegardés dans: {backup_dir}")
 
@@ -255,8 +734,8 @@ TEXTE CORRIGÉ:"""
         return results
 
 
-def main():
-    """Point d'entrée principal."""
+def run():
+    """Menu interactif."""
     load_dotenv()
 
     # Configuration
@@ -279,17 +758,19 @@ def main():
     print(f"🧠 Modèle: {MODEL}")
     print("=" * 70)
 
-    # Créer le correcteur
+    # Créer le correcteur et charger le modèle dès maintenant
     corrector = SpellingCorrector(str(vault_path), model=MODEL)
+    corrector.warm_up()
 
     # Menu
     print("\nOptions:")
     print("1. Corriger un dossier spécifique")
     print("2. Corriger une note spécifique")
     print("3. Corriger tout le vault (ATTENTION!)")
-    print("4. Quitter")
+    print("4. Surveiller le vault (correction après chaque enregistrement)")
+    print("5. Quitter")
 
-    choice = input("\nVotre choix (1-4): ").strip()
+    choice = input("\nVotre choix (1-5): ").strip()
 
     try:
         if choice == "1":
@@ -321,6 +802,16 @@ def main():
             results = corrector.correct_folder(folder="", confirm=False)
 
         elif choice == "4":
+            from watch_vault import VaultWatcher
+
+            watcher = VaultWatcher(corrector)
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                print("\n👋 Surveillance arrêtée")
+                sys.exit(0)
+
+        elif choice == "5":
             print("\n👋 Au revoir!")
             sys.exit(0)
 
@@ -338,5 +829,182 @@ def main():
         sys.exit(1)
 
 
+def run_batch(args) -> int:
+    """
+    Correction non interactive: un résultat JSON par note sur stdout, dès
+    qu'elle est traitée; les messages lisibles partent sur stderr.
+
+    Returns:
+        Code de sortie: 0 si tout a réussi, 1 si au moins une note a échoué,
+        2 en cas d'erreur de configuration (vault, dossier, modèle)
+    """
+    out = sys.stdout
+
+    def emit(record: dict) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    with redirect_stdout(sys.stderr):
+        load_dotenv()
+        vault = os.getenv("OBSIDIAN_VAULT_PATH", "")
+        model = args.model or os.getenv("TOOL_MODEL", os.getenv("MAIN_MODEL", "llama3.1:8b"))
+        folder = "" if args.folder in (".", "/") else args.folder.strip("/")
+
+        if not vault or not Path(vault).is_dir():
+            print(f"❌ Vault introuvable (OBSIDIAN_VAULT_PATH): {vault}")
+            return 2
+        vault_path = Path(vault).resolve()
+        if not (vault_path / folder).is_dir():
+            print(f"❌ Dossier introuvable: {folder}")
+            return 2
+
+        corrector = SpellingCorrector(str(vault_path), model=model)
+        if args.estimate:
+            # Seuls les chemins sont gardés en mémoire, pas les contenus
+            estimate = corrector.estimate(
+                list(corrector.iter_notes(folder, args.pattern, args.include, args.exclude)))
+            corrector.print_estimate(estimate)
+            emit({"event": "estimate", **estimate})
+            return 0
+        if not corrector.warm_up(recalibrate=args.calibrate_tokens):
+            return 2
+
+        counts = {"corrected": 0, "unchanged": 0, "conflicts": 0, "errors": 0}
+        backups = {}   # note -> résultat, tant que son lot n'est pas validé
+        started = time.perf_counter()
+        bundle = BundleWriter(args.plan, model=model) if args.plan and not args.dry_run else None
+        try:
+            with corrector.writer.group(size=WRITE_BATCH, max_delay=WRITE_BATCH_DELAY), \
+                    corrector.breaker.waiting(OUTAGE_WAIT):
+                for note in corrector.iter_notes(folder, args.pattern, args.include, args.exclude):
+                    print(f"📝 {note}")
+                    note_start = time.perf_counter()
+                    result = corrector.correct_note(note, create_backup=not args.no_backup,
+                                                    dry_run=args.dry_run, bundle=bundle)
+                    result["seconds"] = round(time.perf_counter() - note_start, 3)
+
+                    if result.get("conflict"):
+                        counts["conflicts"] += 1
+                    elif not result["success"]:
+                        counts["errors"] += 1
+                        print(f"  ❌ {result.get('error', 'Erreur inconnue')}")
+                    elif result.get("changes"):
+                        counts["corrected"] += 1
+                        if result.get("backup"):
+                            backups[note] = result
+                    else:
+                        counts["unchanged"] += 1
+                    emit({"event": "note", **result})
+        finally:
+            if bundle is not None:
+                bundle.close()
+
+        # Notes déjà annoncées corrigées, mais modifiées avant la validation de leur lot
+        for conflict in corrector.writer.conflicts:
+            note = conflict.relative_to(vault_path).as_posix()
+            discard_backup(backups.get(note))
+            counts["corrected"] -= 1
+            counts["conflicts"] += 1
+            emit({"event": "conflict", "note": note})
+        for path, error in corrector.writer.errors:
+            note = path.relative_to(vault_path).as_posix()
+            print(f"  ❌ {note}: Erreur d'écriture: {error}")
+            discard_backup(backups.get(note))
+            counts["corrected"] -= 1
+            counts["errors"] += 1
+            emit({"event": "error", "note": note, "error": f"Erreur d'écriture: {error}"})
+
+        corrector.save_throughput()
+        emit({"event": "summary", **counts, "dry_run": args.dry_run,
+              "bundle": str(bundle.path) if bundle else None,
+              "languages": corrector.language_stats,
+              "seconds": round(time.perf_counter() - started, 3)})
+        print(f"📊 ✅ {counts['corrected']} corrigée(s), ➖ {counts['unchanged']} inchangée(s), "
+              f"↻ {counts['conflicts']} modifiée(s) pendant la correction, "
+              f"❌ {counts['errors']} erreur(s)")
+        corrector.print_languages()
+        if bundle is not None:
+            print(f"📦 Lot de patchs: {bundle.path}")
+        return 1 if counts["errors"] else 0
+
+
+def run_apply(args) -> int:
+    """
+    Applique un lot de patchs produit par --plan (sans modèle, une passe d'I/O).
+
+    Returns:
+        Code de sortie: 0 si tout s'est appliqué ou a été ignoré proprement
+        (note modifiée ou supprimée depuis), 1 en cas d'erreur d'I/O, 2 en cas
+        d'erreur de configuration
+    """
+    out = sys.stdout
+
+    with redirect_stdout(sys.stderr):
+        load_dotenv()
+        vault = os.getenv("OBSIDIAN_VAULT_PATH", "")
+        if not vault or not Path(vault).is_dir():
+            print(f"❌ Vault introuvable (OBSIDIAN_VAULT_PATH): {vault}")
+            return 2
+        vault_path = Path(vault).resolve()
+
+        started = time.perf_counter()
+        try:
+            results = apply_bundle(vault_path, args.apply, create_backups=not args.no_backup,
+                                   dry_run=args.dry_run,
+                                   backup=lambda path: create_backup(vault_path, path))
+        except (OSError, ValueError) as e:
+            print(f"❌ Lot de patchs illisible: {e}")
+            return 2
+        results["seconds"] = round(time.perf_counter() - started, 3)
+
+        for skipped in results["skipped"]:
+            print(f"  ⏭️  {skipped['note']}: {skipped['reason']}")
+        print(f"📦 {args.apply} ({results['model']}, {results['created']})")
+        print(f"📊 ✅ {results['applied']} appliqué(s){' (simulation)' if args.dry_run else ''}, "
+              f"↻ {results['stale']} modifiée(s) depuis, ❓ {results['missing']} introuvable(s), "
+              f"❌ {results['errors']} erreur(s) · {results['seconds']:.2f}s")
+        out.write(json.dumps({"event": "apply", "dry_run": args.dry_run, **results},
+                             ensure_ascii=False) + "\n")
+        return 1 if results["errors"] else 0
+
+
+def main():
+    """Point d'entrée principal."""
+    parser = argparse.ArgumentParser(
+        description="Correction orthographique des notes Obsidian "
+                    "(sans --folder: menu interactif)")
+    parser.add_argument("--folder", default=None,
+                        help="Mode non interactif: dossier à corriger ('.' pour tout le vault)")
+    parser.add_argument("--pattern", default="*.md", help="Pattern des fichiers (défaut: *.md)")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB",
+                        help="Ne traiter que les chemins correspondants (répétable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Ignorer les chemins correspondants (répétable)")
+    parser.add_argument("--dry-run", action="store_true", help="Calculer sans rien écrire")
+    parser.add_argument("--no-backup", action="store_true", help="Ne pas créer de backups")
+    parser.add_argument("--model", default="", help="Modèle Ollama (défaut: TOOL_MODEL)")
+    parser.add_argument("--estimate", action="store_true",
+                        help="Afficher seulement l'estimation (caractères, tokens, durée)")
+    parser.add_argument("--plan", default="", metavar="FICHIER",
+                        help="Avec --folder: écrire les corrections dans un lot de patchs "
+                             "(.jsonl ou .jsonl.gz) au lieu de modifier les notes")
+    parser.add_argument("--apply", default="", metavar="FICHIER",
+                        help="Appliquer un lot de patchs (notes modifiées depuis ignorées)")
+    parser.add_argument("--calibrate-tokens", action="store_true",
+                        help="Recalibrer le compte de tokens du modèle (gardé en cache sinon)")
+    profiling.add_arguments(parser, "correct_spelling.pstats")
+    args = parser.parse_args()
+
+    with profiling.session(args.profile, memory=args.profile_memory):
+        if args.apply:
+            code = run_apply(args)
+        elif args.folder is not None:
+            code = run_batch(args)
+        else:
+            run()
+            code = 0
+    sys.exit(code)
+
+
 if __name__ == "__main__":
     main()
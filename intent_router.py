@@ -0,0 +1,205 @@
+"""
+Routage direct des demandes simples vers un outil Obsidian, sans passer par les agents
+("liste les notes du dossier Projets", "lis la note X.md", "cherche 'budget'"...)
+"""
+import json
+import re
+from collections import namedtuple
+from typing import Optional
+
+Intent = namedtuple("Intent", "tool args")
+
+# Mots qui signalent une demande composée ou une action à confier aux agents
+_AGENT_WORDS = re.compile(
+    r"résum|synth|crée|créer|écri|modifi|ajout|supprim|renomm|réorganis|analys|"
+    r"compar|corrig|explique|pourquoi|comment|\bpuis\b|\bensuite\b|\bet\s+(?:les|la|le|en)\b",
+    re.IGNORECASE,
+)
+
+_QUOTED = r"[\"'«“]?\s*(?P<{name}>[^\"'»”]+?)\s*[\"'»”]?"
+_END = r"\s*[.?!]*\s*$"
+_PLEASE = r"(?:(?:peux-tu|pourrais-tu|merci de)\s+)?"
+
+_CONTAINING = (r"(?:qui\s+contiennent|contenant|qui\s+mentionnent|mentionnant|avec)\s+"
+               r"(?:le\s+mot\s+|le\s+texte\s+)?")
+
+_RULES = [
+    # Notes portant un tag
+    ("find_notes_by_tag", re.compile(
+        r"^" + _PLEASE + r"(?:liste[rz]?|affiche[rz]?|montre[rz]?|trouve[rz]?|quelles\s+sont)?(?:-moi)?\s*"
+        r"(?:toutes\s+)?(?:les\s+)?notes\s+(?:avec\s+le\s+tag|taguées|tagguées|portant\s+le\s+tag)\s+"
+        r"#?(?P<tag>[\w/-]+)" + _END, re.IGNORECASE)),
+    # Listage filtré par un texte: c'est une recherche
+    ("search_notes", re.compile(
+        r"^" + _PLEASE + r"(?:liste[rz]?|affiche[rz]?|montre[rz]?|donne[rz]?)(?:-moi)?\s+"
+        r"(?:toutes\s+)?(?:les\s+)?notes\s+" + _CONTAINING + _QUOTED.format(name="query")
+        + r"(?:\s+dans\s+le\s+dossier\s+" + _QUOTED.format(name="folder") + r")?" + _END,
+        re.IGNORECASE)),
+    # Listage d'un dossier ou de tout le vault
+    ("list_notes", re.compile(
+        r"^" + _PLEASE + r"(?:liste[rz]?|affiche[rz]?|montre[rz]?|donne[rz]?)(?:-moi)?\s+"
+        r"(?:toutes\s+)?(?:les\s+)?notes"
+        r"(?:\s+(?:du|de|dans(?:\s+le)?)\s+(?:dossier\s+)?" + _QUOTED.format(name="folder") + r")?"
+        + _END, re.IGNORECASE)),
+    # Liens entrants
+    ("get_backlinks", re.compile(
+        r"^" + _PLEASE + r"(?:quelles\s+notes\s+(?:pointent|renvoient|mènent)\s+vers|"
+        r"(?:liste[rz]?|affiche[rz]?|montre[rz]?)?(?:-moi)?\s*(?:les\s+)?(?:liens\s+entrants|backlinks)\s+(?:de|vers))\s+"
+        r"(?:la\s+note\s+)?" + _QUOTED.format(name="note_path") + _END, re.IGNORECASE)),
+    # Lecture d'une note
+    ("read_note", re.compile(
+        r"^" + _PLEASE + r"(?:lis|lire|affiche[rz]?|montre[rz]?|ouvre[rz]?|donne[rz]?)(?:-moi)?\s+"
+        r"(?:le\s+contenu\s+de\s+)?(?:la\s+)?note\s+" + _QUOTED.format(name="note_path") + _END,
+        re.IGNORECASE)),
+    # Recherche plein texte
+    ("search_notes", re.compile(
+        r"^" + _PLEASE + r"(?:cherche[rz]?|recherche[rz]?|trouve[rz]?)(?:-moi)?\s+"
+        r"(?:(?:les\s+)?notes\s+" + _CONTAINING + r"|dans\s+les\s+notes\s+)?"
+        + _QUOTED.format(name="query")
+        + r"(?:\s+dans\s+le\s+dossier\s+" + _QUOTED.format(name="folder") + r")?" + _END,
+        re.IGNORECASE)),
+]
+
+_LLM_PROMPT = """Classe la demande suivante sur un vault Obsidian.
+Réponds UNIQUEMENT en JSON: {{"tool": "...", "args": {{...}}}}
+Outils possibles:
+- list_notes: args {{"folder": "dossier ou vide"}}
+- read_note: args {{"note_path": "chemin/de/la/note.md"}}
+- search_notes: args {{"query": "texte exact", "folder": "dossier ou vide"}}
+- find_notes_by_tag: args {{"tag": "tag sans #"}}
+- none: la demande nécessite une analyse, une écriture ou plusieurs étapes
+
+Demande: {request}"""
+
+# Terme de recherche assez court pour être cherché tel quel sans guillemets
+_MAX_TERM_CHARS = 30
+
+_ALLOWED_ARGS = {
+    "list_notes": {"folder"},
+    "read_note": {"note_path"},
+    "search_notes": {"query", "folder"},
+    "find_notes_by_tag": {"tag"},
+}
+
+
+def _resolve_note(note_path: str, tools) -> Optional[str]:
+    """Retrouve une note par chemin, nom ou alias; None si introuvable."""
+    if tools is None:
+        return note_path if note_path.endswith(".md") else None
+    if (tools.vault_path / note_path).is_file():
+        return note_path
+    return tools.index.resolve(note_path)
+
+
+def _quoted(request: str, match, name: str) -> bool:
+    """Vrai si le groupe `name` de la demande est entre guillemets."""
+    before = request[:match.start(name)].rstrip()
+    after = request[match.end(name):].lstrip()
+    return before.endswith(("\"", "'", "«", "“")) and after.startswith(("\"", "'", "»", "”"))
+
+
+def _literal_query(query: str, quoted: bool) -> bool:
+    """
+    Vrai si la recherche peut être lancée telle quelle: texte entre guillemets
+    ou un seul terme court. Une phrase (« les notes qui parlent de python »)
+    ne correspondrait à rien en recherche exacte: elle va aux agents.
+    """
+    return quoted or (len(query.split()) == 1 and len(query) <= _MAX_TERM_CHARS)
+
+
+def _folder_exists(folder: str, tools) -> bool:
+    """Vrai si le dossier existe dans le vault (toujours faux sans outils pour vérifier)."""
+    if not folder:
+        return True
+    return tools is not None and (tools.vault_path / folder).is_dir()
+
+
+def route(user_request: str, tools=None) -> Optional[Intent]:
+    """
+    Reconnaît une demande directe par des règles.
+
+    Args:
+        user_request: Demande de l'utilisateur
+        tools: ObsidianTools, pour résoudre les noms de notes sans extension
+
+    Returns:
+        Intent(tool, args), ou None si la demande doit aller aux agents
+    """
+    request = " ".join(user_request.split())
+    if not request or _AGENT_WORDS.search(request):
+        return None
+
+    for tool, pattern in _RULES:
+        match = pattern.match(request)
+        if not match:
+            continue
+        args = {key: value.strip() for key, value in match.groupdict().items() if value}
+
+        # Arguments capturés par les règles génériques: seulement s'ils sont sûrs
+        if not _folder_exists(args.get("folder", ""), tools):
+            return None
+        if tool == "search_notes" and not _literal_query(args["query"], _quoted(request, match, "query")):
+            return None
+        if tool == "list_notes" and "folder" not in args:
+            args["folder"] = ""
+        if tool == "read_note":
+            note_path = _resolve_note(args["note_path"], tools)
+            if note_path is None:
+                return None
+            args["note_path"] = note_path
+        if tool == "get_backlinks" and tools is not None and tools.index.resolve(args["note_path"]) is None:
+            return None
+        return Intent(tool, args)
+
+    return None
+
+
+def classify_with_llm(user_request: str, model: str, tools=None, keep_alive=None) -> Optional[Intent]:
+    """
+    Classification par un petit modèle (un seul appel, sortie JSON).
+
+    Args:
+        user_request: Demande de l'utilisateur
+        model: Modèle Ollama léger (ex: 'qwen2.5:1.5b')
+        tools: ObsidianTools, pour vérifier les notes mentionnées
+        keep_alive: Durée de maintien en mémoire du routeur (défaut d'ollama_api)
+
+    Returns:
+        Intent, ou None si la demande doit aller aux agents
+    """
+    from ollama_api import DEFAULT_KEEP_ALIVE, OllamaError, request
+
+    try:
+        response = request("/api/generate", {
+            "model": model,
+            "prompt": _LLM_PROMPT.format(request=user_request),
+            "format": "json",
+            "stream": False,
+            "keep_alive": keep_alive or DEFAULT_KEEP_ALIVE,
+            "options": {"temperature": 0, "num_predict": 128},
+        }, timeout=30)
+        decision = json.loads(response.get("response", "{}"))
+    except (OllamaError, ValueError):
+        return None
+    # JSON valide mais pas un objet (liste, nombre...): décision inutilisable
+    if not isinstance(decision, dict):
+        return None
+
+    tool = decision.get("tool")
+    args = decision.get("args") or {}
+    if tool not in _ALLOWED_ARGS or not isinstance(args, dict):
+        return None
+    args = {k: str(v) for k, v in args.items() if k in _ALLOWED_ARGS[tool] and v is not None}
+
+    if tool == "read_note":
+        note_path = _resolve_note(args.get("note_path", ""), tools)
+        if not note_path:
+            return None
+        args["note_path"] = note_path
+    if tool == "search_notes" and not args.get("query"):
+        return None
+    if not _folder_exists(args.get("folder", ""), tools):
+        return None
+    if tool == "find_notes_by_tag" and not args.get("tag"):
+        return None
+    return Intent(tool, args)
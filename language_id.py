@@ -0,0 +1,177 @@
+"""
+Identification de la langue d'un segment (n-grammes de caractères, sans réseau)
+Sert à ne pas envoyer au correcteur français un passage en anglais
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+LANGUAGE_NAMES = {"fr": "français", "en": "anglais", "es": "espagnol", "de": "allemand"}
+
+# Textes d'apprentissage: mots et tournures fréquents de chaque langue
+_SAMPLES = {
+    "fr": """Je pense que c'est une bonne idée, mais il faut encore vérifier les détails avec
+    l'équipe avant la réunion de demain. Nous avons déjà travaillé sur ce projet pendant
+    plusieurs semaines et les résultats sont plutôt encourageants. Il reste à écrire la
+    documentation, à corriger les erreurs et à préparer la présentation pour les clients.
+    Quand on lit ces notes, on comprend pourquoi elles sont utiles: elles gardent une trace
+    de ce qui a été fait, des décisions prises et des questions qui n'ont pas encore de
+    réponse. Les tâches de la semaine sont dans le tableau, avec leur priorité et la personne
+    qui s'en occupe. Voici aussi quelques liens vers des articles intéressants sur le sujet.
+    Aujourd'hui j'ai lu un chapitre du livre, il était très bien écrit et assez court.
+    Problème: le script plante quand le fichier est trop gros. Solution: découper le texte
+    en plusieurs parties et traiter chaque morceau séparément. Ceci est un test de la
+    détection de langue sur des phrases courtes. Le système propose deux modes: un mode
+    simple pour les tâches directes et un mode complexe pour les analyses plus longues.
+    Pour installer le modèle, ouvrez un terminal et lancez la commande suivante, puis
+    vérifiez que le serveur répond. Si la correction change trop de choses, baissez la
+    température ou choisissez un autre modèle. Les sauvegardes prennent de la place: pensez
+    à supprimer les anciennes de temps en temps. Chaque note est lue, corrigée puis écrite
+    à nouveau, sans toucher aux liens, aux tags ni aux blocs de code. Étape suivante:
+    connecter votre dépôt local et pousser les modifications. Guide de démarrage rapide,
+    exemples pratiques et questions fréquentes. Configuration recommandée pour une machine
+    avec peu de mémoire. Mes notes de lecture du mois dernier, les idées à creuser et les
+    rendez-vous de la semaine prochaine. Nous devons aussi penser au budget, aux délais et
+    aux risques du projet, puis en parler avec le responsable. Utilisation de la mémoire,
+    temps de réponse et qualité des corrections: voici ce que nous avons mesuré.""",
+    "en": """I think this is a good idea, but we still need to check the details with the team
+    before tomorrow's meeting. We have already worked on this project for several weeks and
+    the results are quite encouraging. What remains is to write the documentation, fix the
+    bugs and prepare the presentation for the customers. When you read these notes, you
+    understand why they are useful: they keep track of what has been done, which decisions
+    were made and which questions do not have an answer yet. The tasks of the week are in
+    the table, with their priority and the person who is taking care of them. Here are also
+    a few links to interesting articles about the topic. Today I read a chapter of the book,
+    it was very well written and rather short. Problem: the script crashes when the file is
+    too large. Solution: split the text into several parts and process each chunk on its
+    own. This is a test of language detection on short sentences. The system offers two
+    modes: a simple mode for direct tasks and a complex mode for longer analyses. To install
+    the model, open a terminal and run the following command, then check that the server is
+    responding. If the correction changes too many things, lower the temperature or choose
+    another model. Backups take up space: remember to delete the old ones from time to time.
+    Each note is read, corrected and then written back, without touching links, tags or code
+    blocks. Next step: connect your local repository and push the changes. Quick start guide,
+    practical examples and frequently asked questions. Recommended setup for a machine with
+    little memory. My reading notes from last month, the ideas worth exploring and the
+    appointments for next week. We should also think about the budget, the deadlines and the
+    risks of the project, and then talk about it with the manager. Memory usage, response
+    time and quality of the corrections: here is what we have measured.""",
+    "es": """Creo que es una buena idea, pero todavía tenemos que revisar los detalles con el
+    equipo antes de la reunión de mañana. Ya hemos trabajado en este proyecto durante varias
+    semanas y los resultados son bastante alentadores. Falta escribir la documentación,
+    corregir los errores y preparar la presentación para los clientes. Cuando se leen estas
+    notas, se entiende por qué son útiles: guardan un registro de lo que se ha hecho, de las
+    decisiones tomadas y de las preguntas que aún no tienen respuesta. Las tareas de la semana
+    están en la tabla, con su prioridad y la persona que se ocupa de ellas. Hoy leí un
+    capítulo del libro, estaba muy bien escrito y era bastante corto. Problema: el programa
+    falla cuando el archivo es demasiado grande. Solución: dividir el texto en varias partes
+    y tratar cada fragmento por separado. Esto es una prueba de la detección del idioma en
+    frases cortas. El sistema ofrece dos modos: un modo sencillo para las tareas directas y
+    un modo complejo para los análisis más largos. Para instalar el modelo, abra una terminal
+    y ejecute el siguiente comando, luego compruebe que el servidor responde. Si la
+    corrección cambia demasiadas cosas, baje la temperatura o elija otro modelo. Las copias
+    de seguridad ocupan espacio: conviene borrar las antiguas de vez en cuando. Cada nota se
+    lee, se corrige y se vuelve a escribir, sin tocar los enlaces, las etiquetas ni los
+    bloques de código. Siguiente paso: conectar su repositorio local y subir los cambios.
+    Guía de inicio rápido, ejemplos prácticos y preguntas frecuentes. Configuración
+    recomendada para un equipo con poca memoria. Mis notas de lectura del mes pasado, las
+    ideas que hay que profundizar y las citas de la semana que viene. También debemos pensar
+    en el presupuesto, los plazos y los riesgos del proyecto, y después hablarlo con el
+    responsable. Uso de memoria, tiempo de respuesta y calidad de las correcciones: esto es
+    lo que hemos medido.""",
+    "de": """Ich denke, das ist eine gute Idee, aber wir müssen die Details noch vor dem Treffen
+    morgen mit dem Team prüfen. Wir haben schon mehrere Wochen an diesem Projekt gearbeitet und
+    die Ergebnisse sind ziemlich ermutigend. Es bleibt noch, die Dokumentation zu schreiben,
+    die Fehler zu beheben und die Präsentation für die Kunden vorzubereiten. Wenn man diese
+    Notizen liest, versteht man, warum sie nützlich sind: sie halten fest, was gemacht wurde,
+    welche Entscheidungen getroffen wurden und welche Fragen noch keine Antwort haben. Die
+    Aufgaben der Woche stehen in der Tabelle, mit ihrer Priorität und der Person, die sich
+    darum kümmert. Heute habe ich ein Kapitel des Buches gelesen, es war sehr gut geschrieben.
+    Problem: das Skript stürzt ab, wenn die Datei zu groß ist. Lösung: den Text in mehrere
+    Teile zerlegen und jedes Stück einzeln bearbeiten. Dies ist ein Test der
+    Spracherkennung mit kurzen Sätzen. Das System bietet zwei Modi: einen einfachen Modus für
+    direkte Aufgaben und einen komplexen Modus für längere Analysen. Um das Modell zu
+    installieren, öffnen Sie ein Terminal und führen Sie den folgenden Befehl aus, dann
+    prüfen Sie, ob der Server antwortet. Wenn die Korrektur zu viel verändert, senken Sie die
+    Temperatur oder wählen Sie ein anderes Modell. Sicherungskopien brauchen Platz: löschen
+    Sie die alten von Zeit zu Zeit. Jede Notiz wird gelesen, korrigiert und wieder
+    geschrieben, ohne Links, Tags oder Codeblöcke zu verändern. Nächster Schritt: verbinden
+    Sie Ihr lokales Repository und übertragen Sie die Änderungen. Schnellstart, praktische
+    Beispiele und häufige Fragen. Empfohlene Einstellungen für einen Rechner mit wenig
+    Speicher. Meine Lesenotizen vom letzten Monat, die Ideen, die es zu vertiefen gilt, und
+    die Termine der nächsten Woche. Wir sollten auch an das Budget, die Fristen und die
+    Risiken des Projekts denken und dann mit dem Verantwortlichen darüber sprechen.
+    Speicherverbrauch, Antwortzeit und Qualität der Korrekturen: das haben wir gemessen.""",
+}
+
+# Éléments Markdown sans valeur linguistique (code, liens, URLs, tags)
+_NOISE_RE = re.compile(r"`[^`]*`|!?\[\[[^\]]*\]\]|\]\([^)]*\)|https?://\S+|(?<!\w)#[\w/-]+")
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+_profiles: Optional[Dict[str, tuple]] = None
+
+
+def _ngrams(text: str) -> Counter:
+    """N-grammes de 1 à 3 caractères des mots (bornés par des espaces)."""
+    grams = Counter()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for n in (1, 2, 3):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+def _load_profiles() -> Dict[str, tuple]:
+    """Log-probabilités lissées des n-grammes de chaque langue (calculées une fois)."""
+    global _profiles
+    if _profiles is None:
+        _profiles = {}
+        for language, sample in _SAMPLES.items():
+            grams = _ngrams(sample)
+            total = sum(grams.values()) + len(grams) + 1
+            _profiles[language] = (
+                {gram: math.log((count + 1) / total) for gram, count in grams.items()},
+                math.log(1 / total),
+            )
+    return _profiles
+
+
+def detect(text: str, default: str = "fr", min_letters: int = 40,
+           preferred: Optional[Iterable[str]] = None, margin: float = 0.12) -> str:
+    """
+    Langue la plus probable d'un texte.
+
+    Les langues préférées (celles qu'on corrige) gardent l'avantage: une autre
+    langue ne l'emporte que si son score dépasse nettement le leur. Un titre ou
+    une ligne technique pleine d'anglicismes reste ainsi dans la langue du vault.
+
+    Args:
+        text: Segment Markdown
+        default: Langue retournée pour un texte trop court pour être fiable
+            (titre, élément de liste)
+        min_letters: Nombre minimal de lettres pour trancher
+        preferred: Langues favorisées (défaut: `default`)
+        margin: Écart minimal de log-probabilité par n-gramme pour écarter
+            les langues préférées
+
+    Returns:
+        Code de langue ('fr', 'en', 'es', 'de')
+    """
+    grams = _ngrams(_NOISE_RE.sub(" ", text))
+    if sum(count for gram, count in grams.items() if len(gram) == 1 and gram != " ") < min_letters:
+        return default
+
+    scores = {}
+    for language, (logprobs, unseen) in _load_profiles().items():
+        scores[language] = sum(count * logprobs.get(gram, unseen) for gram, count in grams.items())
+    best = max(scores, key=scores.get)
+
+    candidates = [language for language in (preferred or [default]) if language in scores]
+    if best in candidates or not candidates:
+        return best
+    favorite = max(candidates, key=scores.get)
+    if scores[best] - scores[favorite] < margin * sum(grams.values()):
+        return favorite
+    return best
@@ -0,0 +1,125 @@
+"""
+Cache persistant des réponses LLM pour rejouer les workflows d'agents
+Clé: modèle + options (llm_string de LangChain) + prompt complet + génération du
+vault si le prompt contient des résultats d'outils. Stockage SQLite, éviction LRU.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+from vault_index import iter_note_files, vault_cache_path
+
+
+class PersistentLLMCache(BaseCache):
+    """Cache LangChain sur disque, partagé entre les exécutions."""
+
+    def __init__(self, vault_path: str, path: Optional[str] = None, max_entries: int = 5000):
+        """
+        Ouvre (ou crée) le cache.
+
+        Args:
+            vault_path: Chemin vers le vault (pour l'empreinte des notes)
+            path: Fichier SQLite (défaut: ~/.cache/correcteur-obsidian/llm/<vault>-<empreinte>.sqlite,
+                hors du vault pour ne pas être synchronisé avec les notes)
+            max_entries: Nombre maximal d'entrées avant éviction des moins récentes
+        """
+        self.vault_path = Path(vault_path)
+        self.path = Path(path) if path else vault_cache_path(self.vault_path, "llm", ".sqlite")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Clé calculée au lookup, réutilisée par l'update qui suit un échec: la réponse
+        # est rangée sous l'état du vault qu'elle a vu, même s'il a changé entre-temps
+        self._pending_keys = {}
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used)")
+        self._db.commit()
+
+    def _vault_fingerprint(self, prompt: str) -> str:
+        """
+        Génération du vault: (chemin, mtime, taille) de toutes les notes.
+
+        Les résultats d'outils d'un prompt dépendent de notes qui n'y sont pas
+        toujours nommées (listages, recherches, notes créées depuis): toute
+        modification du vault invalide donc les réponses qui en dépendent.
+        Un prompt sans résultat d'outil ne dépend pas de l'état du vault.
+        """
+        if "Observation:" not in prompt:
+            return ""
+        digest = hashlib.sha256()
+        notes = sorted(
+            (path.relative_to(self.vault_path).as_posix(), stat.st_mtime_ns, stat.st_size)
+            for path, stat in iter_note_files(self.vault_path)
+        )
+        for note, mtime, size in notes:
+            digest.update(f"{note}:{mtime}:{size}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        payload = "\0".join((llm_string, prompt, self._vault_fingerprint(prompt)))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        """Retourne les générations mémorisées, ou None."""
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                if len(self._pending_keys) > 1000:  # appels en échec jamais complétés
+                    self._pending_keys.clear()
+                self._pending_keys[(prompt, llm_string)] = key
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return [Generation(text=text) for text in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        """Mémorise une réponse et évince les entrées les moins récemment utilisées."""
+        with self._lock:
+            key = self._pending_keys.pop((prompt, llm_string), None)
+        key = key or self._key(prompt, llm_string)
+        value = json.dumps([generation.text for generation in return_val])
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, last_used) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM entries ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._db.commit()
+
+    def clear(self, **kwargs) -> None:
+        """Vide le cache."""
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def report(self) -> str:
+        """Résumé lisible du taux de succès du cache."""
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        rate = self.hits / total if total else 0.0
+        return (f"🗃️  Cache LLM: {self.hits}/{total} réponse(s) rejouée(s) ({rate:.0%}), "
+                f"{entries} entrée(s) sur disque")
@@ -2,18 +2,23 @@
 """
 Script principal pour gérer les notes Obsidian avec CrewAI et Ollama
 """
+import argparse
+import json
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List
 from dotenv import load_dotenv
-from crewai import Crew, Process
 
-from obsidian_tools import (
-    ObsidianReadTool,
-    ObsidianWriteTool,
-    ObsidianListTool,
-    ObsidianSearchTool,
-)
+from obsidian_tools import ObsidianTools, create_agent_tools
+from tool_cache import SessionToolCache
+from intent_router import classify_with_llm, route
+from ollama_api import OllamaError, request as ollama_request
+from tracing import Tracer
+import profiling
 from agents_config import (
     ObsidianAgentsConfig,
     create_research_task,
@@ -25,7 +30,9 @@ from agents_config import (
 class ObsidianMultiAgent:
     """Système multi-agent pour gérer les notes Obsidian."""
 
-    def __init__(self, vault_path: str, main_model: str = "llama3.1:8b", tool_model: str = "llama3.1:8b"):
+    def __init__(self, vault_path: str, main_model: str = "llama3.1:8b", tool_model: str = "llama3.1:8b",
+                 router_model: str = "", research_branches: int = 1, tracer=None,
+                 reuse_agents: bool = False):
         """
         Initialise le système multi-agent.
 
@@ -33,8 +40,21 @@ class ObsidianMultiAgent:
             vault_path: Chemin vers le vault Obsidian
             main_model: Modèle Ollama pour la réflexion (défaut: llama3.1:8b)
             tool_model: Modèle Ollama pour les tool calls (défaut: llama3.1:8b)
+            router_model: Petit modèle optionnel pour classer les demandes
+                simples que les règles ne reconnaissent pas (vide = règles seules)
+            research_branches: Nombre de sous-recherches exécutées en parallèle
+                dans execute_complex_task (1 = un seul chercheur)
+            tracer: Tracer optionnel (tâches, étapes, appels LLM et outils)
+            reuse_agents: Si True, chaque thread garde ses agents et son cache
+                d'outils d'une demande à l'autre (mode lot)
         """
         self.vault_path = Path(vault_path).resolve()
+        self.router_model = router_model
+        self.research_branches = max(int(research_branches), 1)
+        self.tracer = tracer
+        self.reuse_agents = reuse_agents
+        # Session, tools et agents propres à chaque thread (demandes en parallèle)
+        self._local = threading.local()
 
         if not self.vault_path.exists():
             raise ValueError(f"Le vault Obsidian n'existe pas: {self.vault_path}")
@@ -43,17 +63,187 @@ class ObsidianMultiAgent:
         print(f"🧠 Modèle principal: {main_model}")
         print(f"🔧 Modèle tool calls: {tool_model}\n")
 
-        # Initialiser les outils
-        self.read_tool = ObsidianReadTool(vault_path=str(self.vault_path))
-        self.write_tool = ObsidianWriteTool(vault_path=str(self.vault_path))
-        self.list_tool = ObsidianListTool(vault_path=str(self.vault_path))
-        self.search_tool = ObsidianSearchTool(vault_path=str(self.vault_path))
+        # Initialiser les outils (index du graphe et index sémantique partagés)
+        self.tools = ObsidianTools(str(self.vault_path))
 
         # Configurer les agents
         self.config = ObsidianAgentsConfig(
             vault_path=str(self.vault_path),
             main_model=main_model,
             tool_model=tool_model,
+            tracer=tracer,
+        )
+
+    # Outils du chercheur: lecture, recherche et graphe (liens, tags, propriétés)
+    RESEARCH_TOOLS = [
+        "read_note", "list_notes", "search_notes", "semantic_search",
+        "get_backlinks", "get_outlinks", "find_notes_by_tag",
+        "find_notes_by_property", "find_orphan_notes",
+    ]
+    EDITOR_TOOLS = ["write_note", "read_note"]
+
+    @property
+    def session(self):
+        """Cache d'outils de l'exécution en cours sur ce thread."""
+        return getattr(self._local, "session", None)
+
+    def _session_tools(self) -> dict:
+        """
+        Crée les tools d'une exécution, avec un cache partagé par tous ses agents.
+
+        Avec reuse_agents, le cache et les tools du thread sont conservés: les
+        lectures restent valides tant que la note n'a pas changé (mtime/taille).
+
+        Returns:
+            Dict nom -> tool
+        """
+        if self.reuse_agents and getattr(self._local, "tools", None) is not None:
+            return self._local.tools
+        self._local.session = SessionToolCache(self.tools)
+        self._local.tools = create_agent_tools(self._local.session, tracer=self.tracer)
+        self._local.agents = {}
+        return self._local.tools
+
+    def _agent(self, name: str, factory, **kwargs):
+        """Agent créé par `factory`, réutilisé sur ce thread si reuse_agents."""
+        if not self.reuse_agents:
+            return factory(**kwargs)
+        agents = self._local.agents
+        if name not in agents:
+            agents[name] = factory(**kwargs)
+        return agents[name]
+
+    def _print_session_stats(self) -> None:
+        """Affiche l'efficacité des caches (outils, réponses LLM) de la dernière exécution."""
+        stats = self.session.stats()
+        if stats["hits"] or stats["misses"]:
+            print(f"\n🗃️  Cache des outils: {stats['hits']} appel(s) évité(s) sur "
+                  f"{stats['hits'] + stats['misses']} ({stats['hit_rate']:.0%})")
+        if self.config.llm_cache is not None:
+            print(self.config.llm_cache.report())
+
+    def _kickoff(self, crew, name: str):
+        """Lance un crew, avec un span par tâche si le traçage est actif."""
+        if self.tracer is None:
+            return crew.kickoff()
+        for task in crew.tasks:
+            summary = " ".join(task.description.split())[:60]
+            task.callback = self.tracer.task_callback(f"{task.agent.role}: {summary}")
+        self.tracer.begin_tasks()
+        with self.tracer.span(name, "crew", tasks=len(crew.tasks)):
+            return crew.kickoff()
+
+    def _call_tool(self, tools, intent):
+        """Appel direct d'un outil (routage sans agent), tracé comme les autres."""
+        method = getattr(tools, intent.tool)
+        if profiling.active() is not None:
+            method = profiling.active().wrap("tool", method)
+        if self.tracer is not None:
+            method = self.tracer.wrap_tool(intent.tool, method)
+        return method(**intent.args)
+
+    def _research_task(self, agent, query: str):
+        """Crée la tâche de recherche d'un chercheur."""
+        from crewai import Task
+
+        return Task(
+            description=f"""Recherche toutes les informations pertinentes dans le vault Obsidian pour: {query}
+
+            Utilise les outils pour:
+            1. Lister les notes pertinentes
+            2. Rechercher par le sens (semantic_search) plutôt que de deviner des mots-clés,
+               ou par tag, propriété, liens entrants/sortants
+            3. Lire le contenu des notes importantes
+
+            Fournis un résumé complet de ce que tu trouves.""",
+            agent=agent,
+            expected_output="Résumé des notes et informations trouvées"
+        )
+
+    def _plan_research(self, user_request: str) -> List[str]:
+        """
+        Découpe une demande en sous-recherches indépendantes.
+
+        Règle d'abord: un dossier du vault cité = une branche. Sinon, un seul
+        appel au modèle principal propose un découpage par sujet.
+
+        Returns:
+            Liste des sous-requêtes (une seule si la demande ne se découpe pas)
+        """
+        if self.research_branches <= 1:
+            return [user_request]
+
+        folders = [
+            entry.name for entry in sorted(self.vault_path.iterdir())
+            if entry.is_dir() and not entry.name.startswith(".")
+            and re.search(rf"\b{re.escape(entry.name)}\b", user_request, re.IGNORECASE)
+        ]
+        if len(folders) > 1:
+            return [f"{user_request}\n\n(Limite ta recherche au dossier '{folder}'.)"
+                    for folder in folders]
+
+        try:
+            response = ollama_request("/api/generate", {
+                "model": self.config.main_model,
+                "prompt": (
+                    "Découpe cette demande en sous-recherches indépendantes (sujets ou "
+                    "dossiers distincts) à mener dans un vault Obsidian. Réponds UNIQUEMENT "
+                    'en JSON: {"sous_recherches": ["...", "..."]}. Si la demande ne porte '
+                    "que sur un seul sujet, retourne un seul élément.\n\n"
+                    f"Demande: {user_request}"
+                ),
+                "format": "json",
+                "stream": False,
+                "keep_alive": self.config.keep_alive,
+                "options": {"temperature": 0, "num_predict": 256},
+            }, timeout=120)
+            queries = json.loads(response.get("response", "{}")).get("sous_recherches", [])
+        except (OllamaError, ValueError, AttributeError):
+            return [user_request]
+
+        # Réponse mal formée (chaîne seule, objets, éléments vides): une seule branche
+        if not isinstance(queries, list) or not all(isinstance(q, str) and q.strip() for q in queries):
+            return [user_request]
+        queries = [q.strip() for q in queries][:2 * self.research_branches]
+        return queries if len(queries) > 1 else [user_request]
+
+    def _parallel_research(self, queries: List[str], tools: dict) -> str:
+        """
+        Exécute les sous-recherches en parallèle et fusionne leurs résumés.
+
+        Les sous-requêtes directes (lister, lire, chercher) sont exécutées par
+        l'outil correspondant; les autres par un chercheur dédié par branche.
+        """
+        from crewai import Crew, Process
+
+        session = self.session  # Les branches tournent sur d'autres threads
+
+        def run_branch(query: str) -> str:
+            try:
+                intent = route(query, tools=self.tools)
+                if intent is not None:
+                    return self._call_tool(session, intent)
+
+                researcher = self.config.create_researcher_agent(
+                    tools=[tools[name] for name in self.RESEARCH_TOOLS]
+                )
+                crew = Crew(
+                    agents=[researcher],
+                    tasks=[self._research_task(researcher, query)],
+                    process=Process.sequential,
+                    verbose=True,
+                )
+                return str(self._kickoff(crew, "recherche parallèle"))
+            except Exception as e:
+                return f"Erreur lors de cette recherche: {e}"
+
+        print(f"🔀 Recherche en {len(queries)} branche(s), {min(self.research_branches, len(queries))} en parallèle")
+        with ThreadPoolExecutor(max_workers=min(self.research_branches, len(queries))) as executor:
+            results = list(executor.map(run_branch, queries))
+
+        return "\n\n".join(
+            f"### Recherche {i}: {query}\n{result}"
+            for i, (query, result) in enumerate(zip(queries, results), 1)
         )
 
     def execute_simple_task(self, user_request: str):
@@ -64,14 +254,24 @@ class ObsidianMultiAgent:
         Args:
             user_request: La demande de l'utilisateur
         """
+        # Demandes directes (lister, lire, chercher): appel d'outil sans LLM
+        intent = route(user_request, tools=self.tools)
+        if intent is None and self.router_model:
+            intent = classify_with_llm(user_request, self.router_model, tools=self.tools,
+                                       keep_alive=self.config.keep_alive)
+        if intent is not None:
+            print(f"⚡ Routage direct: {intent.tool}({intent.args})\n")
+            return self._call_tool(self.tools, intent)
+
         print("🚀 Mode simple - Exécution avec agent unique\n")
 
         # Créer l'agent chercheur avec tous les outils
-        all_tools = [self.read_tool, self.write_tool, self.list_tool, self.search_tool]
-        researcher = self.config.create_researcher_agent(tools=all_tools)
+        tools = self._session_tools()
+        researcher = self._agent("chercheur", self.config.create_researcher_agent,
+                                 tools=list(tools.values()))
 
         # Créer une tâche simple
-        from crewai import Task
+        from crewai import Crew, Process, Task
         task = Task(
             description=user_request,
             agent=researcher,
@@ -86,7 +286,8 @@ class ObsidianMultiAgent:
             verbose=True,
         )
 
-        result = crew.kickoff()
+        result = self._kickoff(crew, "tâche simple")
+        self._print_session_stats()
         return result
 
     def execute_complex_task(self, user_request: str):
@@ -99,31 +300,31 @@ class ObsidianMultiAgent:
         """
         print("🚀 Mode complexe - Workflow multi-agents\n")
 
-        # Créer les agents
-        researcher = self.config.create_researcher_agent(
-            tools=[self.read_tool, self.list_tool, self.search_tool]
-        )
-        analyst = self.config.create_analyst_agent()
-        editor = self.config.create_editor_agent(
-            tools=[self.write_tool, self.read_tool]
-        )
+        # Créer les agents (un seul cache d'outils pour toute la session)
+        tools = self._session_tools()
+        analyst = self._agent("analyste", self.config.create_analyst_agent)
+        editor = self._agent("éditeur", self.config.create_editor_agent,
+                             tools=[tools[name] for name in self.EDITOR_TOOLS])
 
         # Créer les tâches
-        from crewai import Task
-
-        # Tâche 1: Recherche
-        research_task = Task(
-            description=f"""Recherche toutes les informations pertinentes dans le vault Obsidian pour: {user_request}
-
-            Utilise les outils pour:
-            1. Lister les notes pertinentes
-            2. Rechercher des mots-clés
-            3. Lire le contenu des notes importantes
-
-            Fournis un résumé complet de ce que tu trouves.""",
-            agent=researcher,
-            expected_output="Résumé des notes et informations trouvées"
-        )
+        from crewai import Crew, Process, Task
+
+        # Tâche 1: Recherche (découpée en branches parallèles si possible)
+        queries = self._plan_research(user_request)
+        if len(queries) > 1:
+            if self.tracer is not None:
+                with self.tracer.span("recherche parallèle", "crew", branches=len(queries)):
+                    research = self._parallel_research(queries, tools)
+            else:
+                research = self._parallel_research(queries, tools)
+            research_context = "\n\n            Résultats de la recherche:\n" + research
+            research_tasks, research_agents = [], []
+        else:
+            researcher = self._agent("chercheur (recherche)", self.config.create_researcher_agent,
+                                     tools=[tools[name] for name in self.RESEARCH_TOOLS])
+            research_context = ""
+            research_tasks = [self._research_task(researcher, user_request)]
+            research_agents = [researcher]
 
         # Tâche 2: Analyse
         analysis_task = Task(
@@ -134,10 +335,10 @@ class ObsidianMultiAgent:
             2. Quel contenu ajouter ou modifier
             3. L'ordre des opérations
 
-            Sois précis et détaillé dans tes recommandations.""",
+            Sois précis et détaillé dans tes recommandations.{research_context}""",
             agent=analyst,
             expected_output="Plan d'action détaillé pour les modifications",
-            context=[research_task]
+            context=research_tasks or None
         )
 
         # Tâche 3: Édition
@@ -157,24 +358,28 @@ class ObsidianMultiAgent:
 
         # Créer et exécuter le crew
         crew = Crew(
-            agents=[researcher, analyst, editor],
-            tasks=[research_task, analysis_task, editing_task],
+            agents=research_agents + [analyst, editor],
+            tasks=research_tasks + [analysis_task, editing_task],
             process=Process.sequential,
             verbose=True,
         )
 
-        result = crew.kickoff()
+        result = self._kickoff(crew, "tâche complexe")
+        self._print_session_stats()
         return result
 
 
-def main():
-    """Point d'entrée principal."""
+def run():
+    """Menu interactif."""
     load_dotenv()
 
     # Configuration
     VAULT_PATH = os.getenv("OBSIDIAN_VAULT_PATH", "")
     MAIN_MODEL = os.getenv("MAIN_MODEL", "llama3.1:8b")
     TOOL_MODEL = os.getenv("TOOL_MODEL", "llama3.1:8b")
+    ROUTER_MODEL = os.getenv("ROUTER_MODEL", "")
+    RESEARCH_BRANCHES = int(os.getenv("RESEARCH_BRANCHES", "1"))
+    tracer = Tracer.from_env()
 
     if not VAULT_PATH:
         print("❌ Erreur: Veuillez définir OBSIDIAN_VAULT_PATH dans le fichier .env")
@@ -190,7 +395,13 @@ def main():
             vault_path=VAULT_PATH,
             main_model=MAIN_MODEL,
             tool_model=TOOL_MODEL,
+            router_model=ROUTER_MODEL,
+            research_branches=RESEARCH_BRANCHES,
+            tracer=tracer,
         )
+        system.config.warm_up()
+        if tracer is not None:
+            print(f"🧵 Traces: {tracer.path}")
 
         # Menu interactif
         while True:
@@ -239,6 +450,19 @@ def main():
     except Exception as e:
         print(f"\n❌ Erreur d'initialisation: {e}")
         sys.exit(1)
+    finally:
+        if tracer is not None:
+            tracer.close()
+
+
+def main():
+    """Point d'entrée principal."""
+    parser = argparse.ArgumentParser(description="Gestion des notes Obsidian par une équipe d'agents")
+    profiling.add_arguments(parser, "main.pstats")
+    args = parser.parse_args()
+
+    with profiling.session(args.profile, memory=args.profile_memory):
+        run()
 
 
 if __name__ == "__main__":
@@ -2,18 +2,41 @@
 """
 Version simplifiée compatible avec CrewAI 0.11.2
 Système multi-agent pour gérer les notes Obsidian
+
+Usage direct, sans menu (démarrage rapide pour scripts et hooks d'éditeur):
+    python main_simple.py list [dossier]
+    python main_simple.py search "texte" [--folder dossier]
+    python main_simple.py read chemin/de/la/note.md
 """
+import argparse
 import os
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew, Process
-from langchain_community.llms import Ollama
 from obsidian_tools import ObsidianTools
 
 
+def parse_args(argv=None):
+    """Arguments de la ligne de commande (aucun = menu interactif)."""
+    parser = argparse.ArgumentParser(description="Gestion simple des notes Obsidian")
+    commands = parser.add_subparsers(dest="command")
+
+    list_parser = commands.add_parser("list", help="Lister les notes")
+    list_parser.add_argument("folder", nargs="?", default="", help="Dossier (défaut: tout le vault)")
+
+    search_parser = commands.add_parser("search", help="Rechercher dans les notes")
+    search_parser.add_argument("query", help="Texte à rechercher")
+    search_parser.add_argument("--folder", default="", help="Limiter à un dossier")
+
+    read_parser = commands.add_parser("read", help="Lire une note")
+    read_parser.add_argument("note_path", help="Chemin relatif de la note")
+
+    return parser.parse_args(argv)
+
+
 def main():
     """Point d'entrée principal."""
+    args = parse_args()
     load_dotenv()
 
     # Configuration
@@ -30,6 +53,17 @@ def main():
         print(f"❌ Erreur: Le vault n'existe pas: {vault_path}")
         sys.exit(1)
 
+    # Commande directe: pas de bannière ni de menu
+    if args.command:
+        tools = ObsidianTools(str(vault_path))
+        if args.command == "list":
+            print(tools.list_notes(folder=args.folder))
+        elif args.command == "search":
+            print(tools.search_notes(query=args.query, folder=args.folder))
+        else:
+            print(tools.read_note(note_path=args.note_path))
+        return
+
     print("=" * 70)
     print("🤖 Correcteur-obsidian System (Version Simplifiée)")
     print("=" * 70)
@@ -37,16 +71,9 @@ def main():
     print(f"🧠 Modèle: {MODEL}")
     print("=" * 70)
 
-    # Initialiser les outils
+    # Initialiser les outils (le menu n'utilise pas de LLM)
     tools = ObsidianTools(str(vault_path))
 
-    # Initialiser le LLM
-    llm = Ollama(
-        model=MODEL,
-        base_url="http://localhost:11434",
-        temperature=0.7,
-    )
-
     # Menu interactif
     while True:
         print("\nQue voulez-vous faire ?")
@@ -0,0 +1,149 @@
+"""
+Découpage d'une note Markdown en segments (texte, code, frontmatter, lignes vides)
+Seuls les segments de texte sont envoyés au modèle; le reste est conservé tel quel
+"""
+from collections import namedtuple
+from typing import List, Sequence
+
+Segment = namedtuple("Segment", "start end kind")
+
+# Types de segments
+TEXT = "text"
+CODE = "code"
+FRONTMATTER = "frontmatter"
+BLANK = "blank"
+
+
+def split_segments(text: str, max_chars: int = 2000) -> List[Segment]:
+    """
+    Découpe un texte en segments contigus qui couvrent tout le texte.
+
+    Args:
+        text: Contenu de la note
+        max_chars: Taille cible des segments de texte; les paragraphes voisins
+            sont regroupés tant que cette taille n'est pas dépassée
+            (0 = un segment par paragraphe)
+
+    Returns:
+        Liste de Segment(start, end, kind) en indices de caractères
+    """
+    lines = text.splitlines(keepends=True)
+    segments: List[Segment] = []
+    pos = 0
+    i = 0
+
+    # Frontmatter YAML en tête de note
+    if lines and lines[0].rstrip("\r\n") == "---":
+        for j in range(1, len(lines)):
+            if lines[j].rstrip("\r\n") in ("---", "..."):
+                end = sum(len(line) for line in lines[:j + 1])
+                segments.append(Segment(0, end, FRONTMATTER))
+                pos, i = end, j + 1
+                break
+
+    fence = None
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if fence is not None:
+            kind = CODE
+            if stripped.startswith(fence):
+                fence = None
+        elif stripped.startswith(("```", "~~~")):
+            kind = CODE
+            fence = stripped[:3]
+        elif stripped == "$$":
+            kind = CODE
+            fence = "$$"
+        elif not stripped:
+            kind = BLANK
+        else:
+            kind = TEXT
+
+        end = pos + len(line)
+        if segments and segments[-1].kind == kind and segments[-1].end == pos:
+            segments[-1] = Segment(segments[-1].start, end, kind)
+        else:
+            segments.append(Segment(pos, end, kind))
+        pos = end
+        i += 1
+
+    if max_chars > 0:
+        segments = _merge_text(segments, max_chars)
+    return segments
+
+
+def _merge_text(segments: List[Segment], max_chars: int) -> List[Segment]:
+    """Regroupe les paragraphes séparés par des lignes vides jusqu'à max_chars."""
+    merged: List[Segment] = []
+    for segment in segments:
+        if (segment.kind == TEXT and len(merged) >= 2
+                and merged[-1].kind == BLANK and merged[-2].kind == TEXT
+                and segment.end - merged[-2].start <= max_chars):
+            merged[-2:] = [Segment(merged[-2].start, segment.end, TEXT)]
+        else:
+            merged.append(segment)
+    return merged
+
+
+def newline_style(text: str) -> str:
+    """Fin de ligne dominante d'un texte ('\\r\\n' ou '\\n')."""
+    return "\r\n" if text.count("\r\n") * 2 > text.count("\n") else "\n"
+
+
+def normalize(text: str) -> str:
+    """
+    Forme canonique d'un texte pour détecter les vrais changements.
+
+    Ignore les fins de ligne (CRLF/LF), les espaces en fin de ligne
+    et les lignes vides au début et à la fin.
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def with_newlines(text: str, newline: str) -> str:
+    """Convertit les fins de ligne d'un texte (ex: réponse du modèle) vers `newline`."""
+    text = text.replace("\r\n", "\n")
+    return text if newline == "\n" else text.replace("\n", newline)
+
+
+def overlaps(segment: Segment, ranges: Sequence[tuple]) -> bool:
+    """Indique si un segment chevauche au moins une des plages (début, fin)."""
+    return any(start < segment.end and segment.start < end for start, end in ranges)
+
+
+def changed_ranges(old: str, new: str) -> List[tuple]:
+    """
+    Calcule les plages de caractères du nouveau texte qui diffèrent de l'ancien.
+
+    Args:
+        old: Version précédente
+        new: Version actuelle
+
+    Returns:
+        Liste de (début, fin) dans `new`, à la granularité de la ligne
+    """
+    import difflib
+
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    offsets = [0]
+    for line in new_lines:
+        offsets.append(offsets[-1] + len(line))
+
+    ranges = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if j1 == j2:
+            # Suppression pure: on marque les lignes qui l'entourent
+            start = offsets[max(j1 - 1, 0)]
+            end = offsets[min(j1 + 1, len(new_lines))]
+        else:
+            start, end = offsets[j1], offsets[j2]
+        ranges.append((start, max(end, start + 1)))
+    return ranges
+
@@ -3,8 +3,122 @@ Outils pour interagir avec les notes Obsidian
 Version simplifiée compatible avec CrewAI 0.11.2
 """
 import os
+import re
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from atomic_write import AtomicWriter, WriteConflict, read_note
+from token_estimate import estimator_for
+
+# Budget de tokens par défaut d'une réponse d'outil (pour ne pas saturer le contexte des agents)
+TOOL_OUTPUT_TOKENS = int(os.getenv("TOOL_OUTPUT_TOKENS", "2000"))
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+# Un verrou par note: les écritures concurrentes (agents en parallèle) sont sérialisées
+_NOTE_LOCKS = {}
+_NOTE_LOCKS_GUARD = threading.Lock()
+
+
+def note_lock(path: Path) -> threading.Lock:
+    """Verrou partagé par tous les threads qui écrivent la même note."""
+    key = Path(path).resolve().as_posix()
+    with _NOTE_LOCKS_GUARD:
+        return _NOTE_LOCKS.setdefault(key, threading.Lock())
+
+
+def _tool_estimator():
+    """Estimateur de tokens du modèle des agents (à récupérer une fois par réponse)."""
+    return estimator_for(os.getenv("TOOL_MODEL", "llama3.1:8b"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Nombre de tokens estimé d'un texte pour le modèle des agents (calibré, sans réseau)."""
+    return _tool_estimator().count(text)
+
+
+def _fit_lines(lines: List[str], budget: int) -> int:
+    """Nombre de lignes (au moins une) qui tiennent dans un budget de tokens."""
+    count = _tool_estimator().count
+    used = 0
+    for i, line in enumerate(lines):
+        used += count(line) + 1
+        if used > budget and i > 0:
+            return i
+    return len(lines)
+
+
+def _find_section(lines: List[str], title: str) -> Optional[tuple]:
+    """
+    Trouve une section par son titre.
+
+    Returns:
+        (première ligne, dernière ligne) en numéros à partir de 1, ou None
+    """
+    wanted = title.strip().lstrip("#").strip().lower()
+    for i, line in enumerate(lines):
+        match = _HEADING_RE.match(line)
+        if match and match.group(2).lower() == wanted:
+            level = len(match.group(1))
+            for j in range(i + 1, len(lines)):
+                other = _HEADING_RE.match(lines[j])
+                if other and len(other.group(1)) <= level:
+                    return i + 1, j
+            return i + 1, len(lines)
+    return None
+
+
+def _folder_tree(notes: List[str]) -> List[str]:
+    """Arborescence repliée: une ligne par dossier avec son nombre de notes (récursif)."""
+    counts = {}
+    for note in notes:
+        parts = Path(note).parts[:-1]
+        counts[""] = counts.get("", 0) + 1
+        for depth in range(1, len(parts) + 1):
+            key = "/".join(parts[:depth])
+            counts[key] = counts.get(key, 0) + 1
+
+    entries = []
+    for folder in sorted(counts):
+        if not folder:
+            continue
+        depth = folder.count("/")
+        entries.append(f"{'  ' * depth}- {Path(folder).name}/ ({counts[folder]} notes)")
+    root_notes = sum(1 for note in notes if len(Path(note).parts) == 1)
+    if root_notes:
+        entries.insert(0, f"- ./ ({root_notes} notes à la racine)")
+    return entries
+
+
+def _paginate(title: str, entries: List[str], offset: int, limit: int, separator: str) -> str:
+    """
+    Formate une page d'entrées, bornée par `limit` et par TOOL_OUTPUT_TOKENS.
+
+    Un marqueur indique l'offset à utiliser pour la suite.
+    """
+    offset = max(offset, 0)
+    if entries and offset >= len(entries):
+        return f"{title}: aucune entrée à partir de offset={offset} (total {len(entries)})."
+    page = entries[offset:offset + limit] if limit > 0 else entries[offset:]
+
+    count = _tool_estimator().count
+    used, shown = count(title), 0
+    for entry in page:
+        used += count(entry) + 1
+        if used > TOOL_OUTPUT_TOKENS and shown > 0:
+            break
+        shown += 1
+
+    if offset == 0 and shown == len(entries):
+        return f"{title}:\n\n" + separator.join(entries)
+
+    result = f"{title}, affichées {offset + 1}-{offset + shown}:\n\n"
+    result += separator.join(page[:shown])
+    remaining = len(entries) - offset - shown
+    if remaining > 0:
+        result += f"\n\n[... {remaining} de plus. Suite: offset={offset + shown}]"
+    return result
 
 
 class ObsidianTools:
@@ -18,13 +132,43 @@ class ObsidianTools:
             vault_path: Chemin absolu vers le vault Obsidian
         """
         self.vault_path = Path(vault_path)
-
-    def read_note(self, note_path: str) -> str:
+        self._index = None
+        self._semantic_index = None
+        # Les index sont créés au premier usage, parfois par plusieurs threads à la fois
+        self._index_lock = threading.Lock()
+        self._writer = AtomicWriter()
+        self._read_stamps = {}   # note -> état lu (une note modifiée depuis n'est pas écrasée)
+
+    @property
+    def index(self):
+        """Index du graphe du vault (construit au premier usage)."""
+        with self._index_lock:
+            if self._index is None:
+                from vault_index import VaultIndex
+                self._index = VaultIndex(str(self.vault_path))
+            return self._index
+
+    @property
+    def semantic_index(self):
+        """Index sémantique (embeddings Ollama), chargé au premier usage."""
+        with self._index_lock:
+            if self._semantic_index is None:
+                from semantic_index import SemanticIndex
+                model = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+                self._semantic_index = SemanticIndex(str(self.vault_path), model=model)
+            return self._semantic_index
+
+    def read_note(self, note_path: str, start_line: int = 1, end_line: int = 0,
+                  section: str = "", max_tokens: int = 0) -> str:
         """
-        Lit le contenu d'une note Obsidian.
+        Lit le contenu d'une note Obsidian (entière, par section ou par lignes).
 
         Args:
             note_path: Chemin relatif de la note depuis le vault
+            start_line: Première ligne à lire (à partir de 1)
+            end_line: Dernière ligne à lire (0 pour aller jusqu'à la fin)
+            section: Titre d'une section à lire (ex: 'Objectifs'), sans les '#'
+            max_tokens: Budget de tokens de la réponse (0 = TOOL_OUTPUT_TOKENS)
 
         Returns:
             Contenu de la note ou message d'erreur
@@ -35,11 +179,41 @@ class ObsidianTools:
             return f"Erreur: La note '{note_path}' n'existe pas dans le vault."
 
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return f"Contenu de {note_path}:\n\n{content}"
+            content, self._read_stamps[note_path] = read_note(full_path)
         except Exception as e:
             return f"Erreur lors de la lecture de {note_path}: {str(e)}"
+        content = content.replace('\r\n', '\n')
+
+        lines = content.splitlines()
+        first, last = max(int(start_line), 1), int(end_line) or len(lines)
+
+        if section:
+            bounds = _find_section(lines, section)
+            if bounds is None:
+                return f"Erreur: Aucune section '{section}' dans {note_path}."
+            first, last = bounds
+
+        last = min(last, len(lines))
+        budget = int(max_tokens) or TOOL_OUTPUT_TOKENS
+        shown = _fit_lines(lines[first - 1:last], budget)
+
+        # Note entière qui tient dans le budget: sortie inchangée
+        if first == 1 and last == len(lines) and shown == last:
+            return f"Contenu de {note_path}:\n\n{content}"
+
+        # Intervalle vide (start_line après la fin, end_line avant start_line)
+        if first > last:
+            if first > len(lines):
+                return (f"Contenu de {note_path}: aucune ligne à partir de la ligne {first} "
+                        f"(la note compte {len(lines)} ligne(s)).")
+            return f"Contenu de {note_path}: aucune ligne (intervalle {first}-{last} vide)."
+
+        result = f"Contenu de {note_path} (lignes {first}-{first + shown - 1} sur {len(lines)}):\n\n"
+        result += "\n".join(lines[first - 1:first - 1 + shown])
+        if first + shown - 1 < last:
+            result += (f"\n\n[... {last - first - shown + 1} ligne(s) restante(s). "
+                       f"Suite: start_line={first + shown}]")
+        return result
 
     def write_note(self, note_path: str, content: str, append: bool = False) -> str:
         """
@@ -59,24 +233,39 @@ class ObsidianTools:
         full_path.parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            mode = 'a' if append else 'w'
-            with open(full_path, mode, encoding='utf-8') as f:
+            with note_lock(full_path):
                 if append and full_path.exists():
-                    f.write('\n\n')
-                f.write(content)
+                    current, stamp = read_note(full_path)
+                    self._writer.write(full_path, current + '\n\n' + content, expected=stamp)
+                else:
+                    # Remplacement refusé si la note a changé depuis que l'agent l'a lue
+                    self._writer.write(full_path, content,
+                                       expected=self._read_stamps.get(note_path))
+                self._read_stamps.pop(note_path, None)
+
+                if self._index is not None:
+                    self._index.update_note(note_path)
 
             action = "ajouté à" if append else "écrit dans"
             return f"Succès: Contenu {action} {note_path}"
+        except WriteConflict:
+            self._read_stamps.pop(note_path, None)
+            return (f"Erreur: {note_path} a été modifiée depuis sa lecture. "
+                    f"Relisez-la avant de l'écrire.")
         except Exception as e:
             return f"Erreur lors de l'écriture dans {note_path}: {str(e)}"
 
-    def list_notes(self, folder: str = "", pattern: str = "*.md") -> str:
+    def list_notes(self, folder: str = "", pattern: str = "*.md", offset: int = 0,
+                   limit: int = 100, tree: bool = False) -> str:
         """
         Liste toutes les notes dans le vault ou un dossier spécifique.
 
         Args:
             folder: Sous-dossier à lister (vide pour la racine)
             pattern: Pattern de fichiers (ex: '*.md')
+            offset: Nombre d'entrées à sauter (pagination)
+            limit: Nombre maximal d'entrées retournées
+            tree: Si True, retourne l'arborescence des dossiers avec le nombre de notes
 
         Returns:
             Liste des notes trouvées
@@ -95,19 +284,27 @@ class ObsidianTools:
             relative_notes = [str(note.relative_to(self.vault_path)) for note in notes]
             relative_notes.sort()
 
-            result = f"Notes trouvées ({len(relative_notes)}):\n\n"
-            result += "\n".join(f"- {note}" for note in relative_notes)
-            return result
+            if tree:
+                entries = _folder_tree(relative_notes)
+                title = f"Arborescence ({len(relative_notes)} notes)"
+            else:
+                entries = [f"- {note}" for note in relative_notes]
+                title = f"Notes trouvées ({len(relative_notes)})"
+
+            return _paginate(title, entries, int(offset), int(limit), "\n")
         except Exception as e:
             return f"Erreur lors du listage: {str(e)}"
 
-    def search_notes(self, query: str, folder: str = "") -> str:
+    def search_notes(self, query: str, folder: str = "", offset: int = 0,
+                     limit: int = 20) -> str:
         """
         Recherche un texte dans toutes les notes Obsidian.
 
         Args:
             query: Texte à rechercher
             folder: Limiter la recherche à un dossier spécifique
+            offset: Nombre de résultats à sauter (pagination)
+            limit: Nombre maximal de résultats retournés
 
         Returns:
             Notes contenant le texte recherché
@@ -119,7 +316,8 @@ class ObsidianTools:
 
         try:
             matches = []
-            for note_path in search_path.glob("**/*.md"):
+            # Ordre stable pour que la pagination soit cohérente d'un appel à l'autre
+            for note_path in sorted(search_path.glob("**/*.md")):
                 try:
                     with open(note_path, 'r', encoding='utf-8') as f:
                         content = f.read()
@@ -137,11 +335,155 @@ class ObsidianTools:
             if not matches:
                 return f"Aucune note ne contient '{query}'."
 
-            result = f"Notes contenant '{query}' ({len(matches)}):\n\n"
+            title = f"Notes contenant '{query}' ({len(matches)})"
+            return _paginate(title, matches, int(offset), int(limit), "\n\n")
+        except Exception as e:
+            return f"Erreur lors de la recherche: {str(e)}"
+
+    def get_backlinks(self, note_path: str) -> str:
+        """
+        Liste les notes qui pointent vers une note ([[liens]] et ![[embeds]]).
+
+        Args:
+            note_path: Chemin, nom ou alias de la note
+
+        Returns:
+            Liste des notes sources
+        """
+        try:
+            notes = self.index.backlinks(note_path)
+            if not notes:
+                return f"Aucun lien entrant vers '{note_path}'."
+            result = f"Liens entrants vers {note_path} ({len(notes)}):\n\n"
+            result += "\n".join(f"- {note}" for note in notes)
+            return result
+        except Exception as e:
+            return f"Erreur lors de la recherche des liens entrants: {str(e)}"
+
+    def get_outlinks(self, note_path: str) -> str:
+        """
+        Liste les liens sortants d'une note.
+
+        Args:
+            note_path: Chemin, nom ou alias de la note
+
+        Returns:
+            Liens et embeds de la note (les cibles inexistantes sont signalées)
+        """
+        try:
+            if self.index.resolve(note_path) is None:
+                return f"Erreur: La note '{note_path}' n'existe pas dans le vault."
+
+            outlinks = self.index.outlinks(note_path)
+            targets = [(t, "lien") for t in outlinks["links"]]
+            targets += [(t, "embed") for t in outlinks["embeds"]]
+            if not targets:
+                return f"Aucun lien sortant dans '{note_path}'."
+
+            lines = []
+            for target, kind in targets:
+                if self.index.resolve(target):
+                    status = ""
+                elif Path(target).suffix not in ("", ".md"):
+                    status = " (pièce jointe)"
+                else:
+                    status = " (inexistante)"
+                lines.append(f"- {target} [{kind}]{status}")
+            return f"Liens sortants de {note_path} ({len(lines)}):\n\n" + "\n".join(lines)
+        except Exception as e:
+            return f"Erreur lors de la recherche des liens sortants: {str(e)}"
+
+    def find_notes_by_tag(self, tag: str) -> str:
+        """
+        Liste les notes portant un tag (tags inline et frontmatter, sous-tags inclus).
+
+        Args:
+            tag: Tag recherché, avec ou sans '#'
+
+        Returns:
+            Liste des notes portant le tag
+        """
+        try:
+            notes = self.index.notes_by_tag(tag)
+            if not notes:
+                return f"Aucune note avec le tag #{tag.lstrip('#')}."
+            result = f"Notes avec le tag #{tag.lstrip('#')} ({len(notes)}):\n\n"
+            result += "\n".join(f"- {note}" for note in notes)
+            return result
+        except Exception as e:
+            return f"Erreur lors de la recherche par tag: {str(e)}"
+
+    def find_notes_by_property(self, key: str, value: str = "") -> str:
+        """
+        Liste les notes dont le frontmatter contient une propriété.
+
+        Args:
+            key: Nom de la propriété (ex: 'status')
+            value: Valeur attendue (vide pour toute valeur)
+
+        Returns:
+            Liste des notes correspondantes
+        """
+        try:
+            notes = self.index.notes_by_property(key, value)
+            label = f"{key}: {value}" if value else key
+            if not notes:
+                return f"Aucune note avec la propriété '{label}'."
+            result = f"Notes avec la propriété '{label}' ({len(notes)}):\n\n"
+            result += "\n".join(f"- {note}" for note in notes)
+            return result
+        except Exception as e:
+            return f"Erreur lors de la recherche par propriété: {str(e)}"
+
+    def find_orphan_notes(self) -> str:
+        """
+        Liste les notes sans aucun lien entrant ni sortant.
+
+        Returns:
+            Liste des notes orphelines
+        """
+        try:
+            notes = self.index.orphans()
+            if not notes:
+                return "Aucune note orpheline."
+            result = f"Notes orphelines ({len(notes)}):\n\n"
+            result += "\n".join(f"- {note}" for note in notes)
+            return result
+        except Exception as e:
+            return f"Erreur lors de la recherche des notes orphelines: {str(e)}"
+
+    def semantic_search(self, query: str, top_k: int = 5, folder: str = "") -> str:
+        """
+        Recherche les passages les plus proches du sens de la requête.
+
+        Args:
+            query: Question ou sujet en langage naturel
+            top_k: Nombre de passages à retourner
+            folder: Limiter la recherche à un dossier spécifique
+
+        Returns:
+            Passages pertinents avec leur note et leur score
+        """
+        try:
+            hits = self.semantic_index.search(query, top_k=int(top_k), folder=folder)
+            if not hits:
+                return f"Aucun passage pertinent pour '{query}'."
+
+            matches = []
+            for hit in hits:
+                try:
+                    with open(self.vault_path / hit["note"], 'r', encoding='utf-8') as f:
+                        excerpt = f.read()[hit["start"]:hit["end"]]
+                except Exception:
+                    excerpt = ""
+                excerpt = " ".join(excerpt.split())[:300]
+                matches.append(f"- {hit['note']} (score {hit['score']:.2f})\n  Extrait: {excerpt}")
+
+            result = f"Passages proches de '{query}' ({len(matches)}):\n\n"
             result += "\n\n".join(matches)
             return result
         except Exception as e:
-            return f"Erreur lors de la recherche: {str(e)}"
+            return f"Erreur lors de la recherche sémantique: {str(e)}"
 
 
 # Fonctions helper pour créer des tools compatibles avec CrewAI 0.11.2
@@ -156,3 +498,51 @@ def create_obsidian_tools(vault_path: str):
         Instance de ObsidianTools
     """
     return ObsidianTools(vault_path)
+
+
+# Description des outils exposés aux agents: nom -> (méthode, description)
+AGENT_TOOLS = {
+    "read_note": ("read_note", "Lit une note. Arguments: note_path (ex: 'Projets/note.md'), section (titre, optionnel), start_line/end_line (optionnels). Les longues notes sont paginées."),
+    "write_note": ("write_note", "Écrit une note. Arguments: note_path, content, append (True pour ajouter à la fin)."),
+    "list_notes": ("list_notes", "Liste les notes. Arguments: folder (vide pour tout le vault), pattern (défaut '*.md'), offset, limit, tree (True pour un aperçu des dossiers avec leur nombre de notes)."),
+    "search_notes": ("search_notes", "Recherche un texte dans les notes. Arguments: query, folder (optionnel), offset, limit."),
+    "semantic_search": ("semantic_search", "Recherche par le sens (pas besoin des mots exacts). Arguments: query, top_k (défaut 5), folder (optionnel)."),
+    "get_backlinks": ("get_backlinks", "Notes qui pointent vers une note. Argument: note_path (chemin, nom ou alias)."),
+    "get_outlinks": ("get_outlinks", "Liens sortants d'une note. Argument: note_path (chemin, nom ou alias)."),
+    "find_notes_by_tag": ("find_notes_by_tag", "Notes portant un tag. Argument: tag (ex: 'projet')."),
+    "find_notes_by_property": ("find_notes_by_property", "Notes ayant une propriété de frontmatter. Arguments: key, value (optionnel)."),
+    "find_orphan_notes": ("find_orphan_notes", "Notes sans lien entrant ni sortant. Aucun argument."),
+}
+
+
+def create_agent_tools(tools: ObsidianTools, tracer=None) -> dict:
+    """
+    Crée les tools LangChain utilisables par les agents CrewAI.
+
+    Args:
+        tools: Instance de ObsidianTools à exposer
+        tracer: Tracer optionnel (un span par appel d'outil)
+
+    Returns:
+        Dict nom -> tool
+    """
+    from langchain.tools import StructuredTool
+
+    from profiling import active
+
+    profiler = active()
+
+    def _func(name: str, method: str):
+        func = getattr(tools, method)
+        if profiler is not None:
+            func = profiler.wrap("tool", func)
+        return tracer.wrap_tool(name, func) if tracer else func
+
+    return {
+        name: StructuredTool.from_function(
+            func=_func(name, method),
+            name=name,
+            description=description,
+        )
+        for name, (method, description) in AGENT_TOOLS.items()
+    }
@@ -0,0 +1,258 @@
+"""
+Accès direct à l'API HTTP d'Ollama (bibliothèque standard uniquement)
+Utilisé pour ce que les clients LangChain n'exposent pas (embeddings, état des modèles)
+"""
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+
+def parse_keep_alive(value: Union[str, int, None]) -> Union[str, int]:
+    """
+    Normalise une durée keep_alive ('30m', '1h', '-1', 0...).
+
+    Les nombres sont envoyés en secondes (entier), le reste tel quel.
+    """
+    if value is None or value == "":
+        return "30m"
+    if isinstance(value, int):
+        return value
+    value = value.strip()
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+# Durée pendant laquelle Ollama garde un modèle en mémoire après une requête
+DEFAULT_KEEP_ALIVE = parse_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+
+
+class OllamaError(Exception):
+    """Erreur de communication avec le serveur Ollama."""
+
+
+def request(path: str, payload: Optional[dict] = None, timeout: float = 60,
+            base_url: Optional[str] = None) -> dict:
+    """
+    Envoie une requête à l'API Ollama et retourne la réponse JSON.
+
+    Args:
+        path: Chemin de l'endpoint (ex: '/api/tags')
+        payload: Corps JSON (POST) ou None (GET)
+        timeout: Délai maximal en secondes
+        base_url: URL du serveur (défaut: OLLAMA_BASE_URL)
+
+    Returns:
+        Réponse décodée
+    """
+    url = (base_url or OLLAMA_BASE_URL).rstrip("/") + path
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(
+        url,
+        data=data,
+        headers={"Content-Type": "application/json"},
+        method="POST" if data is not None else "GET",
+    )
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8") or "{}")
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", errors="replace")
+        raise OllamaError(f"{path}: HTTP {e.code} {detail}") from e
+    except (urllib.error.URLError, OSError) as e:
+        raise OllamaError(f"{path}: {e}") from e
+
+
+def embed(texts: List[str], model: str, base_url: Optional[str] = None,
+          timeout: float = 120) -> List[List[float]]:
+    """
+    Calcule les embeddings d'une liste de textes.
+
+    Args:
+        texts: Textes à encoder
+        model: Modèle d'embedding (ex: 'nomic-embed-text')
+        base_url: URL du serveur Ollama
+        timeout: Délai maximal en secondes
+
+    Returns:
+        Un vecteur par texte, dans le même ordre
+    """
+    if not texts:
+        return []
+
+    try:
+        response = request("/api/embed", {"model": model, "input": texts},
+                           timeout=timeout, base_url=base_url)
+        return response["embeddings"]
+    except OllamaError as e:
+        if "HTTP 404" not in str(e) or "model" in str(e).lower():
+            raise
+
+    # Serveurs plus anciens: un appel par texte sur l'ancien endpoint
+    return [
+        request("/api/embeddings", {"model": model, "prompt": text},
+                timeout=timeout, base_url=base_url)["embedding"]
+        for text in texts
+    ]
+
+
+def chat(model: str, messages: List[dict], options: Optional[dict] = None,
+         keep_alive=DEFAULT_KEEP_ALIVE, timeout: float = 60,
+         base_url: Optional[str] = None) -> dict:
+    """
+    Appel non streamé de l'endpoint de chat.
+
+    Args:
+        model: Nom du modèle Ollama
+        messages: Messages {'role': 'system'|'user'|..., 'content': ...}
+        options: Options du modèle (temperature, num_ctx, num_predict...)
+        keep_alive: Durée de maintien en mémoire
+        timeout: Délai maximal en secondes
+        base_url: URL du serveur Ollama
+
+    Returns:
+        Réponse d'Ollama ('message', 'done_reason' et les compteurs
+        prompt_eval_count, eval_count, load_duration... en nanosecondes)
+    """
+    payload = {"model": model, "messages": messages, "stream": False, "keep_alive": keep_alive}
+    if options:
+        payload["options"] = options
+    return request("/api/chat", payload, timeout=timeout, base_url=base_url)
+
+
+def load_model(model: str, keep_alive=DEFAULT_KEEP_ALIVE, base_url: Optional[str] = None,
+               timeout: float = 300, options: Optional[dict] = None) -> dict:
+    """
+    Charge un modèle en mémoire (ou prolonge sa présence) sans génération.
+
+    Args:
+        model: Nom du modèle Ollama
+        keep_alive: Durée de maintien en mémoire (ex: '10m', -1 pour toujours)
+        base_url: URL du serveur Ollama
+        timeout: Délai maximal en secondes (le chargement peut être long)
+        options: Options de chargement (ex: num_ctx); doivent être celles des
+            requêtes suivantes, sinon Ollama recharge le modèle
+
+    Returns:
+        Réponse d'Ollama (contient 'load_duration' en nanosecondes)
+    """
+    payload = {"model": model, "keep_alive": keep_alive}
+    if options:
+        payload["options"] = options
+    return request("/api/generate", payload, timeout=timeout, base_url=base_url)
+
+
+def count_tokens(model: str, text: str, keep_alive=DEFAULT_KEEP_ALIVE,
+                 options: Optional[dict] = None, base_url: Optional[str] = None,
+                 timeout: float = 60) -> int:
+    """
+    Nombre de tokens d'un texte pour le tokenizer du modèle (réseau).
+
+    Le texte est envoyé brut (sans gabarit de chat) pour une génération d'un
+    seul token; prompt_eval_count compte alors le texte plus le token de début.
+    Un texte déjà évalué juste avant (préfixe en cache) serait sous-compté.
+    """
+    payload = {"model": model, "prompt": text, "raw": True, "stream": False,
+               "keep_alive": keep_alive, "options": {**(options or {}), "num_predict": 1}}
+    response = request("/api/generate", payload, timeout=timeout, base_url=base_url)
+    return int(response.get("prompt_eval_count", 0))
+
+
+def _model_key(name: str) -> str:
+    """Nom canonique d'un modèle ('mistral' == 'mistral:latest')."""
+    return name if ":" in name else f"{name}:latest"
+
+
+def list_models(base_url: Optional[str] = None) -> List[str]:
+    """Modèles installés sur le serveur Ollama."""
+    response = request("/api/tags", timeout=10, base_url=base_url)
+    return [model["name"] for model in response.get("models", [])]
+
+
+def running_models(base_url: Optional[str] = None) -> Dict[str, dict]:
+    """Modèles actuellement chargés en mémoire -> informations d'Ollama."""
+    response = request("/api/ps", timeout=10, base_url=base_url)
+    return {_model_key(model["name"]): model for model in response.get("models", [])}
+
+
+def warm_up(models: List[str], keep_alive=DEFAULT_KEEP_ALIVE,
+            base_url: Optional[str] = None, options: Optional[dict] = None) -> List[dict]:
+    """
+    Vérifie que les modèles sont installés et les charge tous en parallèle.
+
+    Le temps de chargement (rapporté par Ollama) est distingué du temps total
+    de la requête, pour ne pas le confondre ensuite avec de l'inférence.
+
+    Args:
+        models: Modèles à préparer (les doublons sont ignorés)
+        keep_alive: Durée de maintien en mémoire
+        base_url: URL du serveur Ollama
+        options: Options de chargement communes (voir load_model)
+
+    Returns:
+        Un dict par modèle: 'model', 'installed', 'was_loaded', 'loaded',
+        'load_seconds', 'wall_seconds' et éventuellement 'error'
+    """
+    models = list(dict.fromkeys(models))
+    installed = {_model_key(name) for name in list_models(base_url)}
+    running = running_models(base_url)
+
+    report = [{
+        "model": model,
+        "installed": _model_key(model) in installed,
+        "was_loaded": _model_key(model) in running,
+        "loaded": False,
+        "load_seconds": 0.0,
+        "wall_seconds": 0.0,
+    } for model in models]
+
+    def _load(entry: dict) -> None:
+        if not entry["installed"]:
+            entry["error"] = f"modèle non installé (ollama pull {entry['model']})"
+            return
+        start = time.perf_counter()
+        try:
+            response = load_model(entry["model"], keep_alive=keep_alive, base_url=base_url,
+                                  options=options)
+            entry["load_seconds"] = response.get("load_duration", 0) / 1e9
+        except OllamaError as e:
+            entry["error"] = str(e)
+        entry["wall_seconds"] = time.perf_counter() - start
+
+    # Chargement simultané: l'équipe d'agents ne s'arrêtera pas en cours de
+    # tâche pour charger le second modèle
+    with ThreadPoolExecutor(max_workers=max(len(report), 1)) as executor:
+        list(executor.map(_load, report))
+
+    running = running_models(base_url)
+    for entry in report:
+        entry["loaded"] = _model_key(entry["model"]) in running
+        if entry["installed"] and not entry["loaded"] and "error" not in entry:
+            entry["error"] = ("déchargé par le serveur (augmentez OLLAMA_MAX_LOADED_MODELS "
+                              "ou la mémoire disponible)")
+    return report
+
+
+def print_warm_up(report: List[dict]) -> bool:
+    """
+    Affiche le résultat de warm_up().
+
+    Returns:
+        True si tous les modèles sont prêts
+    """
+    ready = True
+    for entry in report:
+        if "error" in entry:
+            ready = False
+            print(f"⚠️  {entry['model']}: {entry['error']}")
+        elif entry["was_loaded"]:
+            print(f"🔥 {entry['model']}: déjà chargé")
+        else:
+            print(f"🔥 {entry['model']}: chargé en {entry['load_seconds']:.1f}s "
+                  f"(requête {entry['wall_seconds']:.1f}s)")
+    return ready
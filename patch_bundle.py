@@ -0,0 +1,189 @@
+"""
+Lots de corrections précalculées (plan / apply)
+
+La phase coûteuse (modèle) écrit un lot de patchs au lieu de modifier les notes;
+la phase d'application, rapide et sans modèle, vérifie l'empreinte de chaque note
+et ignore celles qui ont changé depuis.
+
+Format: JSON lines (compressé si le fichier finit par .gz), une en-tête puis une
+ligne par note {"note", "base", "edits": [[début, fin, "lignes"], ...]} où début
+et fin sont des numéros de lignes (à partir de 0) du contenu d'origine.
+"""
+import difflib
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import List
+
+from atomic_write import AtomicWriter, WriteConflict, content_hash, read_note
+
+BUNDLE_VERSION = 1
+
+
+def make_edits(original: str, corrected: str) -> List[list]:
+    """Remplacements de lignes qui transforment `original` en `corrected`."""
+    old_lines = original.splitlines(keepends=True)
+    new_lines = corrected.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, "".join(new_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_edits(original: str, edits: List[list]) -> str:
+    """Applique les remplacements de make_edits (de la fin vers le début)."""
+    lines = original.splitlines(keepends=True)
+    for start, end, replacement in sorted(edits, key=lambda edit: edit[0], reverse=True):
+        lines[start:end] = [replacement]
+    return "".join(lines)
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class BundleWriter:
+    """Écrit un lot de patchs au fil de la correction (chaque note est sauvée aussitôt)."""
+
+    def __init__(self, path: str, model: str = ""):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self._file = _open(self.path, "w")
+        self._write({"bundle": BUNDLE_VERSION, "model": model,
+                     "created": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def add(self, note: str, original: str, corrected: str) -> int:
+        """
+        Ajoute les corrections d'une note.
+
+        Returns:
+            Nombre de remplacements enregistrés
+        """
+        edits = make_edits(original, corrected)
+        self._write({"note": note, "base": content_hash(original), "edits": edits})
+        self.count += 1
+        return len(edits)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def read_bundle(path: str):
+    """
+    Lit un lot de patchs.
+
+    Returns:
+        (en-tête, itérateur des entrées par note)
+    """
+    f = _open(Path(path), "r")
+    header = json.loads(f.readline() or "{}")
+    if header.get("bundle") != BUNDLE_VERSION:
+        f.close()
+        raise ValueError(f"{path}: lot de patchs invalide ou de version inconnue")
+
+    def entries():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, entries()
+
+
+def _discard_backup(path) -> None:
+    """Supprime le backup d'une note finalement non écrite."""
+    if path is not None:
+        Path(path).unlink(missing_ok=True)
+
+
+def apply_bundle(vault_path: Path, path: str, create_backups: bool = True,
+                 dry_run: bool = False, backup=None) -> dict:
+    """
+    Applique un lot de patchs en une passe: lecture, vérification, écriture.
+
+    Args:
+        vault_path: Racine du vault
+        path: Fichier du lot
+        create_backups: Si True, sauvegarde chaque note avant de l'écrire
+        dry_run: Vérifier sans rien écrire
+        backup: Fonction (chemin complet) -> chemin du backup
+
+    Returns:
+        Compteurs (applied, stale, missing, errors) et liste des notes ignorées
+    """
+    header, entries = read_bundle(path)
+    results = {"model": header.get("model", ""), "created": header.get("created", ""),
+               "applied": 0, "stale": 0, "missing": 0, "errors": 0, "skipped": []}
+    writer = AtomicWriter()
+    backups = {}   # note -> backup, tant que son lot n'est pas validé
+
+    # Écritures par fichier temporaire, un seul sync par lot de notes
+    with writer.group():
+        for entry in entries:
+            note = entry["note"]
+            full_path = vault_path / note
+            try:
+                current, stamp = read_note(full_path)
+            except FileNotFoundError:
+                results["missing"] += 1
+                results["skipped"].append({"note": note, "reason": "introuvable"})
+                continue
+            except (OSError, UnicodeDecodeError) as e:
+                results["errors"] += 1
+                results["skipped"].append({"note": note, "reason": f"lecture: {e}"})
+                continue
+
+            # Note modifiée depuis la correction: le patch ne s'applique plus
+            if stamp.sha256 != entry["base"]:
+                results["stale"] += 1
+                results["skipped"].append({"note": note, "reason": "modifiée depuis le plan"})
+                continue
+
+            if dry_run:
+                results["applied"] += 1
+                continue
+            try:
+                if create_backups and backup is not None:
+                    backups[note] = backup(full_path)
+                writer.write(full_path, apply_edits(current, entry["edits"]), expected=stamp)
+                results["applied"] += 1
+            except WriteConflict:
+                results["stale"] += 1
+                results["skipped"].append({"note": note, "reason": "modifiée depuis le plan"})
+            except OSError as e:
+                results["errors"] += 1
+                results["skipped"].append({"note": note, "reason": f"écriture: {e}"})
+
+    # Notes modifiées entre leur écriture et la validation du lot, ou dont le
+    # renommage a échoué: inchangées, leur backup n'a plus d'objet
+    for conflict in writer.conflicts:
+        note = conflict.relative_to(vault_path).as_posix()
+        _discard_backup(backups.get(note))
+        results["applied"] -= 1
+        results["stale"] += 1
+        results["skipped"].append({"note": note, "reason": "modifiée pendant l'application"})
+    for failed, error in writer.errors:
+        note = failed.relative_to(vault_path).as_posix()
+        _discard_backup(backups.get(note))
+        results["applied"] -= 1
+        results["errors"] += 1
+        results["skipped"].append({"note": note, "reason": f"écriture: {error}"})
+
+    return results
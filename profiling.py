@@ -0,0 +1,225 @@
+"""
+Mode profilage (--profile): cProfile par étape, allocations via tracemalloc
+
+Les étapes (walk, read, backup, llm, write, tool) sont marquées dans le code par
+`with stage("read"):`. Sans profilage actif, stage() retourne un contexte vide
+partagé: le coût est celui d'un appel de fonction.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_NULL = nullcontext()
+_ACTIVE: Optional["Profiler"] = None
+
+STAGES = ["walk", "read", "backup", "llm", "write", "tool"]
+OTHER = "autre"
+
+
+def active() -> Optional["Profiler"]:
+    """Profileur en cours, ou None."""
+    return _ACTIVE
+
+
+def stage(name: str):
+    """Marque une étape du traitement (sans effet si le profilage est désactivé)."""
+    if _ACTIVE is None:
+        return _NULL
+    return _ACTIVE.stage(name)
+
+
+class Profiler:
+    """
+    Un cProfile par étape, permutés à l'entrée et à la sortie de chaque étape.
+
+    Seul le thread qui a démarré le profilage est profilé fonction par fonction;
+    les étapes des autres threads sont seulement chronométrées.
+    """
+
+    def __init__(self, output: str, memory: bool = False, top: int = 8):
+        """
+        Args:
+            output: Fichier pstats à écrire (lisible par snakeviz, flameprof, gprof2dot)
+            memory: Échantillonner aussi les allocations (tracemalloc, plus lent)
+            top: Nombre de fonctions affichées par étape
+        """
+        self.output = Path(output)
+        self.memory = memory
+        self.top = top
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._stack: List[str] = []
+        self._thread = None
+        self._lock = threading.Lock()
+        self.wall: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.allocated: Dict[str, int] = {}
+        self._start = 0.0
+        self.elapsed = 0.0
+
+    def _profile(self, name: str) -> cProfile.Profile:
+        if name not in self._profiles:
+            self._profiles[name] = cProfile.Profile()
+        return self._profiles[name]
+
+    def start(self) -> None:
+        """Démarre le profilage sur le thread courant."""
+        global _ACTIVE
+        if self.memory:
+            tracemalloc.start(10)
+        self._thread = threading.get_ident()
+        self._stack = [OTHER]
+        self._start = time.perf_counter()
+        _ACTIVE = self
+        self._profile(OTHER).enable()
+
+    def stop(self) -> None:
+        """Arrête le profilage."""
+        global _ACTIVE
+        self._profile(self._stack[-1]).disable()
+        _ACTIVE = None
+        self.elapsed = time.perf_counter() - self._start
+        self.wall[OTHER] = max(self.elapsed - sum(self.wall.values()), 0.0)
+
+    def enter(self, name: str):
+        """Début d'une étape; retourne le jeton à passer à exit()."""
+        if threading.get_ident() == self._thread:
+            self._profile(self._stack[-1]).disable()
+            self._stack.append(name)
+            self._profile(name).enable()
+        memory = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        return name, time.perf_counter(), memory
+
+    def exit(self, token) -> None:
+        """Fin de l'étape ouverte par enter()."""
+        name, start, memory = token
+        elapsed = time.perf_counter() - start
+        if threading.get_ident() == self._thread and self._stack[-1] == name:
+            self._profile(name).disable()
+            self._stack.pop()
+            self._profile(self._stack[-1]).enable()
+        with self._lock:
+            self.wall[name] = self.wall.get(name, 0.0) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self.memory:
+                delta = tracemalloc.get_traced_memory()[0] - memory
+                self.allocated[name] = self.allocated.get(name, 0) + delta
+
+    @contextmanager
+    def stage(self, name: str):
+        token = self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit(token)
+
+    def wrap(self, name: str, func):
+        """Enveloppe une fonction dans une étape (en conservant sa signature)."""
+        import functools
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def llm_handler(self):
+        """Callback LangChain: chaque appel au modèle est compté dans l'étape 'llm'."""
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        profiler = self
+        tokens = {}
+
+        class _ProfileHandler(BaseCallbackHandler):
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                tokens[run_id] = profiler.enter("llm")
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                if run_id in tokens:
+                    profiler.exit(tokens.pop(run_id))
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                if run_id in tokens:
+                    profiler.exit(tokens.pop(run_id))
+
+        return _ProfileHandler()
+
+    def report(self) -> str:
+        """Écrit le fichier pstats et retourne le résumé par étape."""
+        profiles = [p for p in self._profiles.values() if p.getstats()]
+        if profiles:
+            pstats.Stats(*profiles).dump_stats(str(self.output))
+
+        total = self.elapsed
+        lines = ["=" * 70, f"🔬 PROFIL ({self.output})", "=" * 70,
+                 f"{'Étape':<8} {'Temps':>9} {'Appels':>7} {'Part':>6}"
+                 + ("   Alloc." if self.memory else "")]
+        for name in STAGES + [OTHER]:
+            if name not in self.wall:
+                continue
+            row = (f"{name:<8} {self.wall[name]:8.2f}s {self.calls.get(name, 1):7d} "
+                   f"{self.wall[name] / total if total else 0:6.0%}")
+            if self.memory and name in self.allocated:
+                row += f" {self.allocated[name] / 1024:7.0f} Ko"
+            lines.append(row)
+
+        for name in STAGES + [OTHER]:
+            profile = self._profiles.get(name)
+            if profile is None or not profile.getstats():
+                continue
+            stream = io.StringIO()
+            stats = pstats.Stats(profile, stream=stream)
+            stats.sort_stats("tottime")
+            lines.append(f"\n🔥 {name}: fonctions les plus coûteuses (temps propre)")
+            for func in stats.fcn_list[:self.top]:
+                _, calls, tottime, cumtime, _ = stats.stats[func]
+                filename, line, function = func
+                lines.append(f"  {tottime:7.3f}s / {cumtime:7.3f}s  {calls:6d}×  "
+                             f"{Path(filename).name}:{line}({function})")
+
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            lines.append("\n🧠 Allocations encore en mémoire (top 10)")
+            for statistic in snapshot.statistics("lineno")[:10]:
+                frame = statistic.traceback[0]
+                lines.append(f"  {statistic.size / 1024:8.0f} Ko  "
+                             f"{Path(frame.filename).name}:{frame.lineno}")
+            tracemalloc.stop()
+
+        lines.append("=" * 70)
+        return "\n".join(lines)
+
+
+def add_arguments(parser, default_output: str) -> None:
+    """Ajoute --profile et --profile-memory à un parser argparse."""
+    parser.add_argument("--profile", nargs="?", const=default_output, default="", metavar="FICHIER",
+                        help=f"Profiler l'exécution (fichier pstats, défaut: {default_output})")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Avec --profile: échantillonner aussi les allocations (tracemalloc)")
+
+
+@contextmanager
+def session(output: str = "", memory: bool = False):
+    """
+    Profile le bloc si `output` est renseigné, puis affiche le rapport.
+
+    Args:
+        output: Fichier pstats (vide = pas de profilage)
+        memory: Échantillonner aussi les allocations
+    """
+    if not output:
+        yield None
+        return
+    profiler = Profiler(output, memory=memory)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        print(profiler.report(), file=sys.stderr)
@@ -0,0 +1,170 @@
+"""
+Appels au modèle robustes: nouvelles tentatives avec backoff et disjoncteur
+Un serveur Ollama arrêté ou à court de mémoire n'est pas sollicité pour chaque note restante
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Le serveur est considéré comme indisponible: aucun appel n'est envoyé."""
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Vrai pour les erreurs qui peuvent disparaître d'elles-mêmes
+    (connexion, délai dépassé, erreur 5xx, serveur surchargé).
+
+    Les erreurs 4xx (modèle absent, requête invalide) sont définitives.
+    """
+    message = str(error).lower()
+    for code in ("400", "401", "403", "404", "422"):
+        if f"status code {code}" in message or f"http {code}" in message:
+            return False
+    return True
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur: après `threshold` échecs consécutifs, les appels sont suspendus.
+
+    Pendant la pause, les appels échouent aussitôt (CircuitOpenError). Une fois
+    la pause écoulée, le premier appel sonde le serveur: s'il répond, un appel
+    d'essai passe (demi-ouvert), sinon la pause double (jusqu'à 2 minutes).
+    Le disjoncteur n'abandonne jamais: un serveur revenu est de nouveau utilisé.
+
+    Avec `max_wait`, un appel attend la fin de la pause (au plus `max_wait`
+    secondes) au lieu d'échouer: utile pour un passage qui ne doit pas compter
+    toutes les notes restantes en erreur pendant une coupure.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 15.0, max_wait: float = 0.0,
+                 probe: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            threshold: Échecs consécutifs avant ouverture
+            cooldown: Première pause avant de sonder le serveur (doublée à chaque échec)
+            max_wait: Attente maximale d'un appel pendant la pause (0 = échec immédiat)
+            probe: Fonction qui lève une exception si le serveur est indisponible
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.probe = probe
+        self.failures = 0
+        self.opened = False
+        self._delay = cooldown
+        self._retry_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Laisse passer l'appel si le serveur est considéré comme disponible.
+
+        Raises:
+            CircuitOpenError: disjoncteur ouvert (et `max_wait` écoulé)
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._lock:
+                if not self.opened:
+                    return
+                now = time.monotonic()
+                probe = now >= self._retry_at and not self._probing
+                if probe:
+                    self._probing = True
+                wait = max(self._retry_at - now, 0.0)
+
+            if probe:
+                self._probe()
+                continue
+            if now + wait >= deadline:
+                raise CircuitOpenError(f"serveur indisponible (nouvel essai dans {wait:.0f}s)")
+            # Attente hors du verrou: les autres threads et record_* ne sont pas bloqués
+            print(f"⏸️  Serveur indisponible, nouvel essai dans {wait:.0f}s")
+            time.sleep(min(max(wait, 0.5), deadline - now))
+
+    def _probe(self) -> None:
+        """Sonde le serveur (un seul thread à la fois) et referme ou prolonge la pause."""
+        try:
+            if self.probe is not None:
+                self.probe()
+            available = True
+        except Exception:
+            available = False
+        with self._lock:
+            self._probing = False
+            if available:
+                # Demi-ouvert: un appel d'essai passe, un échec rouvrira aussitôt
+                self.opened = False
+                self.failures = self.threshold - 1
+            else:
+                self._delay = min(self._delay * 2, 120.0)
+                self._retry_at = time.monotonic() + self._delay
+
+    @contextmanager
+    def waiting(self, max_wait: float):
+        """Bloc pendant lequel les appels attendent la fin d'une coupure (voir max_wait)."""
+        previous, self.max_wait = self.max_wait, max_wait
+        try:
+            yield self
+        finally:
+            self.max_wait = previous
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened = False
+            self._delay = self.cooldown
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and not self.opened:
+                self.opened = True
+                self._retry_at = time.monotonic() + self._delay
+
+
+def call_with_retries(func: Callable, retries: int = 2, base_delay: float = 2.0,
+                      max_delay: float = 30.0, breaker: Optional[CircuitBreaker] = None):
+    """
+    Appelle `func()` avec des nouvelles tentatives pour les erreurs transitoires.
+
+    Le délai entre deux tentatives double à chaque fois, avec une part aléatoire
+    (« full jitter ») pour ne pas resynchroniser plusieurs workers.
+
+    Args:
+        func: Appel à effectuer (sans argument)
+        retries: Nombre de nouvelles tentatives après le premier échec
+        base_delay: Délai de base en secondes
+        max_delay: Délai maximal entre deux tentatives
+        breaker: Disjoncteur partagé entre les appels
+
+    Returns:
+        Résultat de func()
+    """
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = func()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt >= retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"↻ Échec temporaire ({e}), nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
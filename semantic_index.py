@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Index sémantique local des notes (embeddings Ollama)
+Les vecteurs sont stockés dans une matrice float32 mappée en mémoire,
+avec une table de correspondance ligne -> (note, extrait), hors du vault
+(~/.cache/correcteur-obsidian/embeddings/)
+
+Usage:
+    python semantic_index.py             # construit ou met à jour l'index
+    python semantic_index.py --rebuild   # ré-encode tout le vault
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ollama_api import OllamaError, embed
+from vault_index import iter_note_files, vault_cache_path
+
+_HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
+
+
+def chunk_note(content: str, max_chars: int = 1200) -> List[tuple]:
+    """
+    Découpe une note en extraits (sections puis paragraphes) de taille bornée.
+
+    Args:
+        content: Contenu de la note
+        max_chars: Taille maximale d'un extrait
+
+    Returns:
+        Liste de (début, fin) en indices de caractères
+    """
+    # Frontières: titres et paragraphes
+    bounds = sorted({0, len(content)}
+                    | {m.start() for m in _HEADING_RE.finditer(content)}
+                    | {m.end() for m in re.finditer(r"\n\s*\n", content)})
+
+    chunks = []
+    start = end = 0
+    for bound in bounds[1:]:
+        piece_starts_section = _HEADING_RE.match(content, end) is not None
+        if end > start and (bound - start > max_chars or piece_starts_section):
+            chunks.append((start, end))
+            start = end
+        # Paragraphe trop long à lui seul: coupe franche
+        while bound - start > max_chars:
+            chunks.append((start, start + max_chars))
+            start += max_chars
+        end = bound
+    if end > start:
+        chunks.append((start, end))
+
+    return [(s, e) for s, e in chunks if content[s:e].strip()]
+
+
+class SemanticIndex:
+    """Index vectoriel des notes, mis à jour de façon incrémentale."""
+
+    def __init__(self, vault_path: str, model: str = "nomic-embed-text",
+                 base_url: Optional[str] = None, refresh_interval: float = 5.0):
+        """
+        Initialise l'index (charge l'état existant sur disque s'il y en a un).
+
+        Args:
+            vault_path: Chemin vers le vault Obsidian
+            model: Modèle d'embedding Ollama
+            base_url: URL du serveur Ollama
+            refresh_interval: Délai minimal (s) entre deux rescans du disque
+        """
+        self.vault_path = Path(vault_path)
+        self.model = model
+        self.base_url = base_url
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+
+        safe_model = re.sub(r"[^\w.-]", "_", model)
+        # Hors du vault: la matrice n'a pas à être synchronisée avec les notes
+        self.index_dir = vault_cache_path(self.vault_path, "embeddings") / safe_model
+        self._vectors_path = self.index_dir / "vectors.f32"
+        self._meta_path = self.index_dir / "meta.json"
+
+        self.dim = 0
+        self.capacity = 0
+        self._matrix = None
+        self._rows: List[Optional[list]] = []   # ligne -> [note, début, fin] ou None
+        self._notes: Dict[str, dict] = {}        # note -> {"mtime": ..., "rows": [...]}
+        self._free: List[int] = []
+        # Un seul rescan à la fois (sinon deux notes peuvent recevoir la même
+        # ligne libre), et pas de recherche pendant qu'il déplace les lignes
+        self._lock = threading.RLock()
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """Charge la table et mappe la matrice existante."""
+        if not self._meta_path.exists() or not self._vectors_path.exists():
+            return
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.dim = meta["dim"]
+        self.capacity = meta["capacity"]
+        self._rows = meta["rows"]
+        self._notes = meta["notes"]
+        self._free = [i for i, row in enumerate(self._rows) if row is None]
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(self.capacity, self.dim))
+
+    def _save(self) -> None:
+        """Écrit la table (de façon atomique) et vide la matrice sur disque."""
+        if self._matrix is not None:
+            self._matrix.flush()
+        tmp_path = self._meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model,
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "rows": self._rows,
+                "notes": self._notes,
+            }, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _ensure_capacity(self, needed: int, dim: int) -> None:
+        """Agrandit (ou crée) la matrice mappée pour contenir `needed` lignes."""
+        if self._matrix is not None and dim != self.dim:
+            # Changement de modèle/dimension: on repart de zéro
+            self._matrix = None
+            self._rows, self._notes, self._free = [], {}, []
+            self.capacity = 0
+
+        if self._matrix is not None and needed <= self.capacity:
+            return
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        new_capacity = max(needed, self.capacity * 2, 256)
+        tmp_path = self._vectors_path.with_suffix(".grow")
+        grown = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(new_capacity, dim))
+        if self._matrix is not None:
+            grown[:len(self._rows)] = self._matrix[:len(self._rows)]
+            del self._matrix
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self._vectors_path)
+
+        self.dim = dim
+        self.capacity = new_capacity
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(self.capacity, self.dim))
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+
+    def refresh(self, force: bool = False, batch_size: int = 32) -> int:
+        """
+        Ré-encode uniquement les notes ajoutées ou modifiées depuis le dernier passage.
+
+        Args:
+            force: Si True, ignore l'intervalle minimal entre deux rescans
+            batch_size: Nombre d'extraits envoyés par appel d'embedding
+
+        Returns:
+            Nombre de notes ré-encodées ou retirées
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh and now - self._last_refresh < self.refresh_interval:
+                return 0
+
+            seen = set()
+            changed = []
+            for path, stat in iter_note_files(self.vault_path):
+                note = path.relative_to(self.vault_path).as_posix()
+                seen.add(note)
+                entry = self._notes.get(note)
+                if entry is None or entry["mtime"] != stat.st_mtime_ns:
+                    changed.append((note, stat.st_mtime_ns))
+
+            removed = [note for note in self._notes if note not in seen]
+            for note in removed:
+                self._drop(note)
+
+            try:
+                for note, mtime in changed:
+                    self._drop(note)
+                    try:
+                        with open(self.vault_path / note, "r", encoding="utf-8") as f:
+                            content = f.read()
+                    except (OSError, UnicodeDecodeError):
+                        continue
+
+                    spans = chunk_note(content)
+                    title = Path(note).stem
+                    texts = [f"{title}\n{content[s:e].strip()}" for s, e in spans]
+                    vectors = []
+                    for i in range(0, len(texts), batch_size):
+                        vectors.extend(embed(texts[i:i + batch_size], self.model, base_url=self.base_url))
+                    self._insert(note, mtime, spans, vectors)
+            finally:
+                # Conserver le travail déjà fait même si Ollama échoue en cours de route
+                if changed or removed:
+                    self._save()
+            self._last_refresh = now
+            return len(changed) + len(removed)
+
+    def reset(self) -> None:
+        """Oublie toutes les notes: elles seront ré-encodées au prochain refresh."""
+        with self._lock:
+            for note in list(self._notes):
+                self._drop(note)
+
+    def _drop(self, note: str) -> None:
+        """Libère les lignes d'une note."""
+        entry = self._notes.pop(note, None)
+        if entry is None:
+            return
+        for row in entry["rows"]:
+            self._rows[row] = None
+            self._free.append(row)
+
+    def _insert(self, note: str, mtime: int, spans: List[tuple], vectors: List[list]) -> None:
+        """Ajoute les vecteurs (normalisés) d'une note en réutilisant les lignes libres."""
+        rows = []
+        if vectors:
+            block = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            block /= np.maximum(norms, 1e-12)
+
+            reused = min(len(self._free), len(block))
+            self._ensure_capacity(len(self._rows) + len(block) - reused, block.shape[1])
+            for (start, end), vector in zip(spans, block):
+                if self._free:
+                    row = self._free.pop()
+                    self._rows[row] = [note, start, end]
+                else:
+                    row = len(self._rows)
+                    self._rows.append([note, start, end])
+                self._matrix[row] = vector
+                rows.append(row)
+
+        self._notes[note] = {"mtime": mtime, "rows": rows}
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, top_k: int = 5, folder: str = "") -> List[dict]:
+        """
+        Retourne les extraits les plus proches de la requête (similarité cosinus).
+
+        Args:
+            query: Question ou description en langage naturel
+            top_k: Nombre de résultats
+            folder: Limiter aux notes d'un dossier
+
+        Returns:
+            Liste de dicts {'note', 'score', 'start', 'end'} triés par score décroissant
+        """
+        self.refresh()
+        if self._matrix is None or not self._rows:
+            return []
+
+        # Requête encodée hors du verrou (appel réseau)
+        q = np.asarray(embed([query], self.model, base_url=self.base_url)[0], dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        with self._lock:
+            if self._matrix is None or q.shape[0] != self.dim:
+                return []
+            n = len(self._rows)
+            scores = self._matrix[:n] @ q
+            prefix = folder.strip("/") + "/" if folder else ""
+            alive = np.fromiter(
+                (row is not None and row[0].startswith(prefix) for row in self._rows),
+                dtype=bool, count=n,
+            )
+            scores = np.where(alive, scores, -np.inf)
+
+            k = min(top_k, int(alive.sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            return [
+                {"note": self._rows[i][0], "score": float(scores[i]),
+                 "start": self._rows[i][1], "end": self._rows[i][2]}
+                for i in top
+            ]
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+
+def main():
+    """Construit ou met à jour l'index (à lancer avant la première recherche sur un gros vault)."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Index sémantique du vault (embeddings Ollama)")
+    parser.add_argument("--model", default="", help="Modèle d'embedding (défaut: EMBEDDING_MODEL)")
+    parser.add_argument("--rebuild", action="store_true", help="Ré-encoder toutes les notes")
+    args = parser.parse_args()
+
+    vault = os.getenv("OBSIDIAN_VAULT_PATH", "")
+    if not vault or not Path(vault).is_dir():
+        print(f"❌ Vault introuvable (OBSIDIAN_VAULT_PATH): {vault}")
+        sys.exit(2)
+
+    model = args.model or os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+    index = SemanticIndex(vault, model=model)
+    if args.rebuild:
+        index.reset()
+    print(f"🧭 Indexation de {vault} avec {model} ({index.index_dir})")
+    start = time.perf_counter()
+    try:
+        updated = index.refresh(force=True)
+    except OllamaError as e:
+        print(f"❌ {e} (les notes déjà encodées sont conservées)")
+        sys.exit(1)
+    print(f"✅ {updated} note(s) mise(s) à jour en {time.perf_counter() - start:.1f}s · "
+          f"{len(index)} note(s) indexée(s)")
+
+
+if __name__ == "__main__":
+    main()
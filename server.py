@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Service HTTP local: garde le correcteur, les outils et les agents chargés
+entre les requêtes (intégrations d'éditeur, scripts)
+
+Usage:
+    python server.py                      # http://127.0.0.1:8765
+    python server.py --port 9000 --warm-crew
+
+Endpoints (réponses JSON):
+    GET  /health                          état du service et des files
+    GET  /list?folder=Projets             lister les notes
+    GET  /search?q=texte&folder=Projets   rechercher
+    GET  /read?path=note.md               lire une note
+    POST /correct {"note": "x.md"} ou {"text": "..."}  corriger une note ou un texte
+    POST /crew    {"request": "...", "mode": "simple"|"complexe"}  tâche des agents
+
+Chaque famille d'endpoints a sa propre limite de concurrence et sa file
+d'attente bornée; une file pleine répond 503 avec Retry-After.
+
+Seules les requêtes adressées à localhost sont acceptées (en-têtes Host et
+Origin), les POST doivent être en application/json et les chemins de notes
+rester dans le vault: une page web ne peut pas piloter le service.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+from correct_spelling import CorrectionError, SpellingCorrector
+from markdown_segments import normalize
+from obsidian_tools import ObsidianTools
+
+# Noms d'hôte acceptés dans les en-têtes Host et Origin (protection contre le DNS rebinding)
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+class Busy(Exception):
+    """File d'attente pleine ou délai d'attente dépassé."""
+
+
+class Lane:
+    """Limite de concurrence avec une file d'attente bornée."""
+
+    def __init__(self, name: str, limit: int, max_waiting: int, timeout: float):
+        """
+        Args:
+            name: Nom affiché dans /health
+            limit: Requêtes traitées en même temps
+            max_waiting: Requêtes en attente au-delà desquelles on refuse
+            timeout: Attente maximale d'une place (s)
+        """
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.served = 0
+        self._slots = threading.Semaphore(limit)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            if self.waiting >= self.max_waiting:
+                raise Busy(f"file '{self.name}' pleine ({self.waiting} en attente)")
+            self.waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.active += 1
+        if not acquired:
+            raise Busy(f"file '{self.name}': pas de place après {self.timeout:g}s")
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+            self.served += 1
+        self._slots.release()
+        return False
+
+    def state(self) -> dict:
+        with self._lock:
+            return {"active": self.active, "waiting": self.waiting,
+                    "limit": self.limit, "served": self.served}
+
+
+class ObsidianService:
+    """État partagé du service: outils, correcteur et agents gardés en mémoire."""
+
+    def __init__(self, vault_path: str, model: str, args):
+        self.vault_path = Path(vault_path).resolve()
+        self.started = time.time()
+        self.tools = ObsidianTools(str(self.vault_path))
+        self.corrector = SpellingCorrector(str(self.vault_path), model=model)
+        self.agents = None
+        self._agents_lock = threading.Lock()
+        self.lanes = {
+            "io": Lane("io", args.io_workers, args.max_queue, args.queue_timeout),
+            "correct": Lane("correct", args.llm_workers, args.max_queue, args.queue_timeout),
+            # Les agents gardent un cache de session: une tâche à la fois
+            "crew": Lane("crew", 1, args.max_queue, args.queue_timeout),
+        }
+
+    def multi_agent(self):
+        """Système multi-agent, créé au premier usage (import de crewai coûteux)."""
+        with self._agents_lock:
+            if self.agents is None:
+                from main import ObsidianMultiAgent
+                from tracing import Tracer
+
+                self.agents = ObsidianMultiAgent(
+                    vault_path=str(self.vault_path),
+                    main_model=os.getenv("MAIN_MODEL", "llama3.1:8b"),
+                    tool_model=os.getenv("TOOL_MODEL", "llama3.1:8b"),
+                    router_model=os.getenv("ROUTER_MODEL", ""),
+                    research_branches=int(os.getenv("RESEARCH_BRANCHES", "1")),
+                    tracer=Tracer.from_env(),
+                )
+                self.agents.config.warm_up()
+            return self.agents
+
+    def health(self) -> dict:
+        breaker = self.corrector.breaker
+        return {
+            "status": "degraded" if breaker.opened else "ok",
+            "vault": str(self.vault_path),
+            "model": self.corrector.model,
+            "agents_loaded": self.agents is not None,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "lanes": {name: lane.state() for name, lane in self.lanes.items()},
+        }
+
+    def note_path(self, note: str) -> str:
+        """
+        Chemin relatif d'une note demandée par un client.
+
+        Raises:
+            ValueError: chemin hors du vault (absolu, '..', lien) ou autre chose qu'une note .md
+        """
+        full_path = (self.vault_path / str(note)).resolve()
+        if not full_path.is_relative_to(self.vault_path) or full_path.suffix != ".md":
+            raise ValueError(f"chemin de note refusé: {note}")
+        return full_path.relative_to(self.vault_path).as_posix()
+
+    def folder_path(self, folder: str) -> str:
+        """
+        Chemin relatif d'un dossier demandé par un client ('' pour tout le vault).
+
+        Raises:
+            ValueError: chemin hors du vault (absolu, '..', lien)
+        """
+        if not folder:
+            return ""
+        full_path = (self.vault_path / str(folder)).resolve()
+        if not full_path.is_relative_to(self.vault_path):
+            raise ValueError(f"dossier refusé: {folder}")
+        relative = full_path.relative_to(self.vault_path).as_posix()
+        return "" if relative == "." else relative
+
+    def correct(self, body: dict) -> dict:
+        if body.get("note"):
+            return self.corrector.correct_note(
+                self.note_path(body["note"]),
+                create_backup=body.get("backup", True),
+                dry_run=body.get("dry_run", False),
+            )
+        if "text" in body:
+            text = str(body["text"])
+            corrected = self.corrector.correct_segments(text)
+            return {"success": True, "changes": normalize(corrected) != normalize(text),
+                    "text": corrected}
+        raise ValueError("'note' ou 'text' requis")
+
+    def crew(self, body: dict) -> dict:
+        request = str(body.get("request", "")).strip()
+        if not request:
+            raise ValueError("'request' requis")
+        system = self.multi_agent()
+        if body.get("mode", "simple") == "simple":
+            result = system.execute_simple_task(request)
+        else:
+            result = system.execute_complex_task(request)
+        return {"success": True, "result": str(result)}
+
+
+def make_handler(service: ObsidianService):
+    """Classe de handler HTTP liée au service."""
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "correcteur-obsidian"
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"🌐 {self.address_string()} {format % args}\n")
+
+        def _send(self, status: int, payload: dict, headers: dict = None) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _local_request(self) -> bool:
+            """Vrai si Host et Origin (s'il est présent) désignent localhost."""
+            host = urlparse(f"//{self.headers.get('Host', '')}").hostname
+            if host not in LOCAL_HOSTS:
+                return False
+            origin = self.headers.get("Origin")
+            return origin is None or urlparse(origin).hostname in LOCAL_HOSTS
+
+        def _dispatch(self, lane: str, func, *args) -> None:
+            start = time.perf_counter()
+            try:
+                with service.lanes[lane]:
+                    payload = func(*args)
+            except Busy as e:
+                self._send(503, {"error": str(e)}, {"Retry-After": "5"})
+                return
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            except CorrectionError as e:
+                # Ollama indisponible ou en échec: le service lui-même fonctionne
+                self._send(502, {"error": f"Erreur de correction: {e}"})
+                return
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            payload["seconds"] = round(time.perf_counter() - start, 3)
+            self._send(200, payload)
+
+        def do_GET(self):
+            if not self._local_request():
+                self._send(403, {"error": "requête non locale refusée"})
+                return
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            tools = service.tools
+
+            if url.path == "/health":
+                self._send(200, service.health())
+            elif url.path == "/list":
+                self._dispatch("io", lambda: {"result": tools.list_notes(
+                    folder=service.folder_path(query.get("folder", "")))})
+            elif url.path == "/search":
+                if not query.get("q"):
+                    self._send(400, {"error": "paramètre 'q' requis"})
+                    return
+                self._dispatch("io", lambda: {"result": tools.search_notes(
+                    query=query["q"], folder=service.folder_path(query.get("folder", "")))})
+            elif url.path == "/read":
+                if not query.get("path"):
+                    self._send(400, {"error": "paramètre 'path' requis"})
+                    return
+                self._dispatch("io", lambda: {"result": tools.read_note(
+                    note_path=service.note_path(query["path"]))})
+            else:
+                self._send(404, {"error": f"endpoint inconnu: {url.path}"})
+
+        def do_POST(self):
+            if not self._local_request():
+                self._send(403, {"error": "requête non locale refusée"})
+                return
+            # Un formulaire ou un fetch « no-cors » ne peut pas envoyer ce type sans preflight
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                self._send(415, {"error": "Content-Type: application/json requis"})
+                return
+            url = urlparse(self.path)
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise ValueError("objet JSON attendu")
+            except ValueError as e:
+                self._send(400, {"error": f"corps JSON invalide: {e}"})
+                return
+
+            if url.path == "/correct":
+                self._dispatch("correct", service.correct, body)
+            elif url.path == "/crew":
+                self._dispatch("crew", service.crew, body)
+            else:
+                self._send(404, {"error": f"endpoint inconnu: {url.path}"})
+
+    return Handler
+
+
+def main():
+    """Point d'entrée principal."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Service HTTP local pour le vault Obsidian")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8765")))
+    parser.add_argument("--model", default="", help="Modèle de correction (défaut: TOOL_MODEL)")
+    parser.add_argument("--llm-workers", type=int, default=1,
+                        help="Corrections simultanées (Ollama traite souvent une requête à la fois)")
+    parser.add_argument("--io-workers", type=int, default=8, help="Lectures/recherches simultanées")
+    parser.add_argument("--max-queue", type=int, default=16, help="Requêtes en attente par file")
+    parser.add_argument("--queue-timeout", type=float, default=300,
+                        help="Attente maximale d'une place (s)")
+    parser.add_argument("--warm-crew", action="store_true",
+                        help="Charger les agents au démarrage plutôt qu'au premier /crew")
+    args = parser.parse_args()
+
+    vault = os.getenv("OBSIDIAN_VAULT_PATH", "")
+    if not vault or not Path(vault).is_dir():
+        print(f"❌ Vault introuvable (OBSIDIAN_VAULT_PATH): {vault}")
+        sys.exit(2)
+
+    model = args.model or os.getenv("TOOL_MODEL", os.getenv("MAIN_MODEL", "llama3.1:8b"))
+    service = ObsidianService(vault, model, args)
+    service.corrector.warm_up()
+    if args.warm_crew:
+        service.multi_agent()
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    httpd.daemon_threads = True
+    print(f"🚀 Service prêt sur http://{args.host}:{args.port} (vault: {service.vault_path})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt du service")
+    finally:
+        httpd.server_close()
+        if service.agents is not None and service.agents.tracer is not None:
+            service.agents.tracer.close()
+
+
+if __name__ == "__main__":
+    main()
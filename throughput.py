@@ -0,0 +1,82 @@
+"""
+Historique du débit de correction par modèle et par machine
+Sert à estimer la durée d'un passage avant de le lancer
+Gardé hors du vault (~/.cache/correcteur-obsidian/throughput/)
+"""
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from atomic_write import AtomicWriter
+from ollama_api import OLLAMA_BASE_URL
+from vault_index import vault_cache_path
+
+# Poids du dernier passage dans la moyenne mobile
+_SMOOTHING = 0.3
+
+
+def host_key(model: str, base_url: str = OLLAMA_BASE_URL) -> str:
+    """Clé 'modèle@machine': le débit dépend du matériel qui exécute Ollama."""
+    host = urlparse(base_url).hostname or "localhost"
+    if host in ("localhost", "127.0.0.1", "::1"):
+        host = platform.node() or host
+    return f"{model}@{host}"
+
+
+def format_duration(seconds: float) -> str:
+    """Durée lisible (ex: '2h13', '4m05s', '12s')."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ThroughputHistory:
+    """Débit mesuré (caractères corrigés par seconde d'appel au modèle)."""
+
+    def __init__(self, vault_path: str):
+        self.path = vault_cache_path(Path(vault_path), "throughput", ".json")
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def rate(self, model: str) -> Optional[float]:
+        """Débit moyen en caractères/s, ou None sans historique."""
+        entry = self._load().get(host_key(model))
+        return entry["chars_per_second"] if entry else None
+
+    def record(self, model: str, chars: int, seconds: float) -> None:
+        """
+        Ajoute un passage à l'historique.
+
+        Args:
+            model: Modèle utilisé
+            chars: Caractères envoyés au modèle
+            seconds: Temps passé dans les appels au modèle
+        """
+        if chars <= 0 or seconds <= 0:
+            return
+        history = self._load()
+        key = host_key(model)
+        measured = chars / seconds
+        entry = history.get(key)
+        if entry:
+            entry["chars_per_second"] += _SMOOTHING * (measured - entry["chars_per_second"])
+            entry["runs"] += 1
+        else:
+            entry = {"chars_per_second": measured, "runs": 1}
+        entry["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        history[key] = entry
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Fichier temporaire puis renommage: un arrêt brutal ne laisse pas un JSON tronqué
+        AtomicWriter(sync="none").write(self.path, json.dumps(history, indent=2, ensure_ascii=False))
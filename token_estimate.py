@@ -0,0 +1,221 @@
+"""
+Estimation locale du nombre de tokens d'un texte, calibrée par modèle
+
+Le nombre de tokens est une combinaison linéaire de quelques mesures du texte
+(caractères, mots, symboles, lettres accentuées). Les coefficients sont ajustés
+une fois par modèle sur les comptes exacts du serveur, puis affinés à chaque
+correction avec le nombre de tokens générés (eval_count). Ils sont gardés dans
+~/.cache/correcteur-obsidian/tokens.json: ensuite, aucun appel réseau.
+"""
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_write import AtomicWriter
+
+CACHE_PATH = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "correcteur-obsidian" / "tokens.json"
+
+# Mesures: caractères, mots, symboles (ponctuation, Markdown), lettres non ASCII, constante
+FEATURES = ("chars", "words", "symbols", "non_ascii", "constant")
+# Sans calibration: ~4 caractères par token
+DEFAULT_COEFFICIENTS = (0.25, 0.0, 0.0, 0.0, 0.0)
+# Poids de l'a priori (DEFAULT_COEFFICIENTS) face aux mesures
+_PRIOR_WEIGHT = 1.0
+# Gabarit de chat ajouté à chaque message (rôle, délimiteurs)
+MESSAGE_OVERHEAD = 8
+
+_WORD_RE = re.compile(r"\w+")
+_SYMBOL_RE = re.compile(r"[^\w\s]")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
+# Phrases de calibration par langue (une requête chacune)
+_SENTENCES_PER_LANGUAGE = 8
+
+# Extraits Markdown pour la calibration (en plus des phrases de language_id)
+_MARKDOWN_SAMPLES = [
+    "## Objectifs du trimestre\n\n- [ ] Finir la migration\n- [x] Relire la doc",
+    "Voir [[Projets/Refonte du site|la refonte]] et #todo/urgent pour la suite.",
+    "```python\ndef main():\n    print(\"ok\")\n```",
+    "| Tâche | Priorité | Échéance |\n|---|---|---|\n| Rapport | haute | 12/03 |",
+    "> [!note] À retenir\n> Les sauvegardes sont dans `.backups/` (voir https://obsidian.md).",
+    "---\ntags: [réunion, équipe]\ndate: 2024-05-02\n---",
+]
+
+
+def features(text: str) -> List[int]:
+    """Mesures d'un texte (dans l'ordre de FEATURES)."""
+    return [len(text), len(_WORD_RE.findall(text)), len(_SYMBOL_RE.findall(text)),
+            len(_NON_ASCII_RE.findall(text)), 1]
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Résout un petit système linéaire (élimination de Gauss avec pivot)."""
+    n = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if abs(rows[col][col]) < 1e-12:
+            continue
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] if abs(rows[i][i]) >= 1e-12 else 0.0 for i in range(n)]
+
+
+class TokenEstimator:
+    """Compte de tokens estimé pour un modèle, sans appel réseau."""
+
+    def __init__(self, model: str, entry: Optional[dict] = None):
+        """
+        Args:
+            model: Modèle Ollama
+            entry: Mesures accumulées (format du cache), None pour l'a priori seul
+        """
+        size = len(FEATURES)
+        entry = entry or {}
+        self.model = model
+        self.samples = entry.get("samples", 0)
+        self.error = entry.get("error")
+        self.calibrated = entry.get("calibrated", "")
+        self._xtx = entry.get("xtx") or [[0.0] * size for _ in range(size)]
+        self._xty = entry.get("xty") or [0.0] * size
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._solve()
+
+    def _solve(self) -> None:
+        # Moindres carrés régularisés vers l'a priori (stable avec peu d'exemples)
+        size = len(FEATURES)
+        matrix = [[self._xtx[i][j] + (_PRIOR_WEIGHT if i == j else 0.0) for j in range(size)]
+                  for i in range(size)]
+        vector = [self._xty[i] + _PRIOR_WEIGHT * DEFAULT_COEFFICIENTS[i] for i in range(size)]
+        self.coefficients = _solve(matrix, vector)
+
+    def count(self, text: str) -> int:
+        """Nombre de tokens estimé d'un texte."""
+        if not text:
+            return 0
+        return max(1, round(sum(c * x for c, x in zip(self.coefficients, features(text)))))
+
+    def count_messages(self, messages: List[dict]) -> int:
+        """Nombre de tokens estimé d'une conversation (gabarit de chat compris)."""
+        return sum(self.count(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+
+    def observe(self, text: str, tokens: int) -> None:
+        """Ajoute un compte exact (ex: eval_count du texte généré) aux mesures."""
+        if not text or tokens <= 0:
+            return
+        x = features(text)
+        with self._lock:
+            for i, xi in enumerate(x):
+                self._xty[i] += xi * tokens
+                for j, xj in enumerate(x):
+                    self._xtx[i][j] += xi * xj
+            self.samples += 1
+            self._dirty = True
+            self._solve()
+
+    def to_entry(self) -> dict:
+        """Mesures accumulées, au format du cache."""
+        return {"samples": self.samples, "error": self.error, "calibrated": self.calibrated,
+                "coefficients": [round(c, 5) for c in self.coefficients],
+                "xtx": self._xtx, "xty": self._xty}
+
+
+_estimators: Dict[str, TokenEstimator] = {}
+_estimators_lock = threading.Lock()
+
+
+def _load_cache() -> dict:
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def estimator_for(model: str) -> TokenEstimator:
+    """Estimateur d'un modèle (lu une fois depuis le cache, partagé entre threads)."""
+    with _estimators_lock:
+        if model not in _estimators:
+            _estimators[model] = TokenEstimator(model, _load_cache().get(model))
+        return _estimators[model]
+
+
+def save_estimators(models: Optional[List[str]] = None) -> None:
+    """Enregistre les estimateurs modifiés (ou ceux de `models`) dans le cache."""
+    with _estimators_lock:
+        estimators = [e for e in _estimators.values()
+                      if e._dirty or (models is not None and e.model in models)]
+    if not estimators:
+        return
+    cache = _load_cache()
+    for estimator in estimators:
+        with estimator._lock:
+            cache[estimator.model] = estimator.to_entry()
+            estimator._dirty = False
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    AtomicWriter(sync="none").write(CACHE_PATH, json.dumps(cache, indent=1))
+
+
+def calibration_samples() -> List[str]:
+    """
+    Textes de calibration: extraits Markdown, phrases de plusieurs langues, paragraphes.
+
+    Deux textes consécutifs ne commencent jamais pareil: le serveur réutilise le
+    préfixe de la requête précédente et ne le compterait pas.
+    """
+    from language_id import _SAMPLES
+
+    samples = list(_MARKDOWN_SAMPLES)
+    paragraphs = [" ".join(text.split()) for text in _SAMPLES.values()]
+    for text in paragraphs:
+        sentences = [s.strip() + "." for s in text.split(". ") if s.strip()]
+        samples.extend(sentences[:_SENTENCES_PER_LANGUAGE])
+    return samples + paragraphs
+
+
+def calibrate(model: str, options: Optional[dict] = None, keep_alive=None) -> TokenEstimator:
+    """
+    Calibre l'estimateur d'un modèle sur les comptes exacts du serveur (réseau).
+
+    Les mesures accumulées sont remplacées; le résultat est enregistré dans le cache.
+
+    Args:
+        model: Modèle Ollama (chargé)
+        options: Options des requêtes (même num_ctx que les corrections, sinon
+            Ollama recharge le modèle)
+        keep_alive: Durée de maintien en mémoire (défaut d'ollama_api)
+
+    Returns:
+        Estimateur calibré (erreur relative moyenne dans .error)
+
+    Raises:
+        OllamaError: si le serveur ne répond pas
+    """
+    from ollama_api import DEFAULT_KEEP_ALIVE, count_tokens
+
+    estimator = TokenEstimator(model)
+    measured = []
+    for text in calibration_samples():
+        # Le token de début est compté par le serveur, pas dans un message de chat
+        tokens = count_tokens(model, text, options=options,
+                              keep_alive=keep_alive or DEFAULT_KEEP_ALIVE) - 1
+        if tokens < len(text) / 12:
+            continue  # Préfixe resté en cache malgré tout: compte partiel
+        measured.append((text, tokens))
+        estimator.observe(text, tokens)
+
+    errors = [abs(estimator.count(text) - tokens) / tokens for text, tokens in measured if tokens > 0]
+    estimator.error = sum(errors) / len(errors) if errors else None
+    estimator.calibrated = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with _estimators_lock:
+        _estimators[model] = estimator
+    save_estimators([model])
+    return estimator
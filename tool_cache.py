@@ -0,0 +1,180 @@
+"""
+Cache des résultats d'outils Obsidian pour une session d'agents
+Les lectures, listages et recherches répétés ne retournent pas sur le disque,
+sauf si une écriture ou une modification externe (mtime) les a invalidés
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from obsidian_tools import ObsidianTools
+from vault_index import IGNORED_DIRS
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime, taille) d'un fichier, ou None s'il n'existe pas."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _scope_signature(root: Path, with_files: bool) -> dict:
+    """
+    Empreinte d'un dossier: mtime de chaque sous-dossier (ajouts, suppressions,
+    renommages) et, si demandé, (mtime, taille) de chaque note.
+
+    Les dossiers cachés (.obsidian, .trash, .correcteur...) sont ignorés:
+    Obsidian y réécrit sans cesse workspace.json sans qu'aucune note change.
+    """
+    dirs: Dict[str, int] = {}
+    files: Dict[str, Tuple[int, int]] = {}
+    for current, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames
+                       if name not in IGNORED_DIRS and not name.startswith(".")]
+        try:
+            dirs[current] = os.stat(current).st_mtime_ns
+        except OSError:
+            continue
+        if with_files:
+            for name in filenames:
+                if name.endswith(".md"):
+                    signature = _file_signature(Path(current) / name)
+                    if signature is not None:
+                        files[os.path.join(current, name)] = signature
+    return {"dirs": dirs, "files": files}
+
+
+def _scope_is_valid(signature: dict) -> bool:
+    """Vérifie par de simples stat() que rien n'a changé dans le dossier."""
+    for directory, mtime in signature["dirs"].items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    for path, file_signature in signature["files"].items():
+        if _file_signature(Path(path)) != file_signature:
+            return False
+    return True
+
+
+class SessionToolCache:
+    """
+    Enveloppe de ObsidianTools partagée par tous les agents d'une session.
+
+    read_note, list_notes et search_notes sont mémorisés; les autres
+    méthodes (graphe, recherche sémantique...) sont déléguées telles quelles.
+    """
+
+    def __init__(self, tools: ObsidianTools):
+        """
+        Initialise un cache vide.
+
+        Args:
+            tools: Outils Obsidian sous-jacents (et leurs index partagés)
+        """
+        self._tools = tools
+        self.vault_path = tools.vault_path
+        self._lock = threading.Lock()
+        self._reads: Dict[tuple, tuple] = {}   # (note, options) -> (signature, résultat)
+        self._scans: Dict[tuple, tuple] = {}   # (méthode, args) -> (dossier, signature, résultat)
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self._tools, name)
+
+    def _note_key(self, note_path: str) -> str:
+        return (self.vault_path / note_path).resolve().as_posix()
+
+    def read_note(self, note_path: str, start_line: int = 1, end_line: int = 0,
+                  section: str = "", max_tokens: int = 0) -> str:
+        """Version mémorisée de ObsidianTools.read_note (validée par mtime/taille)."""
+        return self._cached_read(note_path, start_line=start_line, end_line=end_line,
+                                 section=section, max_tokens=max_tokens)
+
+    def _cached_read(self, note_path: str, **kwargs) -> str:
+        """Mémorise une lecture de note, avec ses options."""
+        key = (self._note_key(note_path), tuple(sorted(kwargs.items())))
+        signature = _file_signature(self.vault_path / note_path)
+
+        with self._lock:
+            cached = self._reads.get(key)
+            if cached is not None and signature is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        result = self._tools.read_note(note_path, **kwargs)
+        if signature is not None:
+            with self._lock:
+                self._reads[key] = (signature, result)
+        return result
+
+    def _cached_scan(self, method: str, folder: str, with_files: bool, **kwargs) -> str:
+        """Mémorise un listage ou une recherche sur un dossier."""
+        key = (method, folder, tuple(sorted(kwargs.items())))
+        root = self.vault_path / folder if folder else self.vault_path
+
+        with self._lock:
+            cached = self._scans.get(key)
+        if cached is not None and _scope_is_valid(cached[1]):
+            with self._lock:
+                self.hits += 1
+            return cached[2]
+
+        # Empreinte prise avant l'appel: un changement pendant le scan invalidera l'entrée
+        signature = _scope_signature(root, with_files) if root.exists() else None
+        result = getattr(self._tools, method)(folder=folder, **kwargs)
+        with self._lock:
+            self.misses += 1
+            if signature is not None:
+                self._scans[key] = (root.resolve().as_posix(), signature, result)
+        return result
+
+    # Signatures explicites: les tools des agents en déduisent leurs arguments
+
+    def list_notes(self, folder: str = "", pattern: str = "*.md", offset: int = 0,
+                   limit: int = 100, tree: bool = False) -> str:
+        """Version mémorisée de ObsidianTools.list_notes."""
+        return self._cached_scan("list_notes", folder, False, pattern=pattern,
+                                 offset=offset, limit=limit, tree=tree)
+
+    def search_notes(self, query: str, folder: str = "", offset: int = 0,
+                     limit: int = 20) -> str:
+        """Version mémorisée de ObsidianTools.search_notes."""
+        return self._cached_scan("search_notes", folder, True, query=query,
+                                 offset=offset, limit=limit)
+
+    def write_note(self, note_path: str, content: str, append: bool = False) -> str:
+        """Écrit la note puis invalide exactement les entrées qui la concernent."""
+        result = self._tools.write_note(note_path, content, append=append)
+        self.invalidate(note_path)
+        return result
+
+    def invalidate(self, note_path: str) -> None:
+        """
+        Oublie la lecture d'une note et les listages/recherches qui la couvrent.
+
+        Args:
+            note_path: Chemin relatif de la note modifiée
+        """
+        path = self._note_key(note_path)
+        with self._lock:
+            for key in [k for k in self._reads if k[0] == path]:
+                del self._reads[key]
+            for key, (root, _, _) in list(self._scans.items()):
+                if path == root or path.startswith(root.rstrip("/") + "/"):
+                    del self._scans[key]
+
+    def stats(self) -> dict:
+        """Compteurs du cache pour la session."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,191 @@
+"""
+Traces structurées des exécutions d'agents (tâches, étapes, appels LLM, outils)
+Format Chrome trace-event (chrome://tracing, ui.perfetto.dev) ou JSON lines
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+
+class Tracer:
+    """
+    Écrit un événement par span terminé, au fil de l'eau.
+
+    Chaque événement est un « complete event » Chrome (ph='X', ts/dur en µs);
+    en JSON lines, les mêmes dicts sont écrits un par ligne.
+    """
+
+    def __init__(self, path: str):
+        """
+        Ouvre le fichier de trace.
+
+        Args:
+            path: Fichier de sortie; extension .jsonl = JSON lines,
+                sinon tableau JSON au format Chrome trace-event
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.jsonl = self.path.suffix == ".jsonl"
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._file = open(self.path, "w", encoding="utf-8")
+        if not self.jsonl:
+            # Le crochet fermant est facultatif: la trace reste lisible si le processus est interrompu
+            self._file.write("[\n")
+        self._first = True
+
+    @classmethod
+    def from_env(cls) -> Optional["Tracer"]:
+        """Tracer vers TRACE_FILE, ou None si la variable n'est pas définie."""
+        path = os.getenv("TRACE_FILE", "")
+        return cls(path) if path else None
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def emit(self, name: str, cat: str, start_us: float, end_us: float, **args) -> None:
+        """Enregistre un span terminé."""
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(end_us - start_us, 1),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file.closed:
+                return
+            if self.jsonl:
+                self._file.write(line + "\n")
+            else:
+                self._file.write(("" if self._first else ",\n") + line)
+            self._first = False
+            self._file.flush()
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args):
+        """
+        Mesure un bloc de code.
+
+        Le dict produit peut être complété (tailles, compteurs) avant la fin du bloc.
+        """
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            self.emit(name, cat, start, self._now_us(), **args)
+
+    def close(self) -> None:
+        """Termine et ferme le fichier de trace."""
+        with self._lock:
+            if self._file.closed:
+                return
+            if not self.jsonl:
+                self._file.write("\n]\n")
+            self._file.close()
+
+    # Tâches et étapes d'agents (processus séquentiel: un span va de la fin
+    # du précédent à la notification suivante, par thread)
+
+    def begin_tasks(self) -> None:
+        """Marque le début d'un crew sur le thread courant."""
+        self._local.task_start = self._local.step_start = self._now_us()
+
+    def task_callback(self, name: str):
+        """Callback de Task CrewAI: ferme le span de la tâche qui vient de finir."""
+        def callback(output) -> None:
+            now = self._now_us()
+            start = getattr(self._local, "task_start", now)
+            text = str(getattr(output, "raw_output", output) or "")
+            self.emit(name, "task", start, now, output_chars=len(text))
+            self._local.task_start = self._local.step_start = now
+        return callback
+
+    def step_callback(self, agent_role: str):
+        """Callback d'Agent CrewAI: un span par étape de raisonnement."""
+        def callback(step) -> None:
+            now = self._now_us()
+            start = getattr(self._local, "step_start", now)
+            if isinstance(step, list):
+                # Liste de (AgentAction, observation)
+                tools = [getattr(action, "tool", "?") for action, _ in step]
+                observed = sum(len(str(observation)) for _, observation in step)
+                self.emit(f"{agent_role}: {', '.join(tools) or 'étape'}", "step", start, now,
+                          agent=agent_role, tools=tools, observation_chars=observed)
+            else:
+                output = getattr(step, "return_values", {}).get("output", "")
+                self.emit(f"{agent_role}: réponse finale", "step", start, now,
+                          agent=agent_role, output_chars=len(str(output)))
+            self._local.step_start = now
+        return callback
+
+    # Appels d'outils
+
+    def wrap_tool(self, name: str, func):
+        """
+        Enveloppe une méthode d'outil dans un span.
+
+        functools.wraps conserve la signature: StructuredTool en déduit toujours ses arguments.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arg_chars = sum(len(str(v)) for v in args) + sum(len(str(v)) for v in kwargs.values())
+            with self.span(name, "tool", arg_chars=arg_chars,
+                           args_preview={k: str(v)[:80] for k, v in kwargs.items()}) as info:
+                result = func(*args, **kwargs)
+                info["output_chars"] = len(str(result))
+                return result
+        return wrapper
+
+    # Appels LLM
+
+    def llm_handler(self, label: str):
+        """
+        Callback LangChain mesurant chaque appel au modèle.
+
+        Les compteurs de tokens viennent de la réponse d'Ollama
+        (prompt_eval_count, eval_count).
+        """
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        tracer = self
+        starts = {}
+
+        class _LLMHandler(BaseCallbackHandler):
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                starts[run_id] = (tracer._now_us(), sum(len(p) for p in prompts))
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                start, prompt_chars = starts.pop(run_id, (tracer._now_us(), 0))
+                info = {}
+                generations = getattr(response, "generations", None) or [[]]
+                if generations[0]:
+                    info = generations[0][0].generation_info or {}
+                    completion_chars = len(generations[0][0].text)
+                else:
+                    completion_chars = 0
+                tracer.emit(label, "llm", start, tracer._now_us(),
+                            prompt_chars=prompt_chars,
+                            completion_chars=completion_chars,
+                            prompt_tokens=info.get("prompt_eval_count"),
+                            completion_tokens=info.get("eval_count"),
+                            load_ms=info.get("load_duration", 0) / 1e6,
+                            eval_ms=info.get("eval_duration", 0) / 1e6)
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                start, prompt_chars = starts.pop(run_id, (tracer._now_us(), 0))
+                tracer.emit(label, "llm", start, tracer._now_us(),
+                            prompt_chars=prompt_chars, error=str(error))
+
+        return _LLMHandler()
@@ -0,0 +1,458 @@
+"""
+Index du graphe du vault Obsidian: liens, embeds, tags, alias et frontmatter
+Mis à jour de façon incrémentale (seules les notes modifiées sont relues)
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# Dossiers ignorés par Obsidian (et par nos propres fichiers de travail)
+IGNORED_DIRS = {".obsidian", ".trash", ".backups", ".correcteur", ".git"}
+
+_FRONTMATTER_RE = re.compile(r"\A---\s*\n(.*?)\n---\s*(?:\n|\Z)", re.DOTALL)
+_CODE_BLOCK_RE = re.compile(r"^(```|~~~).*?^\1", re.DOTALL | re.MULTILINE)
+_INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+_WIKILINK_RE = re.compile(r"(!?)\[\[([^\[\]\n]+?)\]\]")
+_TAG_RE = re.compile(r"(?:(?<=\s)|^)#([^\s#.,;:!?()\[\]{}\"'`]+)", re.MULTILINE)
+
+
+def vault_cache_path(vault_path: Path, kind: str, suffix: str = "") -> Path:
+    """
+    Emplacement de travail propre à un vault, hors du vault (ni synchronisé ni versionné).
+
+    Args:
+        vault_path: Chemin du vault
+        kind: Sous-dossier du cache (ex: 'queues', 'llm')
+        suffix: Extension du fichier ('' pour un dossier)
+
+    Returns:
+        ~/.cache/correcteur-obsidian/<kind>/<nom du vault>-<empreinte du chemin><suffix>
+    """
+    vault_path = Path(vault_path)
+    cache = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    key = hashlib.sha256(str(vault_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache / "correcteur-obsidian" / kind / f"{vault_path.name}-{key}{suffix}"
+
+
+def _normalize_target(target: str) -> str:
+    """Forme canonique d'une cible de lien: minuscules, sans extension .md."""
+    target = target.strip().lower()
+    return target[:-3] if target.endswith(".md") else target
+
+
+def _parent_tags(tag: str) -> List[str]:
+    """Tags parents d'un tag imbriqué ('a/b/c' -> ['a', 'a/b'])."""
+    parts = tag.split("/")
+    return ["/".join(parts[:i]) for i in range(1, len(parts))]
+
+
+def iter_note_files(root: Path):
+    """
+    Parcourt récursivement les notes Markdown d'un dossier.
+
+    Args:
+        root: Dossier de départ
+
+    Yields:
+        Tuple (chemin, os.stat_result) pour chaque note .md
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in IGNORED_DIRS or entry.name.startswith("."):
+                    continue
+                stack.append(Path(entry.path))
+            elif entry.name.endswith(".md"):
+                try:
+                    yield Path(entry.path), entry.stat()
+                except OSError:
+                    continue
+
+
+def _parse_frontmatter(block: str) -> Dict[str, List[str]]:
+    """
+    Lit un frontmatter YAML simple (clé: valeur, listes en ligne ou en tirets).
+
+    Args:
+        block: Contenu entre les deux lignes '---'
+
+    Returns:
+        Dict clé -> liste de valeurs (chaînes)
+    """
+    properties: Dict[str, List[str]] = {}
+    current_key = None
+
+    for line in block.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+
+        if line.startswith((" ", "\t", "-")) and current_key is not None:
+            item = line.strip()
+            if item.startswith("- "):
+                item = item[2:]
+            elif item == "-":
+                continue
+            properties[current_key].append(item.strip().strip("'\""))
+            continue
+
+        if ":" not in line:
+            current_key = None
+            continue
+
+        key, _, value = line.partition(":")
+        current_key = key.strip()
+        value = value.strip()
+        properties[current_key] = []
+
+        if value.startswith("[") and value.endswith("]"):
+            items = [v.strip().strip("'\"") for v in value[1:-1].split(",")]
+            properties[current_key].extend(v for v in items if v)
+        elif value:
+            properties[current_key].append(value.strip("'\""))
+
+    return properties
+
+
+def parse_note(content: str) -> dict:
+    """
+    Extrait les éléments structurels d'une note.
+
+    Args:
+        content: Contenu brut de la note
+
+    Returns:
+        Dict avec 'links', 'embeds', 'tags', 'aliases' et 'properties'
+    """
+    properties: Dict[str, List[str]] = {}
+    body = content
+
+    match = _FRONTMATTER_RE.match(content)
+    if match:
+        properties = _parse_frontmatter(match.group(1))
+        body = content[match.end():]
+
+    # Les liens et tags dans le code ne comptent pas
+    body = _CODE_BLOCK_RE.sub("", body)
+    body = _INLINE_CODE_RE.sub("", body)
+
+    links: Set[str] = set()
+    embeds: Set[str] = set()
+    for bang, inner in _WIKILINK_RE.findall(body):
+        target = inner.split("|", 1)[0].split("#", 1)[0].strip()
+        if not target:
+            continue
+        (embeds if bang else links).add(target)
+
+    tags = {tag.lower() for tag in _TAG_RE.findall(body) if not tag.isdigit()}
+    for key in ("tags", "tag"):
+        for value in properties.get(key, []):
+            for tag in re.split(r"[,\s]+", value):
+                tag = tag.lstrip("#").lower()
+                if tag:
+                    tags.add(tag)
+
+    aliases = set()
+    for key in ("aliases", "alias"):
+        aliases.update(v for v in properties.get(key, []) if v)
+
+    return {
+        "links": links,
+        "embeds": embeds,
+        "tags": tags,
+        "aliases": aliases,
+        "properties": properties,
+    }
+
+
+class VaultIndex:
+    """Index en mémoire des relations entre les notes du vault."""
+
+    def __init__(self, vault_path: str, refresh_interval: float = 2.0):
+        """
+        Initialise l'index (vide tant que refresh() n'a pas été appelé).
+
+        Args:
+            vault_path: Chemin vers le vault Obsidian
+            refresh_interval: Délai minimal (s) entre deux rescans du disque
+        """
+        self.vault_path = Path(vault_path)
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        # Partagé entre threads (recherches parallèles, workers, serveur): un
+        # rescan ne doit pas modifier les dicts pendant qu'une requête les parcourt
+        self._lock = threading.RLock()
+
+        # note -> informations parsées et mtime
+        self._notes: Dict[str, dict] = {}
+        self._mtimes: Dict[str, int] = {}
+
+        # Index inversés
+        self._names: Dict[str, Set[str]] = {}       # nom/alias (minuscules) -> notes
+        self._backlinks: Dict[str, Set[str]] = {}   # cible normalisée -> notes sources
+        self._tags: Dict[str, Set[str]] = {}        # tag -> notes
+        self._nested_tags: Dict[str, Set[str]] = {}  # tag parent -> notes des sous-tags
+        self._properties: Dict[str, Set[str]] = {}  # clé -> notes
+        self._property_values: Dict[tuple, Set[str]] = {}  # (clé, valeur) -> notes
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Synchronise l'index avec le disque (stat uniquement, relit les notes modifiées).
+
+        Args:
+            force: Si True, ignore l'intervalle minimal entre deux rescans
+
+        Returns:
+            Nombre de notes ajoutées, modifiées ou supprimées
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._notes and now - self._last_refresh < self.refresh_interval:
+                return 0
+
+            seen = set()
+            changed = []
+            for path, stat in iter_note_files(self.vault_path):
+                relative = path.relative_to(self.vault_path).as_posix()
+                seen.add(relative)
+                if self._mtimes.get(relative) != stat.st_mtime_ns:
+                    changed.append(relative)
+
+            removed = [note for note in self._notes if note not in seen]
+            for note in removed:
+                self._remove(note)
+
+            parsed = 0
+            for note in changed:
+                self._remove(note)
+                info = self._read(note)
+                if info is not None:
+                    self._add(note, info)
+                    parsed += 1
+
+            self._last_refresh = now
+            return parsed + len(removed)
+
+    def update_note(self, note_path: str) -> None:
+        """
+        Met à jour une seule note (après une écriture connue).
+
+        Args:
+            note_path: Chemin relatif de la note
+        """
+        with self._lock:
+            note = Path(note_path).as_posix()
+            if not self._notes and not self._last_refresh:
+                return  # Index jamais construit: la prochaine requête fera le scan
+
+            self._remove(note)
+            info = self._read(note)
+            if info is not None:
+                self._add(note, info)
+
+    def _read(self, note: str) -> Optional[dict]:
+        """Lit et parse une note; retourne None si elle est illisible."""
+        full_path = self.vault_path / note
+        try:
+            mtime = full_path.stat().st_mtime_ns
+            with open(full_path, "r", encoding="utf-8") as f:
+                info = parse_note(f.read())
+        except (OSError, UnicodeDecodeError):
+            return None
+        info["mtime"] = mtime
+        return info
+
+    def _add(self, note: str, info: dict) -> None:
+        """Ajoute une note parsée à tous les index inversés."""
+        self._notes[note] = info
+        self._mtimes[note] = info["mtime"]
+
+        for name in self._names_of(note, info):
+            self._names.setdefault(name, set()).add(note)
+
+        for target in info["links"] | info["embeds"]:
+            self._backlinks.setdefault(_normalize_target(target), set()).add(note)
+
+        for tag in info["tags"]:
+            self._tags.setdefault(tag, set()).add(note)
+            for parent in _parent_tags(tag):
+                self._nested_tags.setdefault(parent, set()).add(note)
+
+        for key, values in info["properties"].items():
+            self._properties.setdefault(key.lower(), set()).add(note)
+            for value in values:
+                self._property_values.setdefault((key.lower(), value.lower()), set()).add(note)
+
+    def _remove(self, note: str) -> None:
+        """Retire une note de tous les index inversés."""
+        info = self._notes.pop(note, None)
+        self._mtimes.pop(note, None)
+        if info is None:
+            return
+
+        for name in self._names_of(note, info):
+            self._discard(self._names, name, note)
+
+        for target in info["links"] | info["embeds"]:
+            self._discard(self._backlinks, _normalize_target(target), note)
+
+        for tag in info["tags"]:
+            self._discard(self._tags, tag, note)
+            for parent in _parent_tags(tag):
+                self._discard(self._nested_tags, parent, note)
+
+        for key, values in info["properties"].items():
+            self._discard(self._properties, key.lower(), note)
+            for value in values:
+                self._discard(self._property_values, (key.lower(), value.lower()), note)
+
+    @staticmethod
+    def _discard(index: dict, key, note: str) -> None:
+        """Retire une note d'une entrée d'index et supprime l'entrée si vide."""
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.discard(note)
+        if not bucket:
+            del index[key]
+
+    @staticmethod
+    def _names_of(note: str, info: dict) -> Set[str]:
+        """Noms sous lesquels une note peut être liée (chemin, nom, alias)."""
+        path = Path(note)
+        names = {
+            path.with_suffix("").as_posix().lower(),
+            path.stem.lower(),
+        }
+        names.update(_normalize_target(alias) for alias in info["aliases"])
+        return names
+
+    def _resolve(self, target: str) -> str:
+        """
+        Résout une cible de lien [[...]] vers un chemin de note.
+
+        Returns:
+            Chemin relatif de la note, ou la cible brute si introuvable
+        """
+        candidates = self._names.get(_normalize_target(target))
+        if not candidates:
+            return target
+        # Comme Obsidian: le chemin le plus court l'emporte en cas d'ambiguïté
+        return min(candidates, key=lambda n: (n.count("/"), n))
+
+    # ------------------------------------------------------------------
+    # Requêtes (recherches directes dans les index)
+    # ------------------------------------------------------------------
+
+    def resolve(self, note_or_link: str) -> Optional[str]:
+        """Retourne le chemin d'une note à partir d'un chemin, d'un nom ou d'un alias."""
+        with self._lock:
+            self.refresh()
+            if note_or_link in self._notes:
+                return note_or_link
+            resolved = self._resolve(note_or_link)
+            return resolved if resolved in self._notes else None
+
+    def backlinks(self, note: str) -> List[str]:
+        """Notes qui pointent vers la note donnée (liens et embeds)."""
+        with self._lock:
+            self.refresh()
+            target = self.resolve(note)
+            if target is None:
+                return sorted(self._backlinks.get(_normalize_target(note), set()))
+
+            # Une note est liée par son chemin, son nom ou un alias: on ne garde que
+            # les noms qui se résolvent bien vers elle (cas des homonymes)
+            sources = set()
+            for name in self._names_of(target, self._notes[target]):
+                if self._resolve(name) == target:
+                    sources.update(self._backlinks.get(name, ()))
+            sources.discard(target)
+            return sorted(sources)
+
+    def outlinks(self, note: str) -> Dict[str, List[str]]:
+        """Liens sortants d'une note, résolus quand la cible existe."""
+        with self._lock:
+            self.refresh()
+            source = self.resolve(note)
+            info = self._notes.get(source) if source else None
+            if info is None:
+                return {"links": [], "embeds": []}
+            return {
+                "links": sorted(self._resolve(t) for t in info["links"]),
+                "embeds": sorted(self._resolve(t) for t in info["embeds"]),
+            }
+
+    def notes_by_tag(self, tag: str, include_nested: bool = True) -> List[str]:
+        """
+        Notes portant un tag (ex: 'projet', aussi 'projet/actif' si include_nested).
+        """
+        with self._lock:
+            self.refresh()
+            tag = tag.lstrip("#").lower()
+            notes = set(self._tags.get(tag, set()))
+            if include_nested:
+                notes.update(self._nested_tags.get(tag, set()))
+            return sorted(notes)
+
+    def notes_by_property(self, key: str, value: str = "") -> List[str]:
+        """Notes dont le frontmatter contient une clé (et éventuellement une valeur)."""
+        with self._lock:
+            self.refresh()
+            if value:
+                return sorted(self._property_values.get((key.lower(), value.lower()), set()))
+            return sorted(self._properties.get(key.lower(), set()))
+
+    def orphans(self) -> List[str]:
+        """Notes sans aucun lien entrant ni sortant."""
+        with self._lock:
+            self.refresh()
+            linked = set()
+            for target in self._backlinks:
+                resolved = self._resolve(target)
+                if resolved in self._notes:
+                    linked.add(resolved)
+            return sorted(
+                note for note, info in self._notes.items()
+                if note not in linked and not info["links"] and not info["embeds"]
+            )
+
+    def unresolved_links(self) -> Dict[str, List[str]]:
+        """Liens vers des notes inexistantes -> notes qui les contiennent."""
+        with self._lock:
+            self.refresh()
+            return {
+                target: sorted(sources)
+                for target, sources in sorted(self._backlinks.items())
+                if self._resolve(target) not in self._notes
+            }
+
+    def tags(self) -> Dict[str, int]:
+        """Tous les tags du vault avec leur nombre de notes."""
+        with self._lock:
+            self.refresh()
+            return {tag: len(notes) for tag, notes in sorted(self._tags.items())}
+
+    def properties(self, note: str) -> Dict[str, List[str]]:
+        """Frontmatter parsé d'une note."""
+        with self._lock:
+            self.refresh()
+            source = self.resolve(note)
+            info = self._notes.get(source) if source else None
+            return dict(info["properties"]) if info else {}
+
+    def __len__(self) -> int:
+        return len(self._notes)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Mode surveillance: corrige les notes peu après leur enregistrement
+Seuls les paragraphes modifiés depuis la dernière version connue sont envoyés au modèle
+"""
+import argparse
+import hashlib
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+from atomic_write import WriteConflict
+from correct_spelling import CorrectionError
+from markdown_segments import changed_ranges, normalize
+from ollama_api import OllamaError, load_model
+from vault_index import IGNORED_DIRS, iter_note_files
+
+# Période d'enregistrement du débit mesuré (pour les estimations des passages suivants)
+THROUGHPUT_SAVE_INTERVAL = 1800.0
+
+
+def _sha(content: str) -> str:
+    """Empreinte d'un contenu de note."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class PollingBackend:
+    """Détection des changements par comparaison périodique des mtimes."""
+
+    name = "polling"
+
+    def __init__(self, vault_path: Path, interval: float = 1.0):
+        self.vault_path = vault_path
+        self.interval = interval
+        self._mtimes = self._scan()
+
+    def _scan(self) -> Dict[str, int]:
+        return {
+            path.relative_to(self.vault_path).as_posix(): stat.st_mtime_ns
+            for path, stat in iter_note_files(self.vault_path)
+        }
+
+    def poll(self, timeout: float) -> List[str]:
+        """Attend une période de polling puis retourne les notes modifiées ou créées."""
+        time.sleep(self.interval)
+        current = self._scan()
+        changed = [note for note, mtime in current.items() if self._mtimes.get(note) != mtime]
+        self._mtimes = current
+        return changed
+
+    def stop(self) -> None:
+        pass
+
+
+class WatchdogBackend:
+    """Notifications du système de fichiers (inotify, FSEvents...) via watchdog."""
+
+    name = "watchdog"
+
+    def __init__(self, vault_path: Path):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self.vault_path = vault_path
+        self._events: "queue.Queue[str]" = queue.Queue()
+        events = self._events
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Les ouvertures/fermetures (nos propres lectures) sont ignorées
+                if event.is_directory or event.event_type not in ("created", "modified", "moved"):
+                    return
+                # Les éditeurs écrivent souvent un fichier temporaire puis le renomment
+                path = getattr(event, "dest_path", "") or event.src_path
+                if path.endswith(".md"):
+                    events.put(path)
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), str(vault_path), recursive=True)
+        self._observer.start()
+
+    def poll(self, timeout: float) -> List[str]:
+        """Retourne les notes signalées pendant au plus `timeout` secondes."""
+        paths = []
+        try:
+            paths.append(self._events.get(timeout=timeout))
+            while True:
+                paths.append(self._events.get_nowait())
+        except queue.Empty:
+            pass
+
+        notes = []
+        for path in paths:
+            try:
+                notes.append(Path(path).relative_to(self.vault_path).as_posix())
+            except ValueError:
+                continue
+        return notes
+
+    def stop(self) -> None:
+        self._observer.stop()
+        self._observer.join()
+
+
+def create_backend(vault_path: Path, interval: float = 1.0, polling: bool = False):
+    """
+    Choisit le mécanisme de surveillance: watchdog si installé, sinon polling.
+
+    Args:
+        vault_path: Vault à surveiller
+        interval: Période du polling en secondes
+        polling: Forcer le polling (utile sur les montages réseau)
+    """
+    if not polling:
+        try:
+            return WatchdogBackend(vault_path)
+        except ImportError:
+            pass
+    return PollingBackend(vault_path, interval=interval)
+
+
+class VaultWatcher:
+    """Surveille le vault et corrige les paragraphes modifiés."""
+
+    def __init__(self, corrector, debounce: float = 5.0, interval: float = 1.0,
+                 create_backups: bool = True, polling: bool = False):
+        """
+        Initialise la surveillance.
+
+        Args:
+            corrector: Instance de SpellingCorrector
+            debounce: Délai sans nouvelle modification avant de corriger (s)
+            interval: Période du polling si watchdog n'est pas disponible (s)
+            create_backups: Si True, crée un backup avant chaque écriture
+            polling: Forcer le polling au lieu des notifications système
+        """
+        self.corrector = corrector
+        self.vault_path = corrector.vault_path.resolve()
+        self.debounce = debounce
+        self.create_backups = create_backups
+
+        self._backend = create_backend(self.vault_path, interval=interval, polling=polling)
+        self._pending: Dict[str, float] = {}
+        self._snapshots: Dict[str, str] = {}    # note -> dernier contenu connu
+        self._own_writes: Dict[str, str] = {}   # note -> empreinte de notre dernière écriture
+        self._last_ping = 0.0
+        self._last_throughput = 0.0
+        self.stats = {"corrected": 0, "unchanged": 0, "errors": 0}
+
+    def _ignored(self, note: str) -> bool:
+        """Vrai pour les dossiers techniques (backups, config Obsidian, état interne)."""
+        parts = Path(note).parts[:-1]
+        return any(part in IGNORED_DIRS or part.startswith(".") for part in parts)
+
+    def _read(self, note: str):
+        try:
+            with open(self.vault_path / note, "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _keep_warm(self) -> None:
+        """Ping périodique pour qu'Ollama ne décharge pas le modèle."""
+        now = time.monotonic()
+        if now - self._last_ping < 60:
+            return
+        self._last_ping = now
+        try:
+            # Même num_ctx que les corrections courtes, sinon Ollama recharge le modèle
+            load_model(self.corrector.model, keep_alive=self.corrector.keep_alive,
+                       options={"num_ctx": self.corrector.ctx_buckets[0]})
+        except OllamaError as e:
+            print(f"⚠️  Ollama injoignable: {e}")
+
+    def _save_throughput(self, force: bool = False) -> None:
+        """Enregistre le débit mesuré (toutes les THROUGHPUT_SAVE_INTERVAL secondes, et à l'arrêt)."""
+        now = time.monotonic()
+        if not force and now - self._last_throughput < THROUGHPUT_SAVE_INTERVAL:
+            return
+        self._last_throughput = now
+        try:
+            self.corrector.save_throughput()
+        except OSError as e:
+            print(f"⚠️  Débit non enregistré: {e}")
+
+    def snapshot(self) -> int:
+        """Mémorise le contenu actuel de toutes les notes (référence pour les diffs)."""
+        for path, _ in iter_note_files(self.vault_path):
+            note = path.relative_to(self.vault_path).as_posix()
+            content = self._read(note)
+            if content is not None:
+                self._snapshots[note] = content
+        return len(self._snapshots)
+
+    def process(self, note: str) -> None:
+        """Corrige les paragraphes d'une note modifiés depuis le dernier contenu connu."""
+        content = self._read(note)
+        if content is None:
+            self._snapshots.pop(note, None)
+            return
+
+        # Événement provoqué par notre propre écriture
+        if self._own_writes.get(note) == _sha(content):
+            self._own_writes.pop(note, None)
+            self._snapshots[note] = content
+            return
+
+        previous = self._snapshots.get(note, "")
+        ranges = changed_ranges(previous, content)
+        self._snapshots[note] = content
+        if not ranges:
+            return
+
+        print(f"🔍 {note}: {len(ranges)} zone(s) modifiée(s)")
+        try:
+            corrected = self.corrector.correct_segments(content, changed=ranges)
+        except CorrectionError as e:
+            # Les zones modifiées seront de nouveau proposées au prochain enregistrement
+            self._snapshots[note] = previous
+            self.stats["errors"] += 1
+            print(f"  ❌ Erreur de correction: {e}")
+            return
+        if normalize(corrected) == normalize(content):
+            self.stats["unchanged"] += 1
+            print("  ✓ Aucune correction nécessaire")
+            return
+
+        full_path = self.vault_path / note
+        backup = None
+        try:
+            if self.create_backups:
+                backup = self.corrector.create_backup(full_path)
+            self._own_writes[note] = _sha(corrected)
+            # Écriture atomique, refusée si la note a changé pendant la correction
+            self.corrector.writer.write(full_path, corrected, expected=_sha(content))
+            self._snapshots[note] = corrected
+            self.stats["corrected"] += 1
+            print("  ✓ Corrigé et sauvegardé")
+        except WriteConflict:
+            # La note a été modifiée pendant la correction: on attendra la prochaine
+            self._own_writes.pop(note, None)
+            if backup is not None:
+                backup.unlink(missing_ok=True)
+            print("  ↻ Modifiée pendant la correction, reportée")
+            self._snapshots[note] = previous
+            self._pending[note] = time.monotonic()
+        except Exception as e:
+            self._own_writes.pop(note, None)
+            self.stats["errors"] += 1
+            print(f"  ❌ Erreur d'écriture: {e}")
+
+    def run(self) -> None:
+        """Boucle principale (Ctrl+C pour arrêter)."""
+        print(f"📸 {self.snapshot()} note(s) mémorisée(s)")
+        print(f"👀 Surveillance ({self._backend.name}), délai de {self.debounce:g}s après enregistrement")
+        self.corrector.warm_up()
+        self._last_ping = self._last_throughput = time.monotonic()
+
+        try:
+            while True:
+                for note in self._backend.poll(timeout=0.5):
+                    if not self._ignored(note):
+                        self._pending[note] = time.monotonic()
+
+                now = time.monotonic()
+                ready = [note for note, t in self._pending.items() if now - t >= self.debounce]
+                for note in ready:
+                    self._pending.pop(note, None)
+                    self.process(note)
+
+                self._keep_warm()
+                self._save_throughput()
+        finally:
+            self._backend.stop()
+            self._save_throughput(force=True)
+
+
+def main():
+    """Point d'entrée principal."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Correction continue des notes modifiées")
+    parser.add_argument("--debounce", type=float, default=5.0,
+                        help="Secondes sans modification avant de corriger (défaut: 5)")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Période du polling en secondes (défaut: 1)")
+    parser.add_argument("--polling", action="store_true",
+                        help="Forcer le polling (montages réseau, conteneurs)")
+    parser.add_argument("--no-backup", action="store_true", help="Ne pas créer de backups")
+    args = parser.parse_args()
+
+    VAULT_PATH = os.getenv("OBSIDIAN_VAULT_PATH", "")
+    MODEL = os.getenv("TOOL_MODEL", os.getenv("MAIN_MODEL", "llama3.1:8b"))
+
+    if not VAULT_PATH:
+        print("❌ Erreur: Définissez OBSIDIAN_VAULT_PATH dans .env")
+        sys.exit(1)
+
+    vault_path = Path(VAULT_PATH).resolve()
+    if not vault_path.exists():
+        print(f"❌ Erreur: Le vault n'existe pas: {vault_path}")
+        sys.exit(1)
+
+    from correct_spelling import SpellingCorrector
+
+    print("=" * 70)
+    print("👀 Correcteur Obsidian - Mode surveillance")
+    print("=" * 70)
+    print(f"📂 Vault: {vault_path}")
+    print(f"🧠 Modèle: {MODEL}")
+    print("=" * 70)
+
+    watcher = VaultWatcher(
+        SpellingCorrector(str(vault_path), model=MODEL),
+        debounce=args.debounce,
+        interval=args.interval,
+        create_backups=not args.no_backup,
+        polling=args.polling,
+    )
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        stats = watcher.stats
+        print(f"\n👋 Arrêt - ✅ {stats['corrected']} corrigée(s), "
+              f"➖ {stats['unchanged']} inchangée(s), ❌ {stats['errors']} erreur(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+File de travail partagée pour répartir une correction entre plusieurs workers
+(processus ou machines qui montent le même vault)
+
+Usage:
+    python work_queue.py enqueue --folder Projets      # coordinateur
+    python work_queue.py work                          # autant de workers que voulu
+    python work_queue.py status                        # résumé de tous les workers
+    python work_queue.py requeue                       # remettre les échecs en file
+
+Chaque worker prend un bail limité dans le temps sur une note et le prolonge
+tant qu'il y travaille; un bail expiré (worker arrêté) remet la note en file.
+Une note en échec est retentée plus tard (délai croissant) jusqu'à max_attempts.
+
+La file est locale par défaut (~/.cache/correcteur-obsidian/queues/): un fichier
+SQLite dans le vault serait répliqué par Obsidian Sync ou Dropbox, et son
+verrouillage n'est pas fiable sur ces systèmes de fichiers.
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+
+from vault_index import vault_cache_path
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Délai avant de retenter une note en échec (multiplié par le nombre d'essais)
+RETRY_DELAY = 60.0
+
+
+def default_queue_path(vault_path: Path) -> Path:
+    """File locale propre à un vault, hors du vault (pas de synchronisation)."""
+    return vault_cache_path(vault_path, "queues", ".sqlite")
+
+
+class WorkQueue:
+    """File de notes à corriger, stockée dans SQLite."""
+
+    def __init__(self, path: str, max_attempts: int = 3, retry_delay: float = RETRY_DELAY):
+        """
+        Ouvre (ou crée) la file.
+
+        Args:
+            path: Fichier SQLite (accessible par tous les workers)
+            max_attempts: Nombre de baux accordés par note avant de l'abandonner
+            retry_delay: Délai avant de retenter une note en échec (× nombre d'essais)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        # Transactions explicites (BEGIN IMMEDIATE) pour des baux atomiques entre processus
+        self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " note TEXT PRIMARY KEY, state TEXT NOT NULL, worker TEXT,"
+            " lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " result TEXT, enqueued REAL NOT NULL, started REAL, finished REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_state ON items(state, lease_until)")
+
+    def _transaction(self, sql_calls):
+        """Exécute des requêtes dans une transaction d'écriture exclusive."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = sql_calls(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, notes: Iterable[str]) -> int:
+        """
+        Ajoute des notes (celles déjà en file sont ignorées).
+
+        Returns:
+            Nombre de notes ajoutées
+        """
+        now = time.time()
+
+        def insert(db):
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO items (note, state, enqueued) VALUES (?, ?, ?)",
+                ((note, PENDING, now) for note in notes),
+            )
+            return db.total_changes - before
+
+        return self._transaction(insert)
+
+    def reset(self) -> None:
+        """Vide la file."""
+        self._transaction(lambda db: db.execute("DELETE FROM items"))
+
+    def requeue_failed(self) -> int:
+        """
+        Remet en file les notes en échec (compteur d'essais remis à zéro).
+
+        Returns:
+            Nombre de notes remises en file
+        """
+        def requeue(db):
+            cursor = db.execute(
+                "UPDATE items SET state = ?, attempts = 0, worker = NULL, lease_until = NULL, "
+                "finished = NULL WHERE state = ?", (PENDING, FAILED))
+            return cursor.rowcount
+
+        return self._transaction(requeue)
+
+    def lease(self, worker: str, duration: float) -> Optional[str]:
+        """
+        Prend un bail sur la prochaine note disponible (en attente ou bail expiré).
+
+        Une note en attente de nouvel essai (lease_until dans le futur) est ignorée
+        jusqu'à la fin de son délai.
+
+        Returns:
+            Chemin de la note, ou None si aucune n'est disponible
+        """
+        def take(db):
+            now = time.time()
+            # Baux expirés trop de fois: la note est abandonnée
+            db.execute(
+                "UPDATE items SET state = ?, result = ?, finished = ? "
+                "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, json.dumps({"success": False, "error": "Bail expiré trop de fois"}),
+                 now, LEASED, now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT note FROM items WHERE (state = ? AND (lease_until IS NULL OR lease_until <= ?)) "
+                "OR (state = ? AND lease_until < ?) ORDER BY attempts, enqueued LIMIT 1",
+                (PENDING, now, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE items SET state = ?, worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, started = ? WHERE note = ?",
+                (LEASED, worker, now + duration, now, row[0]),
+            )
+            return row[0]
+
+        return self._transaction(take)
+
+    def heartbeat(self, note: str, worker: str, duration: float) -> bool:
+        """Prolonge un bail; False si le worker ne le détient plus."""
+        def extend(db):
+            cursor = db.execute(
+                "UPDATE items SET lease_until = ? WHERE note = ? AND worker = ? AND state = ?",
+                (time.time() + duration, note, worker, LEASED),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(extend)
+
+    def complete(self, note: str, worker: str, result: dict) -> Optional[str]:
+        """
+        Enregistre le résultat d'une note.
+
+        Un échec est remis en file avec un délai tant que la note n'a pas épuisé
+        ses essais (Ollama indisponible un moment, par exemple), puis marqué en échec.
+
+        Returns:
+            Nouvel état de la note (DONE, PENDING pour un nouvel essai ou FAILED),
+            None si le bail avait été repris par un autre worker (résultat ignoré)
+        """
+        def finish(db):
+            now = time.time()
+            encoded = json.dumps(result, ensure_ascii=False)
+            if result.get("success"):
+                cursor = db.execute(
+                    "UPDATE items SET state = ?, result = ?, finished = ?, lease_until = NULL "
+                    "WHERE note = ? AND worker = ? AND state = ?",
+                    (DONE, encoded, now, note, worker, LEASED),
+                )
+            else:
+                cursor = db.execute(
+                    "UPDATE items SET result = ?, "
+                    "state = CASE WHEN attempts < ? THEN ? ELSE ? END, "
+                    "lease_until = CASE WHEN attempts < ? THEN ? + attempts * ? ELSE NULL END, "
+                    "finished = CASE WHEN attempts < ? THEN NULL ELSE ? END "
+                    "WHERE note = ? AND worker = ? AND state = ?",
+                    (encoded, self.max_attempts, PENDING, FAILED,
+                     self.max_attempts, now, self.retry_delay,
+                     self.max_attempts, now, note, worker, LEASED),
+                )
+            if cursor.rowcount != 1:
+                return None
+            return db.execute("SELECT state FROM items WHERE note = ?", (note,)).fetchone()[0]
+
+        return self._transaction(finish)
+
+    def has_active_leases(self) -> bool:
+        """Vrai si des notes sont encore en cours chez d'autres workers ou attendent un nouvel essai."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM items WHERE state = ? OR (state = ? AND lease_until > ?)",
+                (LEASED, PENDING, time.time())).fetchone()
+        return row[0] > 0
+
+    def status(self) -> dict:
+        """Résumé de la file et de chaque worker."""
+        with self._lock:
+            states = dict(self._db.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+            rows = self._db.execute(
+                "SELECT worker, state, result, started, finished FROM items "
+                "WHERE state IN (?, ?)", (DONE, FAILED)).fetchall()
+            first, last = self._db.execute(
+                "SELECT MIN(started), MAX(finished) FROM items").fetchone()
+
+        workers = {}
+        corrected = 0
+        for worker, state, result, started, finished in rows:
+            entry = workers.setdefault(worker or "?", {"done": 0, "failed": 0, "seconds": 0.0})
+            entry["done" if state == DONE else "failed"] += 1
+            if started and finished:
+                entry["seconds"] += finished - started
+            if state == DONE and json.loads(result or "{}").get("changes"):
+                corrected += 1
+
+        finished_count = states.get(DONE, 0) + states.get(FAILED, 0)
+        elapsed = (last - first) if first and last else 0.0
+        return {
+            "pending": states.get(PENDING, 0),
+            "leased": states.get(LEASED, 0),
+            "done": states.get(DONE, 0),
+            "failed": states.get(FAILED, 0),
+            "corrected": corrected,
+            "elapsed_seconds": elapsed,
+            "notes_per_minute": finished_count / elapsed * 60 if elapsed else 0.0,
+            "workers": workers,
+        }
+
+
+def work(queue: WorkQueue, corrector, worker: str, lease_seconds: float = 300,
+         create_backups: bool = True, poll: float = 10.0) -> dict:
+    """
+    Boucle d'un worker: prend des notes jusqu'à épuisement de la file.
+
+    Le bail est prolongé en tâche de fond pendant la correction. Quand la file
+    est vide mais que d'autres workers ont des notes en cours (ou que des échecs
+    attendent leur nouvel essai), le worker attend pour les reprendre.
+
+    Returns:
+        Compteurs de ce worker
+    """
+    counts = {"done": 0, "retried": 0, "failed": 0, "lost": 0}
+    while True:
+        note = queue.lease(worker, lease_seconds)
+        if note is None:
+            if not queue.has_active_leases():
+                return counts
+            time.sleep(poll)
+            continue
+
+        stop = threading.Event()
+
+        def keep_lease(note=note):
+            while not stop.wait(lease_seconds / 3):
+                if not queue.heartbeat(note, worker, lease_seconds):
+                    return
+
+        heartbeat = threading.Thread(target=keep_lease, daemon=True)
+        heartbeat.start()
+        print(f"📝 [{worker}] {note}")
+        try:
+            result = corrector.correct_note(note, create_backup=create_backups)
+        except Exception as e:
+            result = {"success": False, "note": note, "error": str(e)}
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        state = queue.complete(note, worker, result)
+        if state is None:
+            counts["lost"] += 1
+            print(f"  ⚠️  Bail perdu pour {note} (repris par un autre worker)")
+        elif state == DONE:
+            counts["done"] += 1
+        elif state == PENDING:
+            # Pas encore un échec: la note sera retentée (par ce worker ou un autre)
+            counts["retried"] += 1
+            print(f"  🔁 {result.get('error', 'Erreur inconnue')} (nouvel essai plus tard)")
+        else:
+            counts["failed"] += 1
+            print(f"  ❌ {result.get('error', 'Erreur inconnue')} (essais épuisés)")
+
+
+def print_status(status: dict) -> None:
+    """Affiche le résumé de la file."""
+    from throughput import format_duration
+
+    print("=" * 70)
+    print("📊 FILE DE CORRECTION")
+    print("=" * 70)
+    print(f"⏳ En attente: {status['pending']} | 🔒 En cours: {status['leased']}")
+    print(f"✅ Terminées: {status['done']} (dont {status['corrected']} corrigée(s)) | "
+          f"❌ Échecs: {status['failed']}")
+    if status["elapsed_seconds"]:
+        print(f"⏱️  {format_duration(status['elapsed_seconds'])} · "
+              f"{status['notes_per_minute']:.1f} note(s)/min")
+    for worker, entry in sorted(status["workers"].items()):
+        print(f"  🧑‍🏭 {worker}: {entry['done']} terminée(s), {entry['failed']} échec(s), "
+              f"{format_duration(entry['seconds'])} de traitement")
+    print("=" * 70)
+
+
+def main():
+    """Point d'entrée principal."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Correction répartie entre plusieurs workers")
+    parser.add_argument("--queue", default="",
+                        help="Fichier de la file (défaut: local, dans ~/.cache/correcteur-obsidian/queues/)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Mettre des notes en file")
+    enqueue_parser.add_argument("--folder", default="", help="Dossier à corriger (défaut: tout le vault)")
+    enqueue_parser.add_argument("--pattern", default="*.md", help="Pattern des fichiers")
+    enqueue_parser.add_argument("--include", action="append", default=[], metavar="GLOB")
+    enqueue_parser.add_argument("--exclude", action="append", default=[], metavar="GLOB")
+    enqueue_parser.add_argument("--reset", action="store_true", help="Vider la file avant")
+
+    work_parser = commands.add_parser("work", help="Traiter les notes de la file")
+    work_parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    work_parser.add_argument("--lease", type=float, default=300, help="Durée d'un bail en secondes")
+    work_parser.add_argument("--model", default="", help="Modèle Ollama (défaut: TOOL_MODEL)")
+    work_parser.add_argument("--no-backup", action="store_true", help="Ne pas créer de backups")
+
+    commands.add_parser("status", help="Résumé de la file et des workers")
+    commands.add_parser("requeue", help="Remettre en file les notes en échec")
+    args = parser.parse_args()
+
+    vault = os.getenv("OBSIDIAN_VAULT_PATH", "")
+    if not vault or not Path(vault).is_dir():
+        print(f"❌ Vault introuvable (OBSIDIAN_VAULT_PATH): {vault}")
+        sys.exit(2)
+    vault_path = Path(vault).resolve()
+    queue = WorkQueue(args.queue or str(default_queue_path(vault_path)))
+
+    if args.command == "status":
+        print_status(queue.status())
+        return
+    if args.command == "requeue":
+        print(f"🔁 {queue.requeue_failed()} note(s) en échec remise(s) en file")
+        return
+
+    from correct_spelling import SpellingCorrector, iter_notes
+
+    if args.command == "enqueue":
+        if args.reset:
+            queue.reset()
+        added = queue.enqueue(iter_notes(vault_path, args.folder, args.pattern, args.include, args.exclude))
+        print(f"📥 {added} note(s) ajoutée(s) à la file {queue.path}")
+        return
+
+    model = args.model or os.getenv("TOOL_MODEL", os.getenv("MAIN_MODEL", "llama3.1:8b"))
+    corrector = SpellingCorrector(str(vault_path), model=model)
+    if not corrector.warm_up():
+        sys.exit(2)
+    counts = work(queue, corrector, args.worker_id, lease_seconds=args.lease,
+                  create_backups=not args.no_backup)
+    corrector.save_throughput()
+    print(f"\n👷 {args.worker_id}: ✅ {counts['done']} | 🔁 {counts['retried']} à retenter | "
+          f"❌ {counts['failed']} | ⚠️  {counts['lost']} bail(s) perdu(s)")
+    status = queue.status()
+    print_status(status)
+    # Code de sortie d'après l'état final de la file: une note réussie au
+    # deuxième essai n'est pas un échec
+    sys.exit(1 if status["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()